@@ -0,0 +1,91 @@
+"""
+Compare the ElevenLabs client against the previous one-request-per-scene client.
+
+Runs a local stand-in for the ElevenLabs API that replays an example narration,
+adds a connection setup delay (like a TLS handshake) and streams the audio in
+timed chunks. Reports latency per narration and peak Python memory.
+
+    python benchmarks/elevenlabs_client.py [--narrations 10] [--connect-delay 0.1]
+"""
+import argparse
+import glob
+import inspect
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_handler(payload: bytes, connect_delay: float, chunk_size: int, chunk_delay: float):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            # Paid once per connection, like TCP + TLS setup against the real API
+            time.sleep(connect_delay)
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            for i in range(0, len(payload), chunk_size):
+                self.wfile.write(payload[i:i + chunk_size])
+                time.sleep(chunk_delay)
+
+        def log_message(self, *args):
+            pass
+    return StandInHandler
+
+def legacy_generate_audio(base_url: str, prompt: str, output_path: str):
+    import requests
+    from components.audio_probe import probe_mp3_duration
+    response = requests.post(f"{base_url}/v1/text-to-speech/voice?output_format=mp3_44100_128",
+                             headers={"Content-Type": "application/json"}, json={"text": prompt})
+    with open(output_path, "wb") as f:
+        f.write(response.content)
+    return probe_mp3_duration(response.content)
+
+def measure(name, fn, count, output_dir):
+    tracemalloc.start()
+    start = time.perf_counter()
+    durations = [fn(f"Narration {i}", os.path.join(output_dir, f"{name}_{i}.mp3")) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>10}: {elapsed / count * 1000:7.1f} ms/narration, peak {peak / 1024:7.1f} KiB, "
+          f"duration {durations[0]:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--narrations", type=int, default=10)
+    parser.add_argument("--connect-delay", type=float, default=0.1)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    audio_path = sorted(glob.glob("examples/*/audio/*.mp3"))[0]
+    with open(audio_path, "rb") as f:
+        payload = f.read()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(payload, args.connect_delay, 4096, args.chunk_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ["ELEVENLABS_BASE_URL"] = base_url
+
+    # Call the client itself, bypassing the shared rate limiter and retry layers
+    from components.audio_elevenlabs import generate_audio
+    streaming_generate_audio = inspect.unwrap(generate_audio)
+
+    print(f"Replaying {audio_path} ({len(payload) / 1024:.0f} KiB), {args.connect_delay * 1000:.0f} ms connection setup")
+    with tempfile.TemporaryDirectory() as output_dir:
+        measure("legacy", lambda *a: legacy_generate_audio(base_url, *a), args.narrations, output_dir)
+        measure("streaming", streaming_generate_audio, args.narrations, output_dir)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Measure how long main.py takes to start and where its import time goes.
+
+Prints the packages that `import main` spends the most time importing (from
+`python -X importtime`), then times complete runs that do no real work: --help,
+listing an empty job queue, and a topic whose project is already complete.
+Exits non-zero if any run exceeds the budget.
+
+    python benchmarks/startup.py [--repeat 5] [--top 15] [--budget 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+def import_breakdown(module: str = "main"):
+    """
+    Import a module in a fresh interpreter and return (total_ms, {top-level package: self_ms}).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    packages = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+    return total, dict(packages)
+
+def time_run(args, cwd: str, repeat: int) -> float:
+    """
+    Median wall-clock seconds of running main.py with args in a fresh interpreter.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, MAIN, *args], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"main.py {' '.join(args)} failed:\n{result.stderr.decode(errors='replace')[-2000:]}")
+    return statistics.median(timings)
+
+def make_complete_project(work_dir: str, topic: str):
+    """
+    Lay out a project that resume_or_create_project treats as complete.
+    """
+    project_dir = os.path.join(work_dir, "projects", topic.replace(" ", "_"))
+    for subdir in ("images", "audio", "video", "metadata"):
+        os.makedirs(os.path.join(project_dir, subdir), exist_ok=True)
+    video_path = os.path.join(project_dir, "video", "final_video.mp4")
+    open(video_path, "wb").close()
+    with open(os.path.join(project_dir, "metadata", "video_info.json"), "w") as f:
+        json.dump([{"file_path": video_path, "title": topic, "description": "", "keywords": []}], f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario, the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list in the import breakdown")
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum seconds for a run that does no work")
+    args = parser.parse_args()
+
+    total, packages = import_breakdown("main")
+    print(f"import main: {total:.0f} ms")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {ms:7.1f} ms  {ms / total * 100:5.1f}%")
+
+    topic = "Startup benchmark"
+    over_budget = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        make_complete_project(work_dir, topic)
+        scenarios = [
+            ("--help", ["--help"]),
+            ("empty queue", ["list", "--queue", os.path.join(work_dir, "jobs.sqlite3")]),
+            ("complete project", [topic]),
+        ]
+        print(f"\nMedian of {args.repeat} runs (budget {args.budget:.2f}s):")
+        for name, run_args in scenarios:
+            elapsed = time_run(run_args, work_dir, args.repeat)
+            over_budget |= elapsed > args.budget
+            print(f"  {name:<28} {elapsed:6.3f}s  {'ok' if elapsed <= args.budget else 'OVER BUDGET'}")
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == "__main__":
+    main()
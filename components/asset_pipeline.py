@@ -0,0 +1,145 @@
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from logger import logger
+
+class SceneAssetJob(NamedTuple):
+    index: int
+    image_prompt: str
+    narration: str
+    image_path: str
+    audio_path: str
+
+class SceneAssetResult(NamedTuple):
+    index: int
+    image_path: str
+    audio_path: str
+    audio_duration: Optional[float]  # Reported by the TTS provider, if any
+
+def generate_scene_assets(jobs: List[SceneAssetJob],
+                          generate_image: Callable[[str, str], object],
+                          generate_audio: Callable[[str, str], Optional[float]],
+                          image_concurrency: int = 4,
+                          audio_concurrency: int = 2,
+                          on_scene_complete: Optional[Callable[[SceneAssetResult], None]] = None,
+                          on_scene_failed: Optional[Callable[[int, Exception], None]] = None,
+                          generate_audio_batch: Optional[Callable[[List[Tuple[str, str]]], List[Optional[float]]]] = None,
+                          audio_batch_size: int = 8) -> Dict[int, SceneAssetResult]:
+    """
+    Generate images and narration for many scenes concurrently.
+
+    Image and audio jobs of all scenes are fanned out to one thread pool per
+    provider, so each provider's concurrency is capped separately. Assets that
+    already exist on disk are reused. Callbacks run on the calling thread as
+    soon as both assets of a scene are ready, in completion order.
+
+    Args:
+    jobs (List[SceneAssetJob]): Scenes to generate assets for.
+    generate_image: Image provider function (prompt, output_path).
+    generate_audio: TTS provider function (narration, output_path) returning an optional duration.
+    image_concurrency (int): Maximum concurrent image requests.
+    audio_concurrency (int): Maximum concurrent TTS requests.
+    on_scene_complete: Called with the SceneAssetResult of each finished scene.
+    on_scene_failed: Called with the scene index and exception of each failed scene.
+    generate_audio_batch: Batch TTS function taking (narration, output_path) pairs and returning
+        durations; used instead of generate_audio when given.
+    audio_batch_size (int): Narrations per batch request.
+
+    Returns:
+    Dict[int, SceneAssetResult]: Results of the scenes that completed, by index.
+    """
+    def make_image(job: SceneAssetJob):
+        if os.path.exists(job.image_path):
+            logger.info(f"Using existing image for scene {job.index+1}")
+            return None
+        generate_image(job.image_prompt, job.image_path)
+        logger.info(f"Generated image for scene {job.index+1}")
+        return None
+
+    def make_audio(job: SceneAssetJob):
+        if os.path.exists(job.audio_path):
+            logger.info(f"Using existing audio for scene {job.index+1}")
+            return None
+        duration = generate_audio(job.narration, job.audio_path)
+        logger.info(f"Generated audio for scene {job.index+1}")
+        return duration
+
+    def make_audio_batch(batch: List[SceneAssetJob]):
+        durations = generate_audio_batch([(job.narration, job.audio_path) for job in batch])
+        logger.info(f"Generated audio for scenes {[job.index+1 for job in batch]}")
+        return durations
+
+    results = {}
+    failed = set()
+    remaining = {job.index: 2 for job in jobs}
+    durations = {}
+    jobs_by_index = {job.index: job for job in jobs}
+
+    def fail_scene(index: int, kind: str, error: Exception):
+        if index in failed:
+            return
+        failed.add(index)
+        logger.error(f"Error {kind} for scene {index+1}: {str(error)}")
+        logger.debug(traceback.format_exc())
+        if on_scene_failed:
+            on_scene_failed(index, error)
+
+    def complete_asset(index: int, kind: str, value):
+        if index in failed:
+            return
+        if kind == "audio":
+            durations[index] = value
+        remaining[index] -= 1
+        if remaining[index] == 0:
+            job = jobs_by_index[index]
+            result = SceneAssetResult(index, job.image_path, job.audio_path, durations.get(index))
+            try:
+                if on_scene_complete:
+                    on_scene_complete(result)
+                results[index] = result
+            except Exception as e:
+                fail_scene(index, "completing", e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, image_concurrency), thread_name_prefix="image") as image_pool, \
+         ThreadPoolExecutor(max_workers=max(1, audio_concurrency), thread_name_prefix="audio") as audio_pool:
+        # Each future maps to the scenes it produces assets for
+        futures = {}
+        for job in jobs:
+            futures[image_pool.submit(make_image, job)] = ([job.index], "image")
+        if generate_audio_batch is None:
+            for job in jobs:
+                futures[audio_pool.submit(lambda job: [make_audio(job)], job)] = ([job.index], "audio")
+        else:
+            missing = [job for job in jobs if not os.path.exists(job.audio_path)]
+            for job in jobs:
+                if os.path.exists(job.audio_path):
+                    logger.info(f"Using existing audio for scene {job.index+1}")
+                    complete_asset(job.index, "audio", None)
+            for i in range(0, len(missing), audio_batch_size):
+                batch = missing[i:i + audio_batch_size]
+                futures[audio_pool.submit(make_audio_batch, batch)] = ([job.index for job in batch], "audio")
+
+        for future in as_completed(futures):
+            indexes, kind = futures[future]
+            if kind == "image":
+                try:
+                    future.result()
+                except Exception as e:
+                    fail_scene(indexes[0], "generating image", e)
+                    continue
+                complete_asset(indexes[0], kind, None)
+            else:
+                try:
+                    values = future.result()
+                except Exception as e:
+                    for index in indexes:
+                        fail_scene(index, "generating audio", e)
+                    continue
+                for index, value in zip(indexes, values):
+                    complete_asset(index, kind, value)
+
+    logger.info(f"Generated assets for {len(results)}/{len(jobs)} scenes in {time.perf_counter() - start:.1f}s")
+    return results
@@ -1,35 +1,157 @@
-from kokoro import KPipeline
-from pathlib import Path
-import soundfile as sf
+import atexit
+import multiprocessing
+import threading
+from typing import List, Optional, Tuple
 import numpy as np
-import os
+from components.pcm_audio import write_pcm
 
-pipeline = KPipeline(lang_code='a')
+KOKORO_SAMPLE_RATE = 24000
+DEFAULT_VOICE = 'af_heart'
 
-def generate_audio(prompt: str, output_path: str):
-     # Create the output directory if it doesn't exist
-    output_dir = Path(output_path).parent
-    os.makedirs(output_dir, exist_ok=True)
-    
-    generator = pipeline(
-        prompt, voice='af_heart', speed=1, split_pattern=r'\n+'
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline():
+    """
+    Load the Kokoro pipeline on first use, so importing this module stays cheap.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            from kokoro import KPipeline
+            _pipeline = KPipeline(lang_code='a')
+        return _pipeline
+
+def synthesize(prompt: str, voice: str = DEFAULT_VOICE, speed: float = 1) -> np.ndarray:
+    """
+    Synthesize narration into a float32 array of KOKORO_SAMPLE_RATE samples.
+    """
+    generator = get_pipeline()(
+        prompt, voice=voice, speed=speed, split_pattern=r'\n+'
     )
     
-    all_audio = []  # List to hold all audio segments
+    # Combine all audio segments
+    all_audio = [np.asarray(audio, dtype=np.float32) for _, _, audio in generator]
+    if not all_audio:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(all_audio)
+
+def generate_audio(prompt: str, output_path: str) -> Optional[float]:
+    """
+    Synthesize narration with Kokoro and save it to output_path as float PCM.
     
-    for i, (gs, ps, audio) in enumerate(generator):
-        # Save individual audio segment
-        # audio_path = Path(output_path) / f"output_{i}.wav"
-        # sf.write(str(audio_path), audio, 24000)  # Explicitly convert Path to string
+    Returns the exact duration in seconds from the synthesized sample count.
+    """
+    combined_audio = synthesize(prompt)
+    if len(combined_audio):
+        return write_pcm(str(output_path), combined_audio, KOKORO_SAMPLE_RATE)
+    return None
+
+def _worker_main(conn, warm: bool):
+    """
+    Serve synthesis requests from a KokoroWorker until it closes the pipe.
+    """
+    if warm:
+        get_pipeline()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        prompts, voice, speed = request
+        try:
+            conn.send(("ok", [synthesize(prompt, voice, speed) for prompt in prompts]))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+class KokoroWorker:
+    """
+    Long-lived process that keeps the Kokoro model loaded between requests.
+
+    The model is loaded once in the worker, and each request synthesizes a
+    whole batch of narrations, so a video pays the model load once instead of
+    per scene. Requests from several threads are served one at a time.
+    """
+    def __init__(self, warm: bool = True):
+        self.warm = warm
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._process is None or not self._process.is_alive():
+            # Spawn rather than fork: torch does not survive forking a process that uses it
+            context = multiprocessing.get_context("spawn")
+            self._conn, child_conn = context.Pipe()
+            self._process = context.Process(target=_worker_main, args=(child_conn, self.warm), daemon=True,
+                                            name="kokoro-tts")
+            self._process.start()
+            child_conn.close()
+        return self
+
+    def synthesize_batch(self, prompts: List[str], voice: str = DEFAULT_VOICE,
+                         speed: float = 1) -> List[Tuple[np.ndarray, float]]:
+        """
+        Synthesize narrations in the worker.
         
-        # Collect audio for combining
-        all_audio.append(audio)
+        Returns:
+        List[Tuple[np.ndarray, float]]: float32 samples and exact duration in seconds, per narration.
+        """
+        with self._lock:
+            self.start()
+            try:
+                self._conn.send((list(prompts), voice, speed))
+                status, payload = self._conn.recv()
+            except (EOFError, OSError):
+                # Started again on the next request
+                self._process = None
+                raise RuntimeError("Kokoro worker exited")
+        if status != "ok":
+            raise RuntimeError(f"Kokoro synthesis failed: {payload}")
+        return [(samples, len(samples) / KOKORO_SAMPLE_RATE) for samples in payload]
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                self._conn.send(None)
+                self._process.join(timeout=10)
+            self._process = None
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_tts_worker() -> KokoroWorker:
+    """
+    Return the process-wide Kokoro worker, starting it on first use.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = KokoroWorker().start()
+            atexit.register(_worker.close)
+        return _worker
+
+def generate_audio_batch(items: List[Tuple[str, str]]) -> List[Optional[float]]:
+    """
+    Synthesize several narrations in the warm worker and save them as float PCM.
+    
+    Args:
+    items (List[Tuple[str, str]]): (text, output_path) pairs.
     
-    # Combine all audio segments into one file
-    if all_audio:
-        combined_audio = np.concatenate(all_audio)
-        combined_path = Path(output_path)
-        sf.write(str(combined_path), combined_audio, 24000)
+    Returns:
+    List[Optional[float]]: Exact durations in the order of items, None for empty narrations.
+    """
+    results = get_tts_worker().synthesize_batch([text for text, _ in items])
+    durations = []
+    for (_, output_path), (samples, duration) in zip(items, results):
+        if not len(samples):
+            durations.append(None)
+            continue
+        write_pcm(str(output_path), samples, KOKORO_SAMPLE_RATE)
+        durations.append(duration)
+    return durations
 
 if __name__ == '__main__':
     generate_audio('''
@@ -1,32 +1,95 @@
 import os
-import requests
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from components.audio_probe import Mp3FrameCounter
+from components.rate_limiter import RateLimitError, parse_retry_after
+from components.resilience import resilient
 from dotenv import load_dotenv
 load_dotenv()
 
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
+MODEL_ID = "eleven_multilingual_v2"
+OUTPUT_FORMAT = "mp3_44100_128"
+CHUNK_SIZE = 16 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size: int = 8):
+    """
+    Return the process-wide keep-alive session, so scenes reuse TLS connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+            session.headers.update({
+                "xi-api-key": os.getenv("ELEVEN_LABS_API_KEY") or "",
+                "Content-Type": "application/json",
+            })
+            _session = session
+        return _session
+
+@resilient("elevenlabs")
 def generate_audio(prompt: str, output_path: str):
     """
-    Generate audio from text using ElevenLabs API and save to output_path.
+    Generate audio from text using the ElevenLabs streaming API and save to output_path.
+
+    Chunks are written to disk as they arrive, and the duration in seconds is
+    counted from the MP3 frames of the stream.
     """
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/JBFqnCBsd6RMkjVDRZzb?output_format=mp3_44100_128"
-    headers = {
-        "xi-api-key": os.getenv("ELEVEN_LABS_API_KEY"),
-        "Content-Type": "application/json"
-    }
+    url = f"{ELEVENLABS_BASE_URL}/v1/text-to-speech/{VOICE_ID}/stream?output_format={OUTPUT_FORMAT}"
     data = {
         "text": prompt,
-        "model_id": "eleven_multilingual_v2"
+        "model_id": MODEL_ID
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    with get_session().post(url, json=data, stream=True, timeout=(10, 60)) as response:
+        if response.status_code == 429:
+            raise RateLimitError(f"Request throttled: {response.text}", parse_retry_after(response.headers.get("Retry-After")))
+        if response.status_code != 200:
+            from requests import HTTPError
+            raise HTTPError(f"Request failed with status {response.status_code}: {response.text}", response=response)
+
+        # Ensure output directory exists
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # Write through a temp file so an abandoned or hedged duplicate call never leaves a partial file
+        counter = Mp3FrameCounter()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    counter.feed(chunk)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
-    if response.status_code != 200:
-        raise Exception(f"Request failed with status {response.status_code}: {response.text}")
+    return counter.duration
 
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+def generate_audio_batch(items: List[Tuple[str, str]], max_workers: int = 2) -> List[Optional[float]]:
+    """
+    Generate several narrations over the shared connection pool.
+
+    Args:
+    items (List[Tuple[str, str]]): (text, output_path) pairs.
+    max_workers (int): Concurrent requests.
 
-    with open(output_path, "wb") as f:
-        f.write(response.content)
+    Returns:
+    List[Optional[float]]: Durations in the order of items.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda item: generate_audio(*item), items))
 
 if __name__ == "__main__":
     generate_audio(
@@ -0,0 +1,144 @@
+import subprocess
+import time
+import wave
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from logger import logger
+from components.utils import get_ffmpeg_binary
+from components.pcm_audio import read_pcm, resample
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """
+    Decode an audio file into a float32 array of shape (samples, channels).
+    """
+    cmd = [
+        get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-i", path,
+        "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-",
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to decode {path}: {result.stderr.decode(errors='replace')}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+
+def load_narration(path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """
+    Load a narration as float32 samples shaped (samples, channels) for mixing.
+
+    Float PCM artifacts are memory-mapped and used as they are, only resampled
+    when their rate differs, and mono is broadcast without copying. Other
+    formats are decoded with ffmpeg.
+    """
+    pcm = read_pcm(path)
+    if pcm is None:
+        return decode_audio(path, sample_rate, channels)
+    samples = resample(pcm.samples, pcm.sample_rate, sample_rate)
+    if samples.shape[1] == channels:
+        return samples
+    if samples.shape[1] == 1:
+        return np.broadcast_to(samples, (len(samples), channels))
+    return np.ascontiguousarray(samples.mean(axis=1, keepdims=True).repeat(channels, axis=1), dtype=np.float32)
+
+def fit_to_length(track: np.ndarray, n_samples: int) -> np.ndarray:
+    """
+    Loop or trim a track to exactly n_samples.
+    """
+    if len(track) == 0:
+        return np.zeros((n_samples, track.shape[1]), dtype=np.float32)
+    if len(track) >= n_samples:
+        return track[:n_samples]
+    repeats = int(np.ceil(n_samples / len(track)))
+    return np.tile(track, (repeats, 1))[:n_samples]
+
+def _moving_average(envelope: np.ndarray, window: int) -> np.ndarray:
+    """
+    Smooth a gain envelope with a centered moving average in O(n).
+    """
+    if window <= 1:
+        return envelope
+    padded = np.pad(envelope, (window // 2, window - window // 2 - 1), mode='edge')
+    cumsum = np.cumsum(np.concatenate(([0.0], padded)), dtype=np.float64)
+    return ((cumsum[window:] - cumsum[:-window]) / window).astype(np.float32)
+
+def mix_audio(narrations: Sequence[Tuple[np.ndarray, float]], music: Optional[np.ndarray], duration: float,
+              sample_rate: int = SAMPLE_RATE, music_gain: float = 0.2, duck_gain: Optional[float] = None,
+              duck_fade: float = 0.15) -> np.ndarray:
+    """
+    Mix narrations placed at their start times over looped background music.
+
+    Args:
+    narrations: (samples, start_seconds) pairs, samples shaped (n, channels).
+    music (np.ndarray): Background track, looped or trimmed to the duration.
+    duration (float): Length of the mix in seconds.
+    sample_rate (int): Sample rate shared by all inputs.
+    music_gain (float): Gain applied to the music.
+    duck_gain (float): Extra music gain while narration plays, None to disable ducking.
+    duck_fade (float): Ramp length of the ducking in seconds.
+
+    Returns:
+    np.ndarray: float32 buffer of shape (samples, channels).
+    """
+    n_samples = int(round(duration * sample_rate))
+    mix = np.zeros((n_samples, CHANNELS), dtype=np.float32)
+
+    if music is not None:
+        if duck_gain is None:
+            np.multiply(fit_to_length(music, n_samples), music_gain, out=mix)
+        else:
+            envelope = np.ones(n_samples, dtype=np.float32)
+            for samples, start in narrations:
+                begin = int(round(start * sample_rate))
+                envelope[begin:begin + len(samples)] = duck_gain
+            envelope = _moving_average(envelope, int(duck_fade * sample_rate)) * music_gain
+            np.multiply(fit_to_length(music, n_samples), envelope[:, None], out=mix)
+
+    for samples, start in narrations:
+        begin = int(round(start * sample_rate))
+        end = min(n_samples, begin + len(samples))
+        if end > begin:
+            mix[begin:end] += samples[:end - begin]
+
+    return mix
+
+def write_wav(samples: np.ndarray, path: str, sample_rate: int = SAMPLE_RATE):
+    """
+    Write a float32 buffer as a 16-bit PCM WAV file.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+def build_soundtrack(audio_paths: List[str], starts: List[float], duration: float, output_path: str,
+                     music_path: Optional[str] = None, music_gain: float = 0.2, duck_gain: Optional[float] = None,
+                     music_samples: Optional[np.ndarray] = None) -> str:
+    """
+    Load narrations and background music once, mix them and write the soundtrack.
+
+    Args:
+    audio_paths (List[str]): Narration files in playback order.
+    starts (List[float]): Start time of each narration in seconds.
+    duration (float): Length of the soundtrack in seconds.
+    output_path (str): WAV file to write.
+    music_path (str): Background music file, None for narration only.
+    music_gain (float): Gain applied to the music.
+    duck_gain (float): Extra music gain while narration plays, None to disable ducking.
+    music_samples (np.ndarray): Already decoded background music, used instead of music_path.
+
+    Returns:
+    str: Path of the soundtrack.
+    """
+    start = time.perf_counter()
+    narrations = [(load_narration(path), float(offset)) for path, offset in zip(audio_paths, starts)]
+    music = music_samples if music_samples is not None else (decode_audio(music_path) if music_path else None)
+    decoded = time.perf_counter()
+
+    mix = mix_audio(narrations, music, duration, music_gain=music_gain, duck_gain=duck_gain)
+    write_wav(mix, output_path)
+    logger.info(f"Built soundtrack {output_path}: load {decoded - start:.2f}s, "
+                f"mix+write {time.perf_counter() - decoded:.2f}s")
+    return output_path
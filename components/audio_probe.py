@@ -0,0 +1,226 @@
+import os
+import struct
+from typing import Optional
+
+# MPEG audio header tables, indexed by [version][layer]
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+def _parse_mp3_header(header: bytes) -> Optional[dict]:
+    """
+    Decode a 4-byte MPEG audio frame header, or return None if it is not one.
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version = {0: 2.5, 2: 2, 3: 1}[version_bits]
+    layer = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    mono = (header[3] >> 6) == 3
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples_per_frame = 1152 if layer == 2 or version == 1 else 576
+        frame_length = samples_per_frame // 8 * bitrate // sample_rate + padding
+
+    return {
+        "version": version,
+        "layer": layer,
+        "sample_rate": sample_rate,
+        "samples_per_frame": samples_per_frame,
+        "frame_length": frame_length,
+        "mono": mono,
+    }
+
+def probe_mp3_duration(data: bytes, scan_frames: bool = True) -> Optional[float]:
+    """
+    Duration of an MP3 from its Xing/Info or VBRI header, or by walking frame headers.
+
+    With scan_frames disabled, only the summary headers are consulted and None
+    is returned when they are missing.
+    """
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    # Find the first frame whose successor also starts with a valid header
+    first = None
+    while offset + 4 <= len(data):
+        header = _parse_mp3_header(data[offset:offset + 4])
+        if header and header["frame_length"] > 0:
+            following = data[offset + header["frame_length"]:offset + header["frame_length"] + 4]
+            if len(following) < 4 or _parse_mp3_header(following):
+                first = header
+                break
+        offset += 1
+    if first is None:
+        return None
+
+    # Xing/Info header sits after the side information of the first frame
+    if first["version"] == 1:
+        side_info = 17 if first["mono"] else 32
+    else:
+        side_info = 9 if first["mono"] else 17
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            return frames * first["samples_per_frame"] / first["sample_rate"]
+
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * first["samples_per_frame"] / first["sample_rate"]
+
+    if not scan_frames:
+        return None
+
+    # No summary header: count frames
+    samples = 0
+    while offset + 4 <= len(data):
+        header = _parse_mp3_header(data[offset:offset + 4])
+        if header is None or header["frame_length"] <= 0:
+            break
+        samples += header["samples_per_frame"]
+        offset += header["frame_length"]
+    return samples / first["sample_rate"]
+
+def probe_wav_duration(data: bytes, file_size: Optional[int] = None) -> Optional[float]:
+    """
+    Duration of a RIFF/WAVE file from its fmt and data chunk headers.
+
+    data only needs to cover the headers when file_size is given.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+
+    file_size = file_size or len(data)
+    offset = 12
+    block_align = sample_rate = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt ":
+            _, _, sample_rate, _, block_align = struct.unpack("<HHIIH", data[offset + 8:offset + 22])
+        elif chunk_id == b"data":
+            if not sample_rate or not block_align:
+                return None
+            # Streamed WAVs may leave the data size unset; use what is on disk
+            available = file_size - offset - 8
+            if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                chunk_size = available
+            return chunk_size // block_align / sample_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+class Mp3FrameCounter:
+    """
+    Measure an MP3's duration incrementally while it is streamed.
+
+    Only the bytes of an incomplete frame are buffered between chunks. A
+    Xing/Info header in the first frame takes precedence over counting frames.
+    """
+    def __init__(self):
+        self.buffer = b""
+        self.skip = None  # Bytes of ID3 tag still to skip, None until the stream start was seen
+        self.samples = 0
+        self.sample_rate = None
+        self.summary_frames = None
+        self.samples_per_frame = None
+
+    def feed(self, chunk: bytes):
+        data = self.buffer + chunk
+        offset = 0
+        if self.skip is None:
+            if len(data) < 10:
+                self.buffer = data
+                return
+            self.skip = 0
+            if data[:3] == b"ID3":
+                self.skip = 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]) + (10 if data[5] & 0x10 else 0)
+        if self.skip:
+            skipped = min(self.skip, len(data))
+            offset += skipped
+            self.skip -= skipped
+
+        while offset + 4 <= len(data):
+            header = _parse_mp3_header(data[offset:offset + 4])
+            if header is None or header["frame_length"] <= 0:
+                offset += 1
+                continue
+            if offset + header["frame_length"] > len(data):
+                break
+            if self.sample_rate is None:
+                self.sample_rate = header["sample_rate"]
+                self.samples_per_frame = header["samples_per_frame"]
+                # Xing/Info header sits after the side information of the first frame
+                if header["version"] == 1:
+                    side_info = 17 if header["mono"] else 32
+                else:
+                    side_info = 9 if header["mono"] else 17
+                xing = offset + 4 + side_info
+                if data[xing:xing + 4] in (b"Xing", b"Info") and struct.unpack(">I", data[xing + 4:xing + 8])[0] & 0x01:
+                    self.summary_frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+                    offset += header["frame_length"]
+                    continue
+            self.samples += header["samples_per_frame"]
+            offset += header["frame_length"]
+        self.buffer = data[offset:]
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.sample_rate is None:
+            return None
+        if self.summary_frames is not None:
+            return self.summary_frames * self.samples_per_frame / self.sample_rate
+        return self.samples / self.sample_rate
+
+HEADER_BYTES = 64 * 1024
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Read an audio file's duration from its container headers without decoding it.
+
+    Supports WAV (RIFF) and MP3 (Xing/Info, VBRI or frame headers). Returns None
+    for other formats so callers can fall back to a decoder.
+    """
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        head = f.read(HEADER_BYTES)
+        if head[:4] == b"RIFF":
+            return probe_wav_duration(head, file_size)
+
+        # The ID3 tag can be large (cover art); read past it before looking for frames
+        if head[:3] == b"ID3" and len(head) >= 10:
+            tag_size = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+            if tag_size + HEADER_BYTES > len(head):
+                head += f.read(tag_size + HEADER_BYTES - len(head))
+
+        duration = probe_mp3_duration(head, scan_frames=False)
+        if duration is None and (head[:3] == b"ID3" or _parse_mp3_header(head[:4])):
+            duration = probe_mp3_duration(head + f.read(), scan_frames=True)
+        return duration
+
+if __name__ == "__main__":
+    import sys
+    for audio_path in sys.argv[1:]:
+        print(f"{audio_path}: {probe_duration(audio_path)}")
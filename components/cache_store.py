@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+from logger import logger
+from constants import cache_limits
+
+CACHE_DB = os.getenv("CACHE_DB", r"projects/cache.sqlite3")
+# Access times closer together than this are not written back, so hits stay read-only
+ACCESS_RESOLUTION = 60
+
+class CacheStore:
+    """
+    Persistent JSON key/value cache in a local SQLite database.
+
+    One database holds several namespaces, and every thread and process on the
+    host shares it through WAL mode. Entries older than max_age, or than the ttl
+    they were stored with, are treated as missing and removed. Once a namespace holds more than max_bytes, the least
+    recently used entries are evicted. Lookups use a connection kept per thread
+    and only write when an entry's access time is more than ACCESS_RESOLUTION
+    seconds old, so a hit costs a single indexed read.
+    """
+    def __init__(self, namespace: str, max_bytes: Optional[int] = None, max_age: Optional[float] = None,
+                 path: str = CACHE_DB):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    expires REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            # Databases created before entries could have their own ttl
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "expires" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN expires REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (namespace, accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connection of the calling thread, reopened after a fork.
+        """
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _count(self, hit: bool):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Return the cached value of key, or None if it is missing or expired.
+
+        max_age overrides the entry's ttl and the store's age limit for this lookup.
+        """
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT value, created, accessed, expires FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is not None:
+            created, expires = row[1], row[3]
+            if max_age is not None:
+                expires = created + max_age
+            elif expires is None and self.max_age is not None:
+                expires = created + self.max_age
+        if row is None or (expires is not None and now > expires):
+            self._count(False)
+            return None
+        if now - row[2] > ACCESS_RESOLUTION:
+            with self._transaction() as conn:
+                conn.execute("UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key))
+        self._count(True)
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value under key and evict what no longer fits.
+
+        ttl replaces the store's max_age for this entry, so the entry may outlive it.
+        """
+        data = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, created, accessed, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, data, len(data), now, now, expires),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        removed = 0
+        if self.max_age is not None:
+            removed += conn.execute("DELETE FROM entries WHERE namespace = ? AND expires IS NULL AND created < ?",
+                                    (self.namespace, now - self.max_age)).rowcount
+        removed += conn.execute("DELETE FROM entries WHERE namespace = ? AND expires < ?",
+                                (self.namespace, now)).rowcount
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?",
+                                 (self.namespace,)).fetchone()[0]
+            if total > self.max_bytes:
+                stale = []
+                for key, size in conn.execute("SELECT key, size FROM entries WHERE namespace = ? ORDER BY accessed",
+                                              (self.namespace,)):
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((self.namespace, key))
+                    total -= size
+                conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", stale)
+                removed += len(stale)
+        if removed:
+            logger.info(f"Evicted {removed} entries from the {self.namespace} cache")
+        return removed
+
+    def evict(self) -> int:
+        """
+        Remove expired entries and the least recently used ones over the size limit.
+        """
+        with self._transaction() as conn:
+            return self._evict(conn, time.time())
+
+    def delete(self, key: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Entries and bytes stored in the namespace, and this process's hits and misses.
+        """
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+_caches: Dict[str, CacheStore] = {}
+_caches_lock = threading.Lock()
+
+def get_cache(namespace: str) -> CacheStore:
+    """
+    Return the process-wide cache of a namespace, with its limits from cache_limits.
+    """
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = CacheStore(namespace, **cache_limits.get(namespace, {}))
+        return _caches[namespace]
+
+if __name__ == "__main__":
+    import sys
+    for namespace in sys.argv[1:] or list(cache_limits):
+        print(get_cache(namespace).stats())
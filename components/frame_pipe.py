@@ -0,0 +1,135 @@
+import os
+import subprocess
+import time
+from typing import List, Optional
+import numpy as np
+from entity import Scene, RenderProfile
+from logger import logger
+from components.zoom_engine import KenBurnsEngine
+from components.subtitles import SubtitleRenderer
+from components.utils import get_ffmpeg_binary
+from components.video_editing import Timeline, write_soundtrack
+
+class FrameCompositor:
+    """
+    Composites zoomed scene images, fades and subtitles into a reused RGB buffer.
+
+    The scene of every frame is looked up once from the timeline's frame
+    ranges, so rendering a frame does no search.
+    """
+    def __init__(self, timeline: Timeline, fps: int, frame_size, zoom_quality: str = "lanczos", subtitle_font_size: int = 64):
+        self.timeline = timeline
+        self.fps = fps
+        self.frame_size = frame_size
+        self.zoom_quality = zoom_quality
+        self.subtitle_font_size = subtitle_font_size
+        self.scene_layers = sorted((layer for layer in timeline.layers if layer.kind == 'scene'),
+                                   key=lambda layer: layer.start)
+        self.frame_ranges = timeline.frame_ranges(fps)
+        self.frame_scenes = np.repeat(np.arange(len(self.frame_ranges)),
+                                      [end - first for first, end in self.frame_ranges])
+        self.n_frames = len(self.frame_scenes)
+        width, height = frame_size
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.work = np.empty((height, width, 3), dtype=np.float32)
+        self._active_index = None
+        self._engine = None
+        self._subtitles = None
+
+    def _activate(self, index: int, scene: Scene, duration: float):
+        """
+        Prepare the zoom engine and subtitle renderer of a scene, dropping the previous one.
+        """
+        zoom_type = 'in' if index % 2 == 0 else 'out'
+        self._engine = KenBurnsEngine(scene.image_path, duration, zoom_type,
+                                      output_size=self.frame_size, quality=self.zoom_quality)
+        self._subtitles = SubtitleRenderer(scene, *self.frame_size, font_size=self.subtitle_font_size)
+        self._active_index = index
+
+    def render(self, frame_index: int) -> np.ndarray:
+        """
+        Render a frame into the shared buffer and return it.
+        """
+        position = self.frame_scenes[frame_index]
+        layer = self.scene_layers[position]
+        first_frame, end_frame = self.frame_ranges[position]
+        index, scene = layer.index, layer.payload
+        if index != self._active_index:
+            self._activate(index, scene, (end_frame - first_frame) / self.fps)
+
+        t = (frame_index - first_frame) / self.fps
+        image = self._engine.get_frame(t)
+
+        # Fade in from black, matching the MoviePy transitions
+        if index > 0 and t < scene.transition_duration:
+            np.multiply(image, t / scene.transition_duration, out=self.work)
+            np.copyto(self.frame, self.work, casting='unsafe')
+        else:
+            np.copyto(self.frame, image)
+
+        # Blend the subtitle band over the image
+        rgb, mask = self._subtitles.render_state(self._subtitles.state_at(t))
+        top = self._subtitles.band_top
+        band = self.frame[top:top + rgb.shape[0]]
+        work = self.work[:rgb.shape[0]]
+        np.subtract(rgb, band, out=work, dtype=np.float32)
+        work *= mask[:, :, None]
+        work += band
+        np.copyto(band, work, casting='unsafe')
+        return self.frame
+
+def render_with_ffmpeg_pipe(scenes: List[Scene], output_path: str, frame_size, profile: RenderProfile,
+                            duck_gain: Optional[float] = None) -> str:
+    """
+    Render the video by piping raw RGB24 frames straight into ffmpeg.
+
+    Args:
+    scenes (List[Scene]): Scenes in playback order.
+    output_path (str): Path of the output video.
+    frame_size (tuple): (width, height) of the video.
+    profile (RenderProfile): Render settings.
+    duck_gain (float): Extra background music gain under narration, None to disable ducking.
+
+    Returns:
+    str: Path of the output video.
+    """
+    fps = profile.fps
+    timeline = Timeline.from_scenes(scenes, fps=fps)
+    compositor = FrameCompositor(timeline, fps, frame_size, profile.zoom_quality, profile.subtitle_font_size)
+    width, height = frame_size
+    n_frames = compositor.n_frames
+
+    narrations = [layer for layer in timeline.layers if layer.kind == 'audio']
+    audio_path = write_soundtrack([layer.payload for layer in narrations], [layer.start for layer in narrations],
+                                  timeline.duration, output_path, duck_gain=duck_gain)
+
+    cmd = [
+        get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "libx264", "-preset", profile.preset, "-pix_fmt", "yuv420p", "-c:a", "aac",
+        "-frames:v", str(n_frames),
+        output_path,
+    ]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frame_index in range(n_frames):
+            process.stdin.write(compositor.render(frame_index).data)
+        process.stdin.close()
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed ({process.returncode}): {stderr.decode(errors='replace')}")
+    except Exception:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Piped {n_frames} frames to ffmpeg in {elapsed:.1f}s ({n_frames / max(elapsed, 1e-9):.1f} fps)")
+    return output_path
@@ -1,32 +1,80 @@
-import replicate
 import os
+import tempfile
+import time
 from pathlib import Path
+from components.image_store import get_image_store, image_key
+from components.resilience import resilient
+from constants import similarity_reuse
+from logger import logger
 
-os.environ["REPLICATE_API_TOKEN"] = os.getenv("REPLICATE_API_KEY")
+if os.getenv("REPLICATE_API_KEY"):
+    os.environ["REPLICATE_API_TOKEN"] = os.getenv("REPLICATE_API_KEY")
 
-def generate_image(prompt: str, output_path:str, model:str="black-forest-labs/flux-schnell"):
+DEFAULT_MODEL = "black-forest-labs/flux-schnell"
+DEFAULT_INPUT = {
+    "go_fast": True,
+    "megapixels": "1",
+    "num_outputs": 1,
+    "aspect_ratio": "9:16",
+    "output_format": "jpg",
+    "output_quality": 100,
+    "num_inference_steps": 4
+}
+
+@resilient("replicate")
+def request_image(model: str, inputs: dict, output_path: Path):
+    import replicate
+    output = replicate.run(model, input=inputs)
+    # Save the first (and only) generated image; write through a temp file so an
+    # abandoned or hedged duplicate call never leaves a partial image behind
+    for item in output:
+        fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(item.read())
+        os.replace(tmp_path, output_path)
+        break
+
+def generate_image(prompt: str, output_path:str, model:str=DEFAULT_MODEL, cache: bool = True):
+    """
+    Generate an image with Replicate and save it to output_path.
+
+    Images are kept in the shared image store by model and input parameters,
+    so the same prompt rendered for an earlier project is linked in instead
+    of generated again. With an image threshold in similarity_reuse, the image
+    of a near-duplicate prompt is reused too. Set cache to False to always
+    call Replicate.
+    """
     # Convert output_path to Path object for proper path handling
     output_path = Path(output_path)
     
     # Ensure the parent directory exists
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    output = replicate.run(
-        model,
-        input={
-            "prompt": prompt,
-            "go_fast": True,
-            "megapixels": "1",
-            "num_outputs": 1,
-            "aspect_ratio": "9:16",
-            "output_format": "jpg",
-            "output_quality": 100,
-            "num_inference_steps": 4
-        },
-        
-    )
-    # Save the first (and only) generated image directly to the specified path
-    for item in output:
-        with open(output_path, "wb") as file:
-            file.write(item.read())
-        break
+    inputs = {"prompt": prompt, **DEFAULT_INPUT}
+    key = image_key(model, inputs)
+    store = get_image_store()
+    if cache and store.fetch(key, str(output_path)):
+        logger.info(f"Reused stored image for {output_path.name} ({store.hits} hits, {store.saved_seconds:.0f}s saved)")
+        return
+
+    kind = f"image:{model}"
+    threshold = similarity_reuse.get("image") if cache else None
+    if threshold is not None:
+        # Loaded only when reuse is on, as it needs numpy
+        from components.similarity_index import get_similarity_index
+        index = get_similarity_index()
+        for match in index.query(kind, prompt, threshold):
+            if store.fetch(match.asset, str(output_path)):
+                index.record_hit(kind, match)
+                logger.info(f"Reused image of a {match.similarity:.2f} similar prompt for {output_path.name}")
+                return
+            # The image was evicted from the store
+            index.remove(match.id)
+
+    start = time.perf_counter()
+    request_image(model, inputs, output_path)
+    if cache and output_path.exists():
+        elapsed = time.perf_counter() - start
+        store.add(key, str(output_path), elapsed)
+        if threshold is not None:
+            index.add(kind, prompt, key, elapsed)
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+from logger import logger
+from constants import cache_limits
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", r"projects/image_store")
+
+def image_key(model: str, inputs: Dict[str, Any]) -> str:
+    """
+    Address of a generated image: SHA-256 of the model and all of its input parameters.
+    """
+    request = json.dumps({"model": model, "input": inputs}, sort_keys=True)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+def link_or_copy(source: str, destination: str, link: bool = True):
+    """
+    Place source at destination as a hardlink, or a copy across filesystems or when link is False.
+
+    The destination is replaced atomically, so readers never see a partial file.
+    """
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=destination.parent, suffix=".tmp")
+    os.close(fd)
+    os.remove(tmp_path)
+    try:
+        linked = False
+        if link:
+            try:
+                os.link(source, tmp_path)
+                linked = True
+            except OSError:
+                pass
+        if not linked:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ImageStore:
+    """
+    Generated images shared across projects, addressed by their generation parameters.
+
+    Objects live under ``objects/`` in the store directory. Projects get a
+    hardlink to them, or a copy when the store is on another filesystem. A
+    SQLite index records each object's size, last access, hits and how long it
+    took to generate. Once the objects exceed max_bytes, the least recently
+    used are removed; projects keep their own links. An object whose size or
+    mtime no longer matches the index (edited in place through a project's
+    hardlink) is dropped instead of being handed out.
+    """
+    def __init__(self, root: str = IMAGE_STORE_DIR, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.sqlite3"
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._counter_lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS images (
+                    key TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    seconds REAL NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS images_accessed ON images (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def object_path(self, key: str, suffix: str = ".jpg") -> Path:
+        return self.objects_dir / key[:2] / f"{key}{suffix}"
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """
+        Place the stored image of key at output_path. Returns False if there is none.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT path, size, mtime, seconds FROM images WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path, size, mtime, seconds = row
+                try:
+                    stat = os.stat(self.root / path)
+                    fresh = stat.st_size == size and stat.st_mtime == mtime
+                except FileNotFoundError:
+                    fresh = False
+                if fresh:
+                    conn.execute("UPDATE images SET accessed = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+                else:
+                    logger.warning(f"Stored image {path} is missing or was modified, dropping it")
+                    conn.execute("DELETE FROM images WHERE key = ?", (key,))
+                    # Once unindexed, the object would no longer count against max_bytes
+                    try:
+                        os.remove(self.root / path)
+                    except FileNotFoundError:
+                        pass
+                    row = None
+        if row is None:
+            with self._counter_lock:
+                self.misses += 1
+            return False
+
+        try:
+            link_or_copy(str(self.root / path), output_path)
+        except FileNotFoundError:
+            # Another process evicted the object after it was checked
+            logger.warning(f"Stored image {path} was removed while fetching it, dropping it")
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM images WHERE key = ? AND path = ?", (key, path))
+            with self._counter_lock:
+                self.misses += 1
+            return False
+        with self._counter_lock:
+            self.hits += 1
+            self.saved_seconds += seconds
+        return True
+
+    def add(self, key: str, source_path: str, seconds: float = 0.0):
+        """
+        Store a generated image under key and evict what no longer fits.
+
+        Args:
+        key (str): Address from image_key.
+        source_path (str): The generated image, linked or copied into the store.
+        seconds (float): How long generating it took, reported as saved on every hit.
+        """
+        object_path = self.object_path(key, Path(source_path).suffix or ".jpg")
+        link_or_copy(source_path, str(object_path))
+        stat = os.stat(object_path)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO images (key, path, size, mtime, seconds, created, accessed)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (key, str(object_path.relative_to(self.root)), stat.st_size, stat.st_mtime, seconds, now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        if self.max_bytes is None:
+            return 0
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        stale = []
+        for key, path, size in conn.execute("SELECT key, path, size FROM images ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key, path))
+            total -= size
+        conn.executemany("DELETE FROM images WHERE key = ?", [(key,) for key, _ in stale])
+        for _, path in stale:
+            try:
+                os.remove(self.root / path)
+            except FileNotFoundError:
+                pass
+        logger.info(f"Evicted {len(stale)} images from the image store")
+        return len(stale)
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used images over the size limit.
+        """
+        with self._transaction() as conn:
+            return self._evict(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Stored images and bytes, lifetime hits and generation time saved, and this process's counters.
+        """
+        with self._connect() as conn:
+            entries, size, hits, saved = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * seconds), 0) FROM images"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "total_hits": hits,
+            "total_saved_seconds": round(saved, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_seconds": round(self.saved_seconds, 1),
+        }
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_image_store() -> ImageStore:
+    """
+    Return the process-wide image store, with its size limit from cache_limits.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore(**cache_limits.get("images", {}))
+        return _store
+
+if __name__ == "__main__":
+    print(get_image_store().stats())
@@ -0,0 +1,290 @@
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from logger import logger
+
+DEFAULT_QUEUE_PATH = r"projects/jobs.sqlite3"
+
+class JobQueue:
+    """
+    Durable topic queue backed by a local SQLite database.
+
+    Workers claim jobs under a lease that they keep renewing with heartbeats.
+    A job whose lease runs out (its worker crashed) is handed to the next
+    worker, which picks the project up from its saved resume state. The same
+    database holds the slots used to cap concurrent stages across workers.
+    """
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, lease_seconds: float = 120, max_attempts: int = 3):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    topic TEXT NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    result TEXT,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+                CREATE TABLE IF NOT EXISTS slots (
+                    name TEXT NOT NULL,
+                    holder TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    PRIMARY KEY (name, holder)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run statements in a write transaction taken up front, so claims never race.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def submit(self, topic: str, **options) -> int:
+        """
+        Queue a topic; options are passed to the job runner as keyword arguments.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (topic, options, created, updated) VALUES (?, ?, ?, ?)",
+                (topic, json.dumps(options), now, now),
+            )
+        logger.info(f"Queued job {cursor.lastrowid} for topic '{topic}'")
+        return cursor.lastrowid
+
+    def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return jobs, oldest first, optionally filtered by status.
+        """
+        with self._connect() as conn:
+            if status:
+                rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a queued or running job. A running job is left to finish its
+        current run, but its result is discarded and it is not retried.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+        return cursor.rowcount > 0
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest queued job, or a running job whose lease has expired.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = 'failed', error = 'Worker lease expired too many times', updated = ?
+                   WHERE status = 'running' AND lease_expires < ? AND attempts >= ?""",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                """SELECT * FROM jobs
+                   WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)
+                   ORDER BY id LIMIT 1""",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "running":
+                logger.warning(f"Lease of job {row['id']} held by {row['worker']} expired, reclaiming it")
+            conn.execute(
+                """UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1,
+                   updated = ? WHERE id = ?""",
+                (worker, now + self.lease_seconds, now, row["id"]),
+            )
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """
+        Renew a job's lease and the worker's slots. Returns False once the job is
+        cancelled or taken over by another worker.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id, worker),
+            )
+            conn.execute("UPDATE slots SET expires = ? WHERE holder LIKE ?", (now + self.lease_seconds, f"{worker}:%"))
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: int, worker: str, result: Any = None):
+        """
+        Mark a job done, unless it was cancelled or reassigned meanwhile.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, updated = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id, worker),
+            )
+
+    def fail(self, job_id: int, worker: str, error: str):
+        """
+        Requeue a failed job, or mark it failed once it has used all its attempts.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                   error = ?, updated = ? WHERE id = ? AND worker = ? AND status = 'running'""",
+                (self.max_attempts, error, time.time(), job_id, worker),
+            )
+
+    @contextmanager
+    def slot(self, name: str, limit: int, holder: str, poll_interval: float = 1.0):
+        """
+        Hold one of `limit` slots of a stage shared by all workers using this queue.
+
+        Slots of crashed workers are released when their lease expires.
+        """
+        while True:
+            now = time.time()
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM slots WHERE expires < ?", (now,))
+                held = conn.execute("SELECT COUNT(*) FROM slots WHERE name = ?", (name,)).fetchone()[0]
+                if held < limit:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO slots (name, holder, expires) VALUES (?, ?, ?)",
+                        (name, holder, now + self.lease_seconds),
+                    )
+                    break
+            time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM slots WHERE name = ? AND holder = ?", (name, holder))
+
+@contextmanager
+def _no_slot():
+    yield
+
+def run_worker(queue_path: str, run_job: Callable[..., Any], stage_limits: Optional[Dict[str, int]] = None,
+               lease_seconds: float = 120, poll_interval: float = 5.0, drain: bool = False,
+               worker: Optional[str] = None):
+    """
+    Claim and run jobs until the queue is empty (with drain) or forever.
+
+    Args:
+    queue_path (str): Path of the queue database.
+    run_job: Called as run_job(topic, stage_slot=..., **options); a falsy result fails the job.
+    stage_limits (Dict[str, int]): Maximum concurrent runs of each stage across all workers.
+    lease_seconds (float): How long a job stays leased without a heartbeat.
+    poll_interval (float): Seconds to wait when the queue is empty.
+    drain (bool): Exit once no job is left instead of polling.
+    worker (str): Worker name, defaults to host and process id.
+    """
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds)
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    stage_limits = stage_limits or {}
+
+    def stage_slot(name: str):
+        if name not in stage_limits:
+            return _no_slot()
+        return queue.slot(name, stage_limits[name], f"{worker}:{threading.get_ident()}")
+
+    logger.info(f"Worker {worker} started")
+    while True:
+        job = queue.claim(worker)
+        if job is None:
+            if drain:
+                logger.info(f"Worker {worker} found no more jobs, exiting")
+                return
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker} running job {job['id']} for topic '{job['topic']}' (attempt {job['attempts'] + 1})")
+        stop = threading.Event()
+        def keep_alive(job_id=job["id"]):
+            while not stop.wait(lease_seconds / 3):
+                try:
+                    alive = queue.heartbeat(job_id, worker)
+                except Exception as e:
+                    # A missed beat is retried; the lease outlasts a few of them
+                    logger.error(f"Heartbeat of job {job_id} failed: {str(e)}")
+                    continue
+                if not alive:
+                    logger.warning(f"Job {job_id} was cancelled or reassigned")
+                    return
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            result = run_job(job["topic"], stage_slot=stage_slot, **job["options"])
+            if result:
+                queue.complete(job["id"], worker, result.model_dump() if hasattr(result, "model_dump") else result)
+                logger.info(f"Worker {worker} finished job {job['id']}")
+            else:
+                queue.fail(job["id"], worker, "Job produced no result")
+                logger.error(f"Job {job['id']} produced no result")
+        except Exception as e:
+            queue.fail(job["id"], worker, str(e))
+            logger.error(f"Job {job['id']} failed: {str(e)}")
+            logger.debug(traceback.format_exc())
+        finally:
+            stop.set()
+            heartbeat.join()
+
+def start_workers(queue_path: str, run_job: Callable[..., Any], workers: int = 2, **kwargs):
+    """
+    Run worker processes against the queue and wait for them to exit.
+    """
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(queue_path, run_job), kwargs=kwargs, name=f"worker-{i+1}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
@@ -1,23 +1,59 @@
-from openai import OpenAI
+import hashlib
 import os
+import threading
 import json
 from pydantic import BaseModel, Field
 from typing import List
 from dotenv import load_dotenv
 load_dotenv()
 
-from langsmith.wrappers import wrap_openai
+from components.cache_store import get_cache
+from components.resilience import resilient
+from logger import logger
 
 os.environ["LANGSMITH_TRACING"]="true"
 os.environ["LANGSMITH_ENDPOINT"]="https://api.smith.langchain.com"
-os.environ["LANGSMITH_API_KEY"]=os.getenv("LANGSMITH_API_KEY")
 os.environ["LANGSMITH_PROJECT"]="youtube-automation"
 
-client = wrap_openai(OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+MODEL = "gpt-4o-2024-08-06"
 
-def generate_structured_output(prompt: str, output_format):
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4o-2024-08-06",
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Create the traced OpenAI client on first use, so importing this module stays cheap.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            from langsmith.wrappers import wrap_openai
+            _client = wrap_openai(OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+        return _client
+
+_schema_hashes = {}
+
+def schema_hash(output_format) -> str:
+    """
+    SHA-256 of a Pydantic model's JSON schema, computed once per model.
+    """
+    if output_format not in _schema_hashes:
+        schema = json.dumps(output_format.model_json_schema(), sort_keys=True)
+        _schema_hashes[output_format] = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+    return _schema_hashes[output_format]
+
+def response_cache_key(prompt: str, output_format, model: str = MODEL) -> str:
+    """
+    Cache key of a structured output request: model, prompt text and response schema.
+    """
+    request = json.dumps([model, prompt, schema_hash(output_format)])
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+@resilient("openai")
+def request_structured_output(prompt: str, output_format, model: str = MODEL):
+    completion = get_client().beta.chat.completions.parse(
+        model=model,
         messages=[
             {"role": "user", "content": prompt},
         ],
@@ -26,6 +62,38 @@ def generate_structured_output(prompt: str, output_format):
     res = completion.choices[0].message.parsed
     return res.model_dump()
 
+def generate_structured_output(prompt: str, output_format, cache: bool = True, refresh: bool = False):
+    """
+    Generate a response matching output_format, reusing an earlier identical response.
+
+    Responses are cached on disk by model, prompt and the schema of output_format,
+    so re-running a topic or retrying a stage does not pay for the same request
+    twice. Cache hits skip the rate limiter.
+
+    Args:
+    prompt (str): The user prompt.
+    output_format: Pydantic model describing the response.
+    cache (bool): Set to False to bypass the cache entirely.
+    refresh (bool): Ignore a cached response and replace it with a new one.
+
+    Returns:
+    dict: The parsed response.
+    """
+    if not cache:
+        return request_structured_output(prompt, output_format)
+
+    store = get_cache("llm")
+    key = response_cache_key(prompt, output_format)
+    if not refresh:
+        cached = store.get(key)
+        if cached is not None:
+            logger.info(f"Using cached {output_format.__name__} response ({store.hits} hits, {store.misses} misses)")
+            return cached
+
+    result = request_structured_output(prompt, output_format)
+    store.set(key, result)
+    return result
+
 if __name__ == "__main__":
     # Generate scenes from a storyline
     prompt="Generate title, description and keywords for a video about Ironman"
@@ -0,0 +1,176 @@
+import fcntl
+import json
+import os
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import numpy as np
+from logger import logger
+from components.audio_mixing import SAMPLE_RATE, CHANNELS, decode_audio
+
+class MusicLibrary:
+    """
+    On-disk index of decoded background music.
+
+    Each track is decoded once into a float32 ``.npy`` file next to a JSON index
+    of its duration and sample rate. Entries are invalidated when the source
+    file's size or mtime changes. Tracks are loaded memory-mapped and read-only,
+    so every render process on a host shares the same pages.
+    """
+    INDEX_VERSION = 1
+
+    def __init__(self, music_folder: str = r'bg_musics', cache_dir: Optional[str] = None, sample_rate: int = SAMPLE_RATE):
+        self.music_folder = Path(music_folder)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.music_folder / ".cache"
+        self.sample_rate = sample_rate
+        self.index_path = self.cache_dir / "index.json"
+        self.index: Dict[str, dict] = {}
+        self.signature: Optional[Tuple] = None
+
+    @contextmanager
+    def _lock(self):
+        """
+        Serialize index updates across processes.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / "index.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == self.INDEX_VERSION and data.get("sample_rate") == self.sample_rate:
+                return data.get("tracks", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable music index {self.index_path}: {e}")
+        return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": self.INDEX_VERSION, "sample_rate": self.sample_rate, "tracks": self.index}, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _is_fresh(self, entry: Optional[dict], stat: os.stat_result) -> bool:
+        return (entry is not None
+                and entry.get("size") == stat.st_size
+                and entry.get("mtime") == stat.st_mtime
+                and (self.cache_dir / entry["pcm"]).exists())
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        stats = {f.name: f.stat() for f in self.music_folder.iterdir() if f.is_file()}
+        if not stats:
+            raise ValueError(f"No music files found in {self.music_folder}")
+        return stats
+
+    @staticmethod
+    def _signature(stats: Dict[str, os.stat_result]) -> Tuple:
+        return tuple(sorted((name, stat.st_size, stat.st_mtime_ns) for name, stat in stats.items()))
+
+    def refresh_if_changed(self) -> Dict[str, dict]:
+        """
+        Refresh the index only if a track was added, changed or removed since the last refresh.
+        """
+        stats = self._scan()
+        if self._signature(stats) == self.signature:
+            return self.index
+        return self.refresh(stats)
+
+    def refresh(self, stats: Optional[Dict[str, os.stat_result]] = None) -> Dict[str, dict]:
+        """
+        Decode new or changed tracks and drop entries for removed ones.
+        """
+        stats = stats or self._scan()
+        tracks = sorted(stats)
+        self.signature = self._signature(stats)
+
+        self.index = self._load_index()
+        if set(self.index) == set(tracks) and all(self._is_fresh(self.index[name], stats[name]) for name in tracks):
+            return self.index
+
+        with self._lock():
+            # Another process may have refreshed the index while we waited
+            self.index = self._load_index()
+            for name in tracks:
+                stat = stats[name]
+                if self._is_fresh(self.index.get(name), stat):
+                    continue
+                logger.info(f"Decoding background music {name} into the music library")
+                samples = decode_audio(str(self.music_folder / name), sample_rate=self.sample_rate)
+                pcm_name = f"{Path(name).stem}.{stat.st_size}.{int(stat.st_mtime)}.npy"
+                tmp_path = self.cache_dir / f"{pcm_name}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(samples, dtype=np.float32))
+                os.replace(tmp_path, self.cache_dir / pcm_name)
+                old = self.index.get(name)
+                if old and old["pcm"] != pcm_name and (self.cache_dir / old["pcm"]).exists():
+                    (self.cache_dir / old["pcm"]).unlink()
+                self.index[name] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "pcm": pcm_name,
+                    "samples": len(samples),
+                    "channels": CHANNELS,
+                    "sample_rate": self.sample_rate,
+                    "duration": len(samples) / self.sample_rate,
+                }
+            for name in set(self.index) - set(tracks):
+                pcm_path = self.cache_dir / self.index.pop(name)["pcm"]
+                if pcm_path.exists():
+                    pcm_path.unlink()
+            self._save_index()
+        return self.index
+
+    def load(self, name: str) -> np.ndarray:
+        """
+        Return a track's samples as a read-only memory-mapped array.
+        """
+        if name not in self.index:
+            self.refresh()
+        return np.load(self.cache_dir / self.index[name]["pcm"], mmap_mode='r')
+
+    def choose(self) -> Tuple[str, np.ndarray]:
+        """
+        Pick a random track and return its name and samples.
+        """
+        if not self.index:
+            self.refresh()
+        name = random.choice(sorted(self.index))
+        return name, self.load(name)
+
+_libraries: Dict[Tuple[str, int], MusicLibrary] = {}
+_libraries_lock = threading.Lock()
+
+def get_music_library(music_folder: str = r'bg_musics', sample_rate: int = SAMPLE_RATE) -> MusicLibrary:
+    """
+    Return the process-wide library for a music folder.
+
+    The folder is listed on every call, which costs one stat per track, and the
+    library is refreshed whenever a track was added, changed or removed, so
+    long-lived workers pick up edits to the folder.
+    """
+    key = (str(Path(music_folder).resolve()), sample_rate)
+    with _libraries_lock:
+        if key not in _libraries:
+            _libraries[key] = MusicLibrary(music_folder, sample_rate=sample_rate)
+        library = _libraries[key]
+        library.refresh_if_changed()
+    return library
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    library = get_music_library()
+    print(f"Indexed {len(library.index)} tracks in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    name, samples = library.choose()
+    print(f"Chose {name} ({len(samples) / library.sample_rate:.1f}s) in {(time.perf_counter() - start) * 1000:.2f} ms")
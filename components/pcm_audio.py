@@ -0,0 +1,169 @@
+import math
+import os
+import struct
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+import numpy as np
+from components.utils import get_ffmpeg_binary
+
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+HEADER_BYTES = 64 * 1024
+
+class PcmAudio(NamedTuple):
+    samples: np.ndarray  # float32, shape (frames, channels)
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+def write_pcm(path: str, samples: np.ndarray, sample_rate: int) -> float:
+    """
+    Save samples losslessly as a 32-bit float WAV that read_pcm can memory-map.
+
+    The header has the sample rate and frame count, and the data starts on an
+    8-byte boundary. The file is written through a temp file and os.replace.
+
+    Args:
+    path (str): WAV file to write.
+    samples (np.ndarray): Samples shaped (frames,) or (frames, channels).
+    sample_rate (int): Sample rate of the samples.
+
+    Returns:
+    float: Duration in seconds.
+    """
+    samples = np.asarray(samples, dtype='<f4')
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    frames, channels = samples.shape
+    data_size = samples.nbytes
+    header = b"".join([
+        b"RIFF", struct.pack("<I", 4 + 24 + 12 + 8 + data_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, WAVE_FORMAT_IEEE_FLOAT, channels, sample_rate,
+                             sample_rate * channels * 4, channels * 4, 32),
+        b"fact", struct.pack("<II", 4, frames),
+        b"data", struct.pack("<I", data_size),
+    ])
+
+    directory = Path(path).parent
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(np.ascontiguousarray(samples).data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return frames / sample_rate
+
+def read_pcm(path: str) -> Optional[PcmAudio]:
+    """
+    Memory-map a 32-bit float WAV read-only, without decoding or copying it.
+
+    Returns None for any other format so callers can fall back to a decoder.
+    """
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        head = f.read(HEADER_BYTES)
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(head):
+        chunk_id = head[offset:offset + 4]
+        chunk_size = struct.unpack("<I", head[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", head[offset + 8:offset + 24])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # The sub-format GUID starts with the actual format tag
+                format_tag = struct.unpack("<H", head[offset + 32:offset + 34])[0]
+            fmt = format_tag, channels, sample_rate, block_align, bits
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, sample_rate, block_align, bits = fmt
+            if format_tag != WAVE_FORMAT_IEEE_FLOAT or bits != 32 or block_align != 4 * channels:
+                return None
+            available = file_size - offset - 8
+            if chunk_size in (0, 0xFFFFFFFF) or chunk_size > available:
+                chunk_size = available
+            frames = chunk_size // block_align
+            if frames == 0:
+                return PcmAudio(np.zeros((0, channels), dtype=np.float32), sample_rate)
+            samples = np.memmap(path, dtype='<f4', mode='r', offset=offset + 8, shape=(frames, channels))
+            return PcmAudio(samples, sample_rate)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+def _next_smooth(n: int) -> int:
+    """
+    Smallest 2^a * 3^b * 5^c that is at least n, a length the FFT handles quickly.
+    """
+    best = 1 << (n - 1).bit_length()
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            # Scale by the smallest power of two that reaches n
+            best = min(best, power35 << (-(-n // power35) - 1).bit_length())
+            power35 *= 3
+        power5 *= 5
+    return best
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """
+    Band-limited resampling of (frames, channels) audio in the frequency domain.
+
+    The input is zero-padded to a length whose FFTs are fast and that maps to a
+    whole number of output frames. Returns the input unchanged when the rates
+    already match.
+    """
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    frames = int(round(len(samples) * to_rate / from_rate))
+    divisor = math.gcd(from_rate, to_rate)
+    step_in, step_out = from_rate // divisor, to_rate // divisor
+    blocks = _next_smooth(-(-len(samples) // step_in))
+    padded_in, padded_out = blocks * step_in, blocks * step_out
+
+    spectrum = np.fft.rfft(samples, n=padded_in, axis=0)
+    bins = min(len(spectrum), padded_out // 2 + 1)
+    resized = np.zeros((padded_out // 2 + 1, samples.shape[1]), dtype=spectrum.dtype)
+    resized[:bins] = spectrum[:bins]
+    resampled = np.fft.irfft(resized, n=padded_out, axis=0)[:frames]
+    return (resampled * (padded_out / padded_in)).astype(np.float32)
+
+def export_compressed(path: str, output_path: Optional[str] = None, bitrate: str = "128k") -> str:
+    """
+    Encode a PCM artifact to MP3 for when a compressed copy is actually needed.
+
+    The copy is kept next to the source and only re-encoded when the source is newer.
+
+    Returns:
+    str: Path of the MP3.
+    """
+    output_path = output_path or str(Path(path).with_suffix(".mp3"))
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(path):
+        return output_path
+    partial_path = f"{output_path}.partial.mp3"
+    cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-i", path,
+           "-c:a", "libmp3lame", "-b:a", bitrate, partial_path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise RuntimeError(f"Failed to encode {path}: {result.stderr.decode(errors='replace')}")
+    os.replace(partial_path, output_path)
+    return output_path
+
+if __name__ == "__main__":
+    import sys
+    for audio_path in sys.argv[1:]:
+        print(f"{audio_path} -> {export_compressed(audio_path)}")
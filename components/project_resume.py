@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Union
 from entity import VideoInfo, Scene
@@ -15,6 +16,8 @@ class ProjectStateManager:
         self.project_manager = project_manager
         self.state_file = None
         self.current_state = {}
+        # Stages and scene callbacks update the state from several threads
+        self._lock = threading.RLock()
     
     def initialize_state_file(self):
         """
@@ -83,10 +86,11 @@ class ProjectStateManager:
         """
         Update specific fields in the state and save.
         """
-        for key, value in kwargs.items():
-            self.current_state[key] = value
-        
-        return self._save_state()
+        with self._lock:
+            for key, value in kwargs.items():
+                self.current_state[key] = value
+            
+            return self._save_state()
     
     def get_state_value(self, key, default=None):
         """
@@ -94,6 +98,40 @@ class ProjectStateManager:
         """
         return self.current_state.get(key, default)
     
+    def get_cached_duration(self, audio_path) -> Optional[float]:
+        """
+        Get the memoized duration of an audio file if the file is unchanged.
+        """
+        entry = self.current_state.get("audio_durations", {}).get(str(audio_path))
+        if not entry:
+            return None
+        try:
+            stat = os.stat(audio_path)
+        except OSError:
+            return None
+        if entry.get("size") != stat.st_size or entry.get("mtime") != stat.st_mtime:
+            return None
+        return entry.get("duration")
+    
+    def cache_duration(self, audio_path, duration: float):
+        """
+        Memoize the duration of an audio file, keyed by its path, size and mtime.
+        """
+        stat = os.stat(audio_path)
+        with self._lock:
+            durations = dict(self.current_state.get("audio_durations", {}))
+            durations[str(audio_path)] = {"duration": duration, "size": stat.st_size, "mtime": stat.st_mtime}
+            return self.update_state(audio_durations=durations)
+    
+    def record_timing(self, name: str, seconds: float):
+        """
+        Record how long a step took, e.g. to compare generation modes.
+        """
+        with self._lock:
+            timings = dict(self.current_state.get("timings", {}))
+            timings[name] = round(seconds, 3)
+            return self.update_state(timings=timings)
+    
     def is_complete(self):
         """
         Check if the project is complete.
@@ -230,7 +268,8 @@ def convert_scene_objects_to_dict(scenes: List[Scene]) -> List[Dict]:
             "narration": scene.narration,
             "audio_path": scene.audio_path,
             "start_time": scene.start_time,
-            "duration": scene.duration
+            "duration": scene.duration,
+            "index": scene.index
         }
         for scene in scenes
     ]
@@ -247,7 +286,20 @@ def convert_dict_to_scene_objects(scene_dicts: List[Dict]) -> List[Scene]:
             narration=scene_dict.get("narration", ""),
             audio_path=scene_dict.get("audio_path", ""),
             start_time=scene_dict.get("start_time", 0),
-            duration=scene_dict.get("duration", 0)
+            duration=scene_dict.get("duration", 0),
+            index=scene_dict.get("index", position)
         )
-        for scene_dict in scene_dicts
-    ]
\ No newline at end of file
+        for position, scene_dict in enumerate(scene_dicts)
+    ]
+
+
+def retime_scenes(scenes: List[Scene]) -> List[Scene]:
+    """
+    Sort scenes by storyline position and lay them out back to back.
+    """
+    scenes.sort(key=lambda scene: scene.index)
+    current_time = 0
+    for scene in scenes:
+        scene.set_timing(current_time, scene.duration)
+        current_time += scene.duration
+    return scenes
\ No newline at end of file
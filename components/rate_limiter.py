@@ -0,0 +1,260 @@
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from logger import logger
+from constants import provider_limits
+
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", r"projects/rate_limits.sqlite3")
+
+class RateLimitError(Exception):
+    """
+    Raised by provider calls that were throttled, with the server's Retry-After if it sent one.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, given as seconds or an HTTP date.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def rate_limit_details(error: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    Whether an SDK or HTTP error is a throttle (429), and its Retry-After in seconds.
+    """
+    if isinstance(error, RateLimitError):
+        return True, error.retry_after
+    response = getattr(error, "response", None)
+    status = (getattr(error, "status_code", None) or getattr(error, "status", None)
+              or getattr(response, "status_code", None))
+    if status != 429 and type(error).__name__ not in ("RateLimitError", "ResourceExhausted"):
+        return False, None
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    return True, parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+
+class ProviderLimiter:
+    """
+    Token bucket and adaptive concurrency limit for one external provider.
+
+    The bucket and any Retry-After block live in a SQLite table, so every thread
+    and process on the host draws from the same budget. The request rate
+    follows AIMD: each success adds rate_step requests per second up to
+    max_rate, and each 429 halves it. The concurrency limit is kept in memory
+    and applies to each process separately; it adapts the same way. A
+    throttled call blocks the whole provider until the Retry-After (or a
+    jittered backoff) has passed and then retries, instead of failing the
+    pipeline.
+    """
+    def __init__(self, provider: str, max_rate: float, burst: float = 1, max_concurrency: int = 4,
+                 min_rate: Optional[float] = None, rate_step: Optional[float] = None, max_retries: int = 5,
+                 backoff: float = 1.0, db_path: str = RATE_LIMIT_DB):
+        self.provider = provider
+        self.max_rate = max_rate
+        self.min_rate = min_rate or max_rate / 20
+        self.rate_step = rate_step or max_rate / 20
+        self.burst = max(1.0, burst)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Per process, unlike the shared token bucket
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    provider TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    rate REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO buckets (provider, tokens, rate, updated) VALUES (?, ?, ?, ?)",
+                (provider, self.burst, max_rate, time.time()),
+            )
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _take_token(self) -> float:
+        """
+        Take a token from the shared bucket. Returns 0 on success, else seconds to wait.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            tokens, rate, updated, blocked_until = conn.execute(
+                "SELECT tokens, rate, updated, blocked_until FROM buckets WHERE provider = ?", (self.provider,)
+            ).fetchone()
+            tokens = min(self.burst, tokens + (now - updated) * rate)
+            if now < blocked_until:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE provider = ?", (tokens, now, self.provider))
+        return wait
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+        """
+        while True:
+            wait = self._take_token()
+            if wait <= 0:
+                return
+            # Jitter keeps waiting workers from waking up in lockstep
+            time.sleep(wait * random.uniform(1.0, 1.2))
+
+    def on_success(self):
+        with self._transaction() as conn:
+            conn.execute("UPDATE buckets SET rate = MIN(?, rate + ?) WHERE provider = ?",
+                         (self.max_rate, self.rate_step, self.provider))
+        with self._condition:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._condition.notify()
+
+    def on_throttle(self, retry_after: Optional[float], attempt: int):
+        """
+        Block the provider for Retry-After (or a jittered backoff) and halve the rate and concurrency.
+        """
+        delay = retry_after if retry_after is not None else random.uniform(0, self.backoff * 2 ** attempt)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """UPDATE buckets SET rate = MAX(?, rate / 2), tokens = MIN(tokens, 0),
+                   blocked_until = MAX(blocked_until, ?) WHERE provider = ?""",
+                (self.min_rate, now + delay, self.provider),
+            )
+        with self._condition:
+            self.concurrency = max(1.0, self.concurrency / 2)
+        logger.warning(f"{self.provider} throttled the request, backing off {delay:.1f}s")
+
+    def reserve(self, blocking: bool = True) -> bool:
+        """
+        Take a concurrency slot of this process and a token of the shared bucket for one request.
+
+        The slot is held until release is called, so a request that is still
+        running after its caller gave up on it keeps counting against the
+        limit. Without blocking, returns False at once if either is unavailable.
+        """
+        with self._condition:
+            while self.in_flight >= int(self.concurrency):
+                if not blocking:
+                    return False
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            if blocking:
+                self.acquire()
+            elif self._take_token() > 0:
+                self._free_slot()
+                return False
+        except BaseException:
+            self._free_slot()
+            raise
+        return True
+
+    def _free_slot(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def release(self, error: Optional[Exception] = None, attempt: int = 0) -> bool:
+        """
+        Free the slot of a finished request and adapt the limits to how it ended.
+
+        Args:
+        error (Exception): What the request raised, None if it succeeded.
+        attempt (int): How many times the request was throttled before, for the backoff.
+
+        Returns:
+        bool: True if the request was throttled.
+        """
+        try:
+            if error is None:
+                self.on_success()
+                return False
+            throttled, retry_after = rate_limit_details(error)
+            if throttled:
+                self.on_throttle(retry_after, attempt)
+            return throttled
+        finally:
+            self._free_slot()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call fn under the provider's limits, retrying when it is throttled.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.reserve()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self.release(e, attempt) or attempt == self.max_retries:
+                    raise
+                continue
+            self.release()
+            return result
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """
+    Return the process-wide limiter of a provider.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(provider, **provider_limits.get(provider, dict(max_rate=1)))
+        return _limiters[provider]
+
+def rate_limited(provider: str):
+    """
+    Decorator running every call of a function under a provider's limiter.
+
+    Functions that are also @resilient need not use it; resilient applies the
+    limiter to each of its attempts and hedges.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return get_limiter(provider).call(fn, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,260 @@
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+from logger import logger
+from constants import provider_resilience
+from components.rate_limiter import ProviderLimiter, get_limiter, rate_limit_details
+
+class CallTimeout(Exception):
+    """
+    Raised when a provider call does not finish within its timeout.
+    """
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the provider while its circuit breaker is open.
+    """
+
+# SDK transport errors that do not derive from the builtin ones (openai, httpx)
+TRANSIENT_ERROR_NAMES = ("APIConnectionError", "APITimeoutError", "TransportError")
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Only timeouts, connection errors and 5xx or 408 responses are retried.
+
+    Anything else, e.g. a 4xx response, a ValueError or a schema validation
+    error, fails the same way on every attempt and is raised at once.
+    """
+    if isinstance(error, (CallTimeout, TimeoutError, ConnectionError)):
+        return True
+    # requests is only checked if something already imported it
+    requests = sys.modules.get("requests")
+    if requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    response = getattr(error, "response", None)
+    status = (getattr(error, "status_code", None) or getattr(error, "status", None)
+              or getattr(response, "status_code", None))
+    return isinstance(status, int) and (500 <= status < 600 or status == 408)
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after repeated failures.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast for reset_timeout seconds. Then a single trial call is let
+    through; its outcome closes or reopens the circuit.
+    """
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                raise CircuitOpenError(f"Circuit for {self.provider} is open after {self.failures} failures")
+            self.trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.provider} closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_neutral(self):
+        """
+        End a call that says nothing about the provider's health, e.g. a 4xx or a throttle.
+        """
+        with self._lock:
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit for {self.provider} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+class ResilientCaller:
+    """
+    Per-provider timeouts, jittered retries, circuit breaking and hedged requests.
+
+    Each attempt runs in a worker thread and is abandoned once it exceeds the
+    timeout. With hedging enabled, an attempt still running after the
+    provider's observed p95 latency gets a duplicate request, and whichever
+    finishes first wins. Functions used with hedging must tolerate running
+    twice at once, e.g. by writing their output through a temp file and
+    os.replace.
+
+    Given a ProviderLimiter, every attempt and hedge takes its own token and
+    concurrency slot. The slot is freed when the request itself returns, even
+    if the attempt was abandoned, and throttled attempts are retried after the
+    limiter's backoff without using up retries. A hedge is only sent if a slot
+    and token are free at once.
+    """
+    def __init__(self, provider: str, timeout: float = 60, retries: int = 2, backoff: float = 1.0,
+                 hedge: bool = False, hedge_min_samples: int = 20, failure_threshold: int = 5,
+                 reset_timeout: float = 30):
+        self.provider = provider
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(provider, failure_threshold, reset_timeout)
+        self.latencies = deque(maxlen=200)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Worker threads of this process; a forked child gets its own, as it inherits none.
+        """
+        with self._executor_lock:
+            if self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix=f"{self.provider}-call")
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def p95(self) -> Optional[float]:
+        """
+        95th percentile latency of recent successful calls, None until enough were seen.
+        """
+        if len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _submit(self, fn: Callable[..., Any], args, kwargs, limiter: Optional[ProviderLimiter], throttles: int):
+        """
+        Start one request in a worker thread, holding a limiter slot until it returns.
+
+        Returns None if limiter is given and has no slot or token free right now.
+        """
+        if limiter is None:
+            return self.executor.submit(fn, *args, **kwargs)
+
+        def limited():
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                limiter.release(e, throttles)
+                raise
+            limiter.release()
+            return result
+        return self.executor.submit(limited)
+
+    def _attempt(self, fn: Callable[..., Any], args, kwargs, limiter: Optional[ProviderLimiter] = None,
+                 throttles: int = 0) -> Any:
+        if limiter is not None:
+            # Waiting for the limiter does not count against the timeout
+            limiter.reserve()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        hedge_at = start + self.p95() if self.hedge and self.p95() is not None else None
+        pending = {self._submit(fn, args, kwargs, limiter, throttles)}
+        error = None
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = min(deadline, hedge_at) if hedge_at else deadline
+            done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.append(time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+            if hedge_at and time.monotonic() >= hedge_at and pending:
+                hedge_at = None
+                if limiter is not None and not limiter.reserve(blocking=False):
+                    logger.info(f"{self.provider} call exceeded p95, but the rate limit leaves no room for a hedge")
+                    continue
+                logger.info(f"{self.provider} call exceeded p95, sending a hedged request")
+                pending.add(self._submit(fn, args, kwargs, limiter, throttles))
+            elif not pending:
+                raise error
+
+        raise CallTimeout(f"{self.provider} call timed out after {self.timeout:.0f}s")
+
+    def call(self, fn: Callable[..., Any], *args, limiter: Optional[ProviderLimiter] = None, **kwargs) -> Any:
+        """
+        Call fn with retries, failing fast while the provider's circuit is open.
+
+        With limiter, each attempt and hedge is sent under the provider's rate
+        and concurrency limits.
+        """
+        attempt = throttles = 0
+        while True:
+            self.breaker.allow()
+            try:
+                result = self._attempt(fn, args, kwargs, limiter, throttles)
+            except Exception as e:
+                # Throttling says nothing about the provider's health; the limiter has already backed off
+                if rate_limit_details(e)[0]:
+                    self.breaker.record_neutral()
+                    if limiter is None or throttles >= limiter.max_retries:
+                        raise
+                    throttles += 1
+                    continue
+                if not is_retryable(e):
+                    self.breaker.record_neutral()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                attempt += 1
+                logger.warning(f"{self.provider} call failed ({str(e)}), retrying in {delay:.1f}s "
+                               f"(attempt {attempt} of {self.retries})")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+_callers: Dict[str, ResilientCaller] = {}
+_callers_lock = threading.Lock()
+
+def get_resilient_caller(provider: str) -> ResilientCaller:
+    """
+    Return the process-wide resilience settings and state of a provider.
+    """
+    with _callers_lock:
+        if provider not in _callers:
+            _callers[provider] = ResilientCaller(provider, **provider_resilience.get(provider, {}))
+        return _callers[provider]
+
+def resilient(provider: str, rate_limited: bool = True):
+    """
+    Decorator running every call of a function through a provider's ResilientCaller.
+
+    With rate_limited, each attempt and hedge also goes through the provider's limiter.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            limiter = get_limiter(provider) if rate_limited else None
+            return get_resilient_caller(provider).call(fn, *args, limiter=limiter, **kwargs)
+        return wrapper
+    return decorator
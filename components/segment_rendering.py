@@ -0,0 +1,277 @@
+import os
+import hashlib
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+from entity import Scene, RenderProfile
+from logger import logger
+from components.audio_mixing import SAMPLE_RATE, load_narration
+from components.subtitles import create_subtitle_clip
+from components.utils import run_ffmpeg
+from components.video_editing import Timeline, frame_count, create_zoom_clip, apply_random_transition, write_soundtrack, resolve_frame_size
+
+# Bump when segment rendering changes so cached segments are re-rendered
+SEGMENT_FORMAT_VERSION = 3
+SUBTITLE_FONT_PATH = r"fonts/Bangers-Regular.ttf"
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Return the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def scene_segment_key(scene: Scene, index: int, frame_size, profile: RenderProfile) -> str:
+    """
+    Hash every input that affects a scene's rendered segment.
+
+    Args:
+    scene (Scene): The scene to render.
+    index (int): Position of the scene, which decides zoom direction and transition.
+    frame_size (tuple): (width, height) of the video.
+    profile (RenderProfile): Render settings of the segment.
+
+    Returns:
+    str: Hex digest identifying the segment.
+    """
+    parts = [
+        f"version={SEGMENT_FORMAT_VERSION}",
+        f"image={hash_file(scene.image_path)}",
+        f"audio={hash_file(scene.audio_path)}",
+        f"narration={scene.narration}",
+        f"frames={frame_count(scene.duration, profile.fps)}",
+        f"zoom={'in' if index % 2 == 0 else 'out'}",
+        f"transition={scene.transition_duration if index > 0 else 0}",
+        f"subtitles={profile.subtitle_font_size}:{hash_file(SUBTITLE_FONT_PATH)}",
+        f"size={frame_size[0]}x{frame_size[1]}",
+        f"fps={profile.fps}",
+        f"zoom_quality={profile.zoom_quality}",
+        f"preset={profile.preset}",
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def render_scene_segment(scene: Scene, index: int, output_path: str, frame_size, profile: RenderProfile,
+                         threads: Optional[int] = None) -> str:
+    """
+    Render one scene (zoom, subtitles, narration) to its own MP4 segment.
+
+    Every segment is encoded with the same codec settings so the segments can
+    later be joined without re-encoding. A segment has exactly the scene's
+    frame_count frames, so joined segments stay in step with the soundtrack.
+    """
+    from moviepy.editor import CompositeVideoClip
+    from moviepy.audio.AudioClip import AudioArrayClip
+    frame_width, frame_height = frame_size
+    zoom_type = 'in' if index % 2 == 0 else 'out'
+    frames = frame_count(scene.duration, profile.fps)
+    duration = frames / profile.fps
+
+    img_clip = create_zoom_clip(scene.image_path, duration, zoom_type, output_size=frame_size,
+                                quality=profile.zoom_quality)
+    if index > 0:
+        img_clip = apply_random_transition(img_clip, scene.transition_duration)
+    subtitle_clip = create_subtitle_clip(scene, frame_width, frame_height, profile.subtitle_font_size, SUBTITLE_FONT_PATH)
+
+    # Narration PCM is used as samples, without an ffmpeg decode per segment
+    audio_clip = AudioArrayClip(load_narration(scene.audio_path), fps=SAMPLE_RATE)
+    audio_clip = audio_clip.set_duration(min(audio_clip.duration, duration))
+
+    segment = CompositeVideoClip([img_clip, subtitle_clip], size=frame_size).set_duration(duration)
+    segment = segment.set_audio(audio_clip)
+
+    # Render to a partial file so an interrupted render is never reused
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = output_path.with_suffix(".partial.mp4")
+    segment.write_videofile(
+        str(partial_path),
+        fps=profile.fps,
+        codec="libx264",
+        preset=profile.preset,
+        audio_codec="aac",
+        temp_audiofile=str(output_path.with_suffix(".temp_audio.m4a")),
+        threads=threads,
+        ffmpeg_params=["-frames:v", str(frames)],
+        logger=None,
+    )
+
+    segment.close()
+    audio_clip.close()
+    os.replace(partial_path, output_path)
+    return str(output_path)
+
+def concat_segments(segment_paths: List[str], output_path: str):
+    """
+    Join MP4 segments with the ffmpeg concat demuxer using stream copy.
+    """
+    list_path = Path(output_path).with_suffix(".segments.txt")
+    with open(list_path, 'w') as f:
+        for path in segment_paths:
+            f.write(f"file '{Path(path).resolve()}'\n")
+
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy", str(output_path)])
+    finally:
+        os.remove(list_path)
+
+def mux_soundtrack(video_path: str, soundtrack_path: str, output_path: str, frames: int):
+    """
+    Replace the video's audio with the mixed soundtrack, copying the video stream.
+
+    The soundtrack lasts exactly frames frames, so all of the video is kept.
+    """
+    run_ffmpeg([
+        "-i", video_path, "-i", soundtrack_path,
+        "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-frames:v", str(frames), str(output_path),
+    ])
+
+class SegmentRenderer:
+    """
+    Renders scene segments in a process pool as scenes are submitted, then assembles them.
+
+    Scenes can be submitted in any order while their assets are still being
+    generated, so rendering overlaps with generation. Segments are named by a
+    hash of their inputs and kept in a per-profile ``segments`` directory next
+    to the output, so re-renders only redo scenes whose inputs changed.
+    """
+    def __init__(self, output_path: str, profile: RenderProfile, frame_size=None, workers: Optional[int] = None):
+        self.output_path = output_path
+        self.profile = profile
+        self.frame_size = frame_size
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.segment_dir = Path(output_path).parent / "segments" / profile.name
+        self.scenes = {}
+        self.segment_paths = {}
+        self.futures = {}
+        self.cached = 0
+        self._executor = None
+        self.start = time.perf_counter()
+
+    def submit(self, index: int, scene: Scene):
+        """
+        Queue a scene for rendering, reusing its cached segment if there is one.
+
+        Args:
+        index (int): Position of the scene, which decides zoom direction and transition.
+        scene (Scene): The scene to render.
+        """
+        if self.frame_size is None:
+            # The first scene to arrive fixes the frame size of the whole video
+            self.frame_size = resolve_frame_size(scene.image_path, self.profile)
+        try:
+            key = scene_segment_key(scene, index, self.frame_size, self.profile)
+        except Exception as e:
+            logger.error(f"Error hashing inputs for scene: {scene.description}, {e}")
+            return
+        self.scenes[index] = scene
+        self.segment_paths[index] = str(self.segment_dir / f"scene_{index+1:03d}_{key[:16]}.mp4")
+        if os.path.exists(self.segment_paths[index]):
+            self.cached += 1
+            return
+
+        if self._executor is None:
+            # Spawn rather than fork: scenes are submitted while generation threads may hold
+            # the logging or HTTP locks, which a forked child would inherit locked
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.futures[index] = self._executor.submit(render_scene_segment, scene, index, self.segment_paths[index],
+                                                    self.frame_size, self.profile, self.threads)
+        logger.info(f"Queued segment for scene {index+1}")
+
+    def assemble(self, duck_gain: Optional[float] = None) -> str:
+        """
+        Wait for the queued segments and join them into the final video.
+
+        Args:
+        duck_gain (float): Extra background music gain under narration, None to disable ducking.
+
+        Returns:
+        str: Path of the final video.
+        """
+        logger.info(f"Reusing {self.cached} cached segments, waiting for {len(self.futures)} renders")
+        try:
+            for i in sorted(self.futures):
+                try:
+                    self.futures[i].result()
+                    logger.info(f"Rendered segment for scene {i+1}")
+                except Exception as e:
+                    logger.error(f"Error rendering segment for scene: {self.scenes[i].description}, {e}")
+                    logger.debug(traceback.format_exc())
+                    del self.segment_paths[i]
+        finally:
+            self.close()
+
+        rendered = [self.segment_paths[i] for i in sorted(self.segment_paths)]
+
+        if not rendered:
+            raise ValueError("No valid video segments were rendered")
+
+        # The final audio is mixed from the narrations directly rather than the segments' tracks,
+        # on the same whole-frame layout the segments were rendered to
+        timeline = Timeline.from_scenes([self.scenes[i] for i in sorted(self.segment_paths)], fps=self.profile.fps)
+        frames = timeline.frame_ranges(self.profile.fps)[-1][1]
+        narrations = [layer for layer in timeline.layers if layer.kind == 'audio']
+
+        output_path = self.output_path
+        joined_path = str(Path(output_path).with_suffix(".joined.mp4"))
+        soundtrack_path = None
+        assembly_start = time.perf_counter()
+        try:
+            concat_segments(rendered, joined_path)
+            soundtrack_path = write_soundtrack([layer.payload for layer in narrations], [layer.start for layer in narrations],
+                                               timeline.duration, output_path, duck_gain=duck_gain)
+            mux_soundtrack(joined_path, soundtrack_path, output_path, frames)
+        finally:
+            for path in (joined_path, soundtrack_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+        prune_segments(self.segment_dir, rendered)
+        logger.info(f"Assembled {len(rendered)} segments into {output_path} in {time.perf_counter() - assembly_start:.1f}s "
+                    f"({time.perf_counter() - self.start:.1f}s since the first submission)")
+        return output_path
+
+    def close(self):
+        """
+        Shut down the render processes, dropping segments that have not started.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+def render_segments(scenes: List[Scene], output_path: str, frame_size, profile: RenderProfile,
+                    workers: Optional[int] = None, duck_gain: Optional[float] = None) -> str:
+    """
+    Render every scene to a segment in a process pool, then assemble the final video.
+
+    Args:
+    scenes (List[Scene]): Scenes in playback order.
+    output_path (str): Path of the final video.
+    frame_size (tuple): (width, height) of the video.
+    profile (RenderProfile): Render settings.
+    workers (int): Number of render processes, defaults to the CPU count.
+    duck_gain (float): Extra background music gain under narration, None to disable ducking.
+
+    Returns:
+    str: Path of the final video.
+    """
+    renderer = SegmentRenderer(output_path, profile, frame_size, workers=workers)
+    for i, scene in enumerate(scenes):
+        renderer.submit(i, scene)
+    return renderer.assemble(duck_gain=duck_gain)
+
+def prune_segments(segment_dir: Path, keep: List[str]):
+    """
+    Remove cached segments that are no longer part of the video.
+    """
+    keep = {Path(path).name for path in keep}
+    for path in segment_dir.glob("scene_*.mp4"):
+        if path.name not in keep:
+            path.unlink()
+            logger.info(f"Removed stale segment {path.name}")
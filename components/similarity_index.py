@@ -0,0 +1,351 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from logger import logger
+from constants import similarity_reuse
+from components.image_store import link_or_copy
+
+SIMILARITY_DB = os.getenv("SIMILARITY_DB", r"projects/similarity.sqlite3")
+NUM_PERM = 128
+# 16 bands of 8 rows make texts with a Jaccard similarity of about 0.7 or more candidates
+BANDS = 16
+SHINGLE_SIZE = 5
+# Candidates sharing the most bands whose signatures are compared on a lookup
+MAX_CANDIDATES = 32
+# Newest entries read from each bucket, so crowded buckets keep lookups bounded
+BUCKET_SCAN_LIMIT = 64
+
+class Match(NamedTuple):
+    id: int
+    text: str
+    asset: str
+    seconds: float  # How long generating the asset took
+    created: float
+    similarity: float
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase words without punctuation or extra spaces.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    Character shingles of the normalized text, each packed into a uint64.
+
+    Shingles are the UTF-8 bytes of every size-byte window, so they are the same
+    in every process. Texts shorter than size are a single shingle. Repeated
+    shingles are kept, as they do not change a MinHash.
+    """
+    data = normalize_text(text).encode("utf-8")
+    data += b"\0" * (max(size - len(data), 0) + 8 - size)
+    # Overlapping 8-byte reads one byte apart, masked down to size bytes
+    windows = np.ndarray((len(data) - 7,), dtype="<u8", buffer=data, strides=(1,))
+    return windows & np.uint64((1 << (8 * size)) - 1)
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index of texts, each pointing at an asset generated from it.
+
+    Texts are hashed into MinHash signatures of their character shingles, whose
+    matching positions estimate Jaccard similarity, so no embedding model or
+    network call is needed. Each signature is split into bands, and texts that
+    share a band bucket are candidates. Buckets are an indexed SQLite table
+    shared by every thread and process, so a lookup is one indexed query plus a
+    comparison of the few candidates' signatures. Texts are kept per kind, e.g.
+    the prompts of one image model or the narrations of one voice.
+    """
+    def __init__(self, path: str = SIMILARITY_DB, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed seed: signatures and buckets are stored, so the hash functions must never change
+        generator = np.random.RandomState(1)
+        self._a = generator.randint(0, 1 << 63, size=(num_perm, 1), dtype=np.int64).astype(np.uint64) * 2 + 1
+        self._b = generator.randint(0, 1 << 63, size=(num_perm, 1), dtype=np.int64).astype(np.uint64)
+        self._band_mix = generator.randint(0, 1 << 63, size=self.rows, dtype=np.int64).astype(np.uint64) * 2 + 1
+        self._band_salt = generator.randint(0, 1 << 63, size=bands, dtype=np.int64).astype(np.uint64)
+        self.hits: Dict[str, int] = {}
+        self.lookups: Dict[str, int] = {}
+        self.saved_seconds: Dict[str, float] = {}
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    digest INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    asset TEXT NOT NULL,
+                    seconds REAL NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (kind, digest)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    bucket INTEGER NOT NULL,
+                    entry INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, entry)
+                ) WITHOUT ROWID
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connection of the calling thread, reopened after a fork.
+        """
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text: num_perm uint32 values.
+
+        Each hash function is a * x + b modulo 2^64 with odd a, a permutation of
+        the shingles; the top 32 bits of its minimum are kept.
+        """
+        with np.errstate(over="ignore"):
+            permuted = self._a * shingles(text)[None, :]
+            permuted += self._b
+        return (permuted.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+    def _buckets(self, kind: str, signature: np.ndarray) -> List[int]:
+        """
+        Bucket of each band: a 64-bit hash of its rows, the band and the kind.
+        """
+        with np.errstate(over="ignore"):
+            bands = signature.reshape(self.bands, self.rows).astype(np.uint64) @ self._band_mix
+            bands ^= self._band_salt ^ np.uint64(self._digest(kind) & ((1 << 64) - 1))
+        return bands.view(np.int64).tolist()
+
+    @staticmethod
+    def _digest(text: str) -> int:
+        return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+    def add(self, kind: str, text: str, asset: str, seconds: float = 0.0):
+        """
+        Index a text and the asset generated from it, replacing an earlier entry of the same text.
+
+        Args:
+        kind (str): Namespace of the text, e.g. "image:<model>".
+        text (str): The prompt or narration.
+        asset (str): What to reuse for similar texts, e.g. an image store key or a file path.
+        seconds (float): How long generating the asset took, reported as saved on every reuse.
+        """
+        signature = self.signature(text)
+        digest = self._digest(text)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id FROM entries WHERE kind = ? AND digest = ?", (kind, digest)).fetchone()
+            if row is not None:
+                self._delete(conn, row[0])
+            entry = conn.execute(
+                """INSERT INTO entries (kind, digest, text, signature, asset, seconds, created)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (kind, digest, text, signature.tobytes(), asset, seconds, time.time()),
+            ).lastrowid
+            conn.executemany("INSERT OR IGNORE INTO buckets (bucket, entry) VALUES (?, ?)",
+                             [(bucket, entry) for bucket in self._buckets(kind, signature)])
+
+    def query(self, kind: str, text: str, threshold: float, max_candidates: int = MAX_CANDIDATES) -> List[Match]:
+        """
+        Indexed texts of a kind whose estimated Jaccard similarity to text is at least threshold.
+
+        Only the newest BUCKET_SCAN_LIMIT entries of each bucket are read, and of
+        those the max_candidates texts sharing the most bands are compared, as
+        the number of shared bands grows with similarity. This bounds the cost of
+        a lookup among many near-duplicates.
+
+        Returns:
+        List[Match]: Matches, most similar first.
+        """
+        signature = self.signature(text)
+        buckets = self._buckets(kind, signature)
+        conn = self._connection()
+        scans = " UNION ALL ".join(
+            ["SELECT * FROM (SELECT entry FROM buckets WHERE bucket = ? ORDER BY entry DESC LIMIT ?)"] * len(buckets)
+        )
+        rows = conn.execute(
+            f"""SELECT id, signature FROM entries WHERE id IN (
+                    SELECT entry FROM ({scans}) GROUP BY entry ORDER BY COUNT(*) DESC LIMIT ?)""",
+            (*[value for bucket in buckets for value in (bucket, BUCKET_SCAN_LIMIT)], max_candidates),
+        ).fetchall()
+        matches = []
+        if rows:
+            signatures = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+            similarities = (signatures == signature).mean(axis=1)
+            for (entry, _), similarity in zip(rows, similarities):
+                if similarity >= threshold:
+                    row = conn.execute("SELECT id, text, asset, seconds, created FROM entries WHERE id = ?",
+                                       (entry,)).fetchone()
+                    matches.append(Match(*row, float(similarity)))
+        matches.sort(key=lambda match: -match.similarity)
+        with self._counter_lock:
+            self.lookups[kind] = self.lookups.get(kind, 0) + 1
+        return matches
+
+    def record_hit(self, kind: str, match: Match):
+        """
+        Count a reused match, adding its generation time to the time saved.
+        """
+        with self._transaction() as conn:
+            conn.execute("UPDATE entries SET hits = hits + 1 WHERE id = ?", (match.id,))
+        with self._counter_lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            self.saved_seconds[kind] = self.saved_seconds.get(kind, 0.0) + match.seconds
+
+    def _delete(self, conn: sqlite3.Connection, entry: int):
+        row = conn.execute("SELECT kind, signature FROM entries WHERE id = ?", (entry,)).fetchone()
+        if row is None:
+            return
+        buckets = self._buckets(row[0], np.frombuffer(row[1], dtype=np.uint32))
+        conn.executemany("DELETE FROM buckets WHERE bucket = ? AND entry = ?", [(bucket, entry) for bucket in buckets])
+        conn.execute("DELETE FROM entries WHERE id = ?", (entry,))
+
+    def remove(self, entry: int):
+        """
+        Remove an entry whose asset is gone.
+        """
+        with self._transaction() as conn:
+            self._delete(conn, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Indexed texts, lifetime reuses and generation time saved per kind, and this process's counters.
+        """
+        rows = self._connection().execute(
+            "SELECT kind, COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * seconds), 0) FROM entries GROUP BY kind"
+        ).fetchall()
+        return {
+            kind: {
+                "entries": entries,
+                "total_hits": hits,
+                "total_saved_seconds": round(saved, 1),
+                "hits": self.hits.get(kind, 0),
+                "misses": self.lookups.get(kind, 0) - self.hits.get(kind, 0),
+                "saved_seconds": round(self.saved_seconds.get(kind, 0.0), 1),
+            }
+            for kind, entries, hits, saved in rows
+        }
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_similarity_index() -> SimilarityIndex:
+    """
+    Return the process-wide similarity index.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+        return _index
+
+def reuse_threshold(kind: str) -> Optional[float]:
+    """
+    Similarity threshold of an asset kind from similarity_reuse, None while reuse is off.
+    """
+    return similarity_reuse.get(kind.split(":")[0])
+
+def reuse_narration(kind: str, text: str, output_path: str) -> bool:
+    """
+    Copy the narration of an indexed text similar to text to output_path.
+
+    Narrations edited or deleted since they were indexed are dropped from the
+    index instead of being reused. Returns False if nothing similar was found.
+    """
+    threshold = reuse_threshold(kind)
+    if threshold is None or not text:
+        return False
+    index = get_similarity_index()
+    for match in index.query(kind, text, threshold):
+        try:
+            fresh = os.stat(match.asset).st_mtime <= match.created
+        except FileNotFoundError:
+            fresh = False
+        if not fresh:
+            index.remove(match.id)
+            continue
+        # Copied, not linked: narrations are edited in place before re-rendering
+        link_or_copy(match.asset, output_path, link=False)
+        index.record_hit(kind, match)
+        logger.info(f"Reused narration {match.asset} ({match.similarity:.2f} similar) for {Path(output_path).name}")
+        return True
+    return False
+
+def record_narration(kind: str, text: str, output_path: str, seconds: float):
+    """
+    Index a generated narration, if narration reuse is on.
+    """
+    if reuse_threshold(kind) is not None and text and os.path.exists(output_path):
+        get_similarity_index().add(kind, text, os.path.abspath(output_path), seconds)
+
+def with_narration_reuse(kind: str, generate_audio: Callable[[str, str], Optional[float]],
+                         generate_audio_batch: Optional[Callable[[List[Tuple[str, str]]], List[Optional[float]]]] = None):
+    """
+    Wrap TTS functions to reuse the narrations of similar texts and index new ones.
+
+    Reused narrations return no duration, so it is probed from the file.
+
+    Args:
+    kind (str): Namespace of the voice, e.g. "narration:kokoro".
+    generate_audio: TTS function (text, output_path) returning an optional duration.
+    generate_audio_batch: Optional batch TTS function taking (text, output_path) pairs.
+
+    Returns:
+    The wrapped (generate_audio, generate_audio_batch).
+    """
+    def reusing_generate_audio(text: str, output_path: str) -> Optional[float]:
+        if reuse_narration(kind, text, output_path):
+            return None
+        start = time.perf_counter()
+        duration = generate_audio(text, output_path)
+        record_narration(kind, text, output_path, time.perf_counter() - start)
+        return duration
+
+    def reusing_generate_audio_batch(items: List[Tuple[str, str]]) -> List[Optional[float]]:
+        missing = [i for i, (text, output_path) in enumerate(items) if not reuse_narration(kind, text, output_path)]
+        durations = [None] * len(items)
+        if missing:
+            start = time.perf_counter()
+            generated = generate_audio_batch([items[i] for i in missing])
+            # A batch is timed as a whole; each narration is credited an equal share
+            seconds = (time.perf_counter() - start) / len(missing)
+            for i, duration in zip(missing, generated):
+                durations[i] = duration
+                record_narration(kind, items[i][0], items[i][1], seconds)
+        return durations
+
+    return reusing_generate_audio, reusing_generate_audio_batch if generate_audio_batch is not None else None
+
+if __name__ == "__main__":
+    for kind, kind_stats in get_similarity_index().stats().items():
+        print(kind, kind_stats)
@@ -0,0 +1,152 @@
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from logger import logger
+
+class Stage(NamedTuple):
+    name: str  # Output of the stage, also its key in the project state
+    inputs: Tuple[str, ...]  # Outputs of other stages, passed to run as keyword arguments
+    run: Callable[..., Any]
+    status: Optional[str] = None  # Project status set when the stage completes
+    persist: bool = True  # Store the output in the project state
+    load: Optional[Callable[[], Any]] = None  # Rebuild the output of a completed, unpersisted stage
+
+class StageScheduler:
+    """
+    Runs pipeline stages as a dependency graph.
+
+    A stage starts as soon as all of its inputs are available, so independent
+    stages run concurrently. Each output is saved to the project state when its
+    stage completes, and stages listed in the state's ``completed_stages`` are
+    skipped on resume.
+
+    stage_slot, when given, is entered around every stage run with the stage's
+    name, e.g. to cap how many workers render at once.
+    """
+    def __init__(self, stages: List[Stage], state_manager, max_workers: int = 4,
+                 stage_slot: Optional[Callable[[str], ContextManager]] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_manager = state_manager
+        self.max_workers = max_workers
+        self.stage_slot = stage_slot
+        self.completed = set()  # Stages completed by this scheduler
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+    def _required(self, targets: Iterable[str]) -> List[str]:
+        """
+        Names of the target stages and everything they depend on, in dependency order.
+        """
+        order = []
+        def visit(name, path=()):
+            if name in path:
+                raise ValueError(f"Stage dependency cycle: {' -> '.join(path + (name,))}")
+            if name in order:
+                return
+            for dependency in self.stages[name].inputs:
+                visit(dependency, path + (name,))
+            order.append(name)
+        for name in targets:
+            visit(name)
+        return order
+
+    def _load_completed(self, stage: Stage):
+        """
+        Return (True, output) if the stage completed in an earlier run, else (False, None).
+        """
+        completed = stage.name in self.state_manager.get_state_value("completed_stages", [])
+        if stage.load is not None:
+            return (True, stage.load()) if completed else (False, None)
+        if stage.persist:
+            # Projects from before the scheduler only have the stored outputs
+            value = self.state_manager.get_state_value(stage.name)
+            if value:
+                return True, value
+        return False, None
+
+    def _complete(self, stage: Stage, value: Any, elapsed: float):
+        """
+        Persist a stage's output and mark it completed.
+        """
+        completed = list(self.state_manager.get_state_value("completed_stages", []))
+        if stage.name not in completed:
+            completed.append(stage.name)
+        updates = {"completed_stages": completed}
+        if stage.persist:
+            updates[stage.name] = value
+        if stage.status:
+            updates["status"] = stage.status
+        self.state_manager.update_state(**updates)
+        self.state_manager.record_timing(f"stage_{stage.name}", elapsed)
+        self.completed.add(stage.name)
+
+    def run(self, targets: Iterable[str], force: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Run the stages needed for the targets.
+
+        Args:
+        targets (Iterable[str]): Stages whose outputs are wanted.
+        force (Iterable[str]): Stages to run again even if they completed before.
+
+        Returns:
+        Dict[str, Any]: Outputs of the target stages and their dependencies, by stage name.
+        """
+        required = self._required(targets)
+        force = set(force)
+        values = {}
+        for name in required:
+            if name in force:
+                continue
+            done, value = self._load_completed(self.stages[name])
+            if done:
+                values[name] = value
+                logger.info(f"Using existing {name} from saved state")
+
+        pending = [name for name in required if name not in values]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as executor:
+            while pending or running:
+                for name in [name for name in pending if all(dep in values for dep in self.stages[name].inputs)]:
+                    stage = self.stages[name]
+                    logger.info(f"Starting stage {name}")
+                    kwargs = {dep: values[dep] for dep in stage.inputs}
+                    running[executor.submit(self._timed, stage, kwargs)] = name
+                    pending.remove(name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        value, elapsed = future.result()
+                        if value is None:
+                            raise RuntimeError(f"Stage {name} produced no output")
+                    except Exception:
+                        # Let stages already in flight finish so their results are not lost
+                        for other in wait(running).done:
+                            self._finish(running[other], other)
+                        raise
+                    self._complete(self.stages[name], value, elapsed)
+                    values[name] = value
+                    logger.info(f"Completed stage {name} in {elapsed:.1f}s")
+        return values
+
+    def _finish(self, name: str, future):
+        """
+        Persist the output of a stage that completed while another one failed.
+        """
+        try:
+            value, elapsed = future.result()
+        except Exception as e:
+            logger.error(f"Stage {name} failed: {str(e)}")
+            return
+        if value is not None:
+            self._complete(self.stages[name], value, elapsed)
+
+    def _timed(self, stage: Stage, kwargs: Dict[str, Any]):
+        with self.stage_slot(stage.name) if self.stage_slot else nullcontext():
+            start = time.perf_counter()
+            value = stage.run(**kwargs)
+            return value, time.perf_counter() - start
@@ -1,30 +1,90 @@
-from moviepy.editor import VideoClip, CompositeVideoClip
+from collections import OrderedDict
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 from entity import Scene
 
-def create_subtitle_clip(scene : Scene, frame_width, frame_height, font_size=64, font_path=r"fonts/Bangers-Regular.ttf"):
-    words = scene.narration.split()
-    word_positions = calculate_word_positions(words, font_size, font_path, frame_width, frame_height, position='center')
-    animation_speed = scene.duration / len(words)
-    def make_subtitle_frame(t):
-        return create_subtitle_frame(t, words, word_positions, font_size, frame_width, frame_height, font_path, animation_speed)
-    
-    subtitle_clip = VideoClip(make_subtitle_frame, duration=scene.duration)
-    subtitle_clip = subtitle_clip.set_position((0, 0)).set_mask(subtitle_clip.to_mask())
+@lru_cache(maxsize=16)
+def load_font(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
+class SubtitleRenderer:
+    """
+    Renders word-highlight subtitles for one scene.
+
+    The frame only changes when the highlighted word changes, so each
+    highlight state is rasterized once and served from a bounded cache to both
+    the subtitle clip and its mask. Rendering is limited to the horizontal band
+    holding the text, which the clip is positioned over.
+    """
+    def __init__(self, scene: Scene, frame_width, frame_height, font_size=64, font_path=r"fonts/Bangers-Regular.ttf",
+                 position='center', cache_size=4):
+        self.words = scene.narration.split()
+        self.duration = scene.duration
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.font = load_font(font_path, font_size)
+        self.font_current = load_font(font_path, font_size + 10)
+        self.animation_speed = scene.duration / len(self.words)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        word_positions = calculate_word_positions(self.words, font_size, font_path, frame_width, frame_height, position=position)
+        # Band covering every line, with room for the enlarged current word
+        top = min(y for _, y in word_positions)
+        bottom = max(y for _, y in word_positions) + int(font_size * 1.5) + font_size
+        self.band_top = max(0, top - font_size // 2)
+        self.band_height = min(frame_height, bottom) - self.band_top
+        self.word_positions = [(x, y - self.band_top) for x, y in word_positions]
+
+    def state_at(self, t):
+        return int(t / self.animation_speed)
+
+    def render_state(self, current_word_index):
+        """
+        Return (rgb, mask) for a highlight state, rasterizing it on first use.
+        """
+        if current_word_index in self._cache:
+            self._cache.move_to_end(current_word_index)
+            return self._cache[current_word_index]
+
+        frame = Image.new('RGBA', (self.frame_width, self.band_height), (0, 0, 0, 0))
+        draw_subtitle_words(frame, self.words, self.word_positions, current_word_index, self.font, self.font_current)
+        rgb = np.array(frame.convert('RGB'))
+        # Same mask MoviePy's to_mask() derives from the first channel
+        mask = rgb[:, :, 0].astype(np.float32) / 255
+
+        self._cache[current_word_index] = (rgb, mask)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rgb, mask
 
-    return subtitle_clip
+    def make_frame(self, t):
+        return self.render_state(self.state_at(t))[0]
+
+    def make_mask_frame(self, t):
+        return self.render_state(self.state_at(t))[1]
+
+    def make_clip(self):
+        from moviepy.editor import VideoClip
+        mask = VideoClip(self.make_mask_frame, ismask=True, duration=self.duration)
+        subtitle_clip = VideoClip(self.make_frame, duration=self.duration)
+        return subtitle_clip.set_position((0, self.band_top)).set_mask(mask)
+
+def create_subtitle_clip(scene : Scene, frame_width, frame_height, font_size=64, font_path=r"fonts/Bangers-Regular.ttf"):
+    renderer = SubtitleRenderer(scene, frame_width, frame_height, font_size, font_path)
+    return renderer.make_clip()
 
 def calculate_word_positions(words, font_size, font_path, frame_width, frame_height, position='center'):
-    font = ImageFont.truetype(font_path, font_size)
+    font = load_font(font_path, font_size)
     line_height = int(font_size * 1.5)
     word_space = font_size // 2
     max_width = frame_width - 100  # 50px margin on each side
-    
+
     lines = []
     current_line = []
     current_width = 0
-    
+
     for word in words:
         word_width = font.getbbox(word)[2] - font.getbbox(word)[0]
         if current_width + word_width + word_space <= max_width or not current_line:
@@ -34,16 +94,16 @@ def calculate_word_positions(words, font_size, font_path, frame_width, frame_hei
             lines.append(current_line)
             current_line = [word]
             current_width = word_width + word_space
-    
+
     if current_line:
         lines.append(current_line)
-    
+
     total_height = len(lines) * line_height
     if position == 'bottom':
         start_y = frame_height - total_height - 50  # 50px from bottom
     elif position == 'center':
         start_y = (frame_height - total_height) // 2
-    
+
     positions = []
     for i, line in enumerate(lines):
         current_x = 50  # Start with left margin
@@ -51,24 +111,18 @@ def calculate_word_positions(words, font_size, font_path, frame_width, frame_hei
             positions.append((current_x, start_y + i * line_height))
             word_width = font.getbbox(word)[2] - font.getbbox(word)[0]
             current_x += word_width + word_space
-    
+
     return positions
 
-def create_subtitle_frame(t, words, word_positions, font_size, frame_width, frame_height, font_path, animation_speed):
-    # animation_speed = 200  # milliseconds per word
-    current_word_index = int(t / animation_speed)
-    frame = Image.new('RGBA', (frame_width, frame_height), (0, 0, 0, 0))
+def draw_subtitle_words(frame, words, word_positions, current_word_index, font, font_current):
     draw = ImageDraw.Draw(frame)
-    font = ImageFont.truetype(font_path, font_size)
-    
+
     for i, (word, position) in enumerate(zip(words, word_positions)):
         is_current = i == current_word_index
         is_past = i < current_word_index
-        
+
         if is_current:
             color = (255, 255, 0, 255)  # Yellow for current word
-            font_size_current = font_size + 10
-            font_current = ImageFont.truetype(font_path, font_size_current)
             draw.text(position, word, font=font_current, fill=color)
         elif is_past:
             color = (255, 255, 255, 255)  # White for past words
@@ -76,7 +130,13 @@ def create_subtitle_frame(t, words, word_positions, font_size, frame_width, fram
         else:
             color = (128, 128, 128, 128)  # Semi-transparent gray for future words
             draw.text(position, word, font=font, fill=color)
-    
+
+def create_subtitle_frame(t, words, word_positions, font_size, frame_width, frame_height, font_path, animation_speed):
+    # animation_speed = 200  # milliseconds per word
+    current_word_index = int(t / animation_speed)
+    frame = Image.new('RGBA', (frame_width, frame_height), (0, 0, 0, 0))
+    draw_subtitle_words(frame, words, word_positions, current_word_index,
+                        load_font(font_path, font_size), load_font(font_path, font_size + 10))
+
     rgb_frame = frame.convert('RGB')
     return np.array(rgb_frame)
-   
\ No newline at end of file
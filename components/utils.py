@@ -1,4 +1,6 @@
 from entity import VideoInfo
+from typing import List
+import subprocess
 import json
 
 def save_video_info(video_info: VideoInfo, filename: str = "video_info.json"):
@@ -15,4 +17,20 @@ def save_video_info(video_info: VideoInfo, filename: str = "video_info.json"):
     data.append(video_info.model_dump())
     
     with open(filename, 'w') as f:
-        json.dump(data, f, indent=2)
\ No newline at end of file
+        json.dump(data, f, indent=2)
+
+def get_ffmpeg_binary() -> str:
+    """
+    Return the ffmpeg binary MoviePy is configured to use.
+    """
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+def run_ffmpeg(args: List[str]):
+    """
+    Run ffmpeg with the given arguments, raising with its stderr on failure.
+    """
+    cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error"] + args
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.decode(errors='replace')}")
@@ -1,14 +1,19 @@
 import random
 import os
-from typing import List
-from moviepy.editor import *
-from moviepy.video.fx.all import resize
+import time
+from pathlib import Path
+from bisect import bisect_right
+from typing import Any, List, NamedTuple, Optional
 from PIL import Image
 import numpy as np
-from entity import Scene
+from entity import Scene, RenderProfile
+from constants import render_profiles
 from logger import logger
 import traceback
 from components.subtitles import create_subtitle_clip
+from components.zoom_engine import KenBurnsEngine
+from components.audio_mixing import build_soundtrack
+from components.music_library import get_music_library
 
 def zoom_effect(clip, zoom_type='in', zoom_ratio=0.15, initial_zoom=1.5):
     """
@@ -91,63 +96,272 @@ def get_video_dimensions(image_path: str):
         print(f"An unexpected error occurred: {e}")
         return None
 
-def choose_bg_music(music_folder: str, required_duration: float):
+def frame_count(duration: float, fps: int) -> int:
     """
-    Choose background music and loop/trim it to match required duration
+    Whole frames that cover a scene of duration seconds, at least one.
+
+    Scenes are laid out in whole frames so every backend renders the same
+    frames and each scene starts on a frame boundary of the soundtrack.
+    """
+    return max(1, int(np.ceil(duration * fps - 1e-9)))
+
+class TimelineLayer(NamedTuple):
+    kind: str  # 'scene', 'subtitle' or 'audio'
+    start: float
+    end: float
+    index: int  # Position of the owning scene
+    payload: Any = None
+
+class Timeline:
+    """
+    Interval index of scenes, subtitle overlays and audio placements.
+
+    Layer boundaries are sorted once and every elementary interval between two
+    boundaries stores the layers active in it, so finding what plays at time t
+    is a binary search regardless of how many scenes the video has. Times
+    within BOUNDARY_TOLERANCE before a boundary count as after it, so frame
+    times computed by repeated addition land in the right scene.
+    """
+    BOUNDARY_TOLERANCE = 1e-9
+    VISUAL_KINDS = ('scene', 'subtitle')
+
+    def __init__(self, layers: Optional[List[TimelineLayer]] = None):
+        self.layers: List[TimelineLayer] = list(layers or [])
+        self._boundaries: List[float] = []
+        self._active: List[tuple] = []
+        self._dirty = True
+
+    @classmethod
+    def from_scenes(cls, scenes: List[Scene], audio_durations: Optional[List[float]] = None,
+                    fps: Optional[int] = None) -> "Timeline":
+        """
+        Lay scenes out back to back with their subtitles and narration.
+
+        With fps, each scene lasts a whole number of frames (see frame_count).
+        """
+        timeline = cls()
+        current_time = 0
+        current_frame = 0
+        for i, scene in enumerate(scenes):
+            if fps:
+                current_frame += frame_count(scene.duration, fps)
+                end = current_frame / fps
+            else:
+                end = current_time + scene.duration
+            timeline.add('scene', current_time, end, i, scene)
+            timeline.add('subtitle', current_time, end, i, scene)
+            audio_duration = audio_durations[i] if audio_durations else scene.duration
+            timeline.add('audio', current_time, current_time + audio_duration, i, scene.audio_path)
+            current_time = end
+        return timeline
+
+    def add(self, kind: str, start: float, end: float, index: int, payload=None) -> TimelineLayer:
+        layer = TimelineLayer(kind, float(start), float(end), index, payload)
+        self.layers.append(layer)
+        self._dirty = True
+        return layer
+
+    def _build(self):
+        """
+        Sweep the layer boundaries and record the active layers of each interval.
+        """
+        events = []
+        for order, layer in enumerate(self.layers):
+            if layer.end > layer.start:
+                events.append((layer.start, 1, order))
+                events.append((layer.end, 0, order))
+        events.sort()
+
+        active = {}
+        self._boundaries, self._active = [], []
+        i = 0
+        while i < len(events):
+            time_point = events[i][0]
+            while i < len(events) and events[i][0] == time_point:
+                _, is_start, order = events[i]
+                if is_start:
+                    active[order] = self.layers[order]
+                else:
+                    active.pop(order, None)
+                i += 1
+            # Keep insertion order so later layers draw on top
+            self._boundaries.append(time_point)
+            self._active.append(tuple(active[order] for order in sorted(active)))
+        self._dirty = False
+
+    def layers_at(self, t: float, kinds=None) -> tuple:
+        """
+        Layers active at time t, optionally restricted to some kinds, in O(log n).
+        """
+        if self._dirty:
+            self._build()
+        position = bisect_right(self._boundaries, t + self.BOUNDARY_TOLERANCE) - 1
+        if position < 0:
+            return ()
+        layers = self._active[position]
+        if kinds is None:
+            return layers
+        return tuple(layer for layer in layers if layer.kind in kinds)
+
+    def scene_at(self, t: float) -> Optional[TimelineLayer]:
+        scenes = self.layers_at(t, ('scene',))
+        return scenes[-1] if scenes else None
+
+    def scene_boundaries(self) -> List[tuple]:
+        """
+        (start, end) of every scene in playback order, for seeking and segment rendering.
+        """
+        return sorted((layer.start, layer.end) for layer in self.layers if layer.kind == 'scene')
+
+    def frame_ranges(self, fps: int) -> List[tuple]:
+        """
+        [first_frame, end_frame) of every scene at the given frame rate.
+
+        Frame f shows the scene playing at f / fps. On a timeline built with the
+        same fps the ranges are exactly each scene's frame_count.
+        """
+        tolerance = self.BOUNDARY_TOLERANCE * fps
+        return [(int(np.ceil(start * fps - tolerance)), int(np.ceil(end * fps - tolerance)))
+                for start, end in self.scene_boundaries()]
+
+    @property
+    def duration(self) -> float:
+        return max((layer.end for layer in self.layers if layer.kind in self.VISUAL_KINDS), default=0.0)
+
+def make_timeline_clip(timeline: Timeline, size):
+    """
+    Composite the clips attached to a timeline's visual layers.
+
+    Equivalent to CompositeVideoClip over the same clips, but only the layers
+    active at t are looked at, so frame cost does not grow with scene count.
+    """
+    from moviepy.editor import VideoClip
+    background = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+    def make_frame(t):
+        frame = background
+        for layer in timeline.layers_at(t, Timeline.VISUAL_KINDS):
+            frame = layer.payload.blit_on(frame, t)
+        return frame
+
+    return VideoClip(make_frame, duration=timeline.duration)
+
+def create_zoom_clip(image_path: str, duration: float, zoom_type: str = 'in', output_size=None, quality: str = "lanczos"):
+    """
+    Create a zoomed image clip backed by a precomputed KenBurnsEngine.
     
     Args:
-    music_folder (str): Path to music folder
-    required_duration (float): Required duration in seconds
+    image_path (str): Path to the scene image.
+    duration (float): Clip duration in seconds.
+    zoom_type (str): 'in' or 'out'.
+    output_size (tuple): Frame size of the clip, defaults to the image size.
+    quality (str): 'bilinear' for drafts or 'lanczos' for final renders.
     
     Returns:
-    AudioFileClip: Audio clip matching the required duration
+    VideoClip: Clip rendering the zoom effect.
     """
-    # List all files in the folder
-    music_files = [f for f in os.listdir(music_folder) if os.path.isfile(os.path.join(music_folder, f))]
-    
-    if not music_files:
-        raise ValueError(f"No music files found in {music_folder}")
+    engine = KenBurnsEngine(image_path, duration, zoom_type, output_size=output_size, quality=quality)
+    return engine.make_clip()
 
-    # Choose a random file
-    chosen_file = random.choice(music_files)
-    chosen_file_path = os.path.join(music_folder, chosen_file)
-    
-    # Load the audio file
-    bg_music = AudioFileClip(chosen_file_path)
+def write_soundtrack(narration_paths: List[str], narration_starts: List[float], duration: float, output_path: str,
+                     music_folder: str = r'bg_musics', duck_gain: Optional[float] = None) -> str:
+    """
+    Mix narrations over random background music into a WAV next to the output video.
     
-    # If music is shorter than required duration, loop it
-    if bg_music.duration < required_duration:
-        num_loops = int(np.ceil(required_duration / bg_music.duration))
-        bg_music = vfx.loop(bg_music, n=num_loops)
+    Returns:
+    str: Path of the soundtrack WAV.
+    """
+    music_name, music_samples = get_music_library(music_folder).choose()
+    logger.info(f"Selected background music {music_name}")
+    soundtrack_path = str(Path(output_path).with_suffix(".soundtrack.wav"))
+    return build_soundtrack(narration_paths, narration_starts, duration, soundtrack_path,
+                            duck_gain=duck_gain, music_samples=music_samples)
+
+def get_render_profile(profile="final", fps: Optional[int] = None, zoom_quality: Optional[str] = None) -> RenderProfile:
+    """
+    Resolve a render profile by name, applying explicit overrides.
+    """
+    if isinstance(profile, str):
+        if profile not in render_profiles:
+            raise ValueError(f"Invalid render profile: {profile}")
+        profile = render_profiles[profile]
+    overrides = {key: value for key, value in (("fps", fps), ("zoom_quality", zoom_quality)) if value is not None}
+    return profile.model_copy(update=overrides)
+
+def scale_frame_size(frame_width: int, frame_height: int, scale: float):
+    """
+    Scale video dimensions, keeping them even as yuv420p requires.
+    """
+    if scale == 1:
+        return frame_width, frame_height
+    return max(2, int(frame_width * scale) // 2 * 2), max(2, int(frame_height * scale) // 2 * 2)
+
+def resolve_frame_size(image_path: str, profile: RenderProfile):
+    """
+    Video dimensions for a profile, taken from a scene image.
+    """
+    dimensions = get_video_dimensions(image_path)
+    if dimensions is None:
+        logger.error("Error: Could not determine video dimensions. Using default 1080p.")
+        dimensions = 1920, 1080
+    return scale_frame_size(*dimensions, profile.scale)
+
+def create_advanced_video(scenes: List[Scene], output_path: str, fps: Optional[int] = None, zoom_quality: Optional[str] = None,
+                          backend: str = "moviepy", workers: Optional[int] = None, duck_gain: Optional[float] = None,
+                          profile="final"):
+    """
+    Render scenes into the final video.
     
-    # Trim to exact duration needed
-    bg_music = bg_music.subclip(0, required_duration)
-    bg_music = bg_music.volumex(0.2)
+    Args:
+    scenes (List[Scene]): Scenes in playback order.
+    output_path (str): Path of the output video.
+    fps (int): Frames per second, overriding the profile.
+    zoom_quality (str): 'bilinear' or 'lanczos' zoom resampling, overriding the profile.
+    backend (str): 'moviepy' composites everything in one clip, 'segments'
+        renders scenes in parallel and joins them without re-encoding, 'pipe'
+        writes raw frames straight into an ffmpeg process.
+    workers (int): Render processes for the 'segments' backend.
+    duck_gain (float): Extra background music gain under narration, None to disable ducking.
+    profile (str | RenderProfile): Render profile, e.g. 'final' or 'draft'.
     
-    return bg_music
-
-def create_advanced_video(scenes: List[Scene], output_path: str, fps: int = 24):
+    Returns:
+    str: Path of the output video.
+    """
     try:
+        profile = get_render_profile(profile, fps, zoom_quality)
+        fps = profile.fps
+        logger.info(f"Rendering with profile '{profile.name}' using the {backend} backend")
         video_clips = []
-        audio_clips = []
         subtitle_clips = []
-        frame_width, frame_height = get_video_dimensions(scenes[0].image_path)
-        if frame_width is None or frame_height is None:
-            logger.error("Error: Could not determine video dimensions. Using default 1080p.")
-            frame_width, frame_height = 1920, 1080
+        timeline = Timeline()
+        frame_width, frame_height = resolve_frame_size(scenes[0].image_path, profile)
 
-        current_time = 0
+        if backend == "segments":
+            from components.segment_rendering import render_segments
+            return render_segments(scenes, output_path, (frame_width, frame_height), profile, workers=workers,
+                                   duck_gain=duck_gain)
+        elif backend == "pipe":
+            from components.frame_pipe import render_with_ffmpeg_pipe
+            return render_with_ffmpeg_pipe(scenes, output_path, (frame_width, frame_height), profile,
+                                           duck_gain=duck_gain)
+        elif backend != "moviepy":
+            raise ValueError(f"Invalid render backend: {backend}")
+        from moviepy.editor import AudioFileClip
+
+        current_frame = 0
         for scene in scenes:
             try:
                 logger.info(f"Processing scene: {scene.description}")
+                # Scenes start and end on frame boundaries, like in the other backends
+                current_time = current_frame / fps
+                scene_frames = frame_count(scene.duration, fps)
+                scene_duration = scene_frames / fps
 
-                # Create image clip
-                img_clip = ImageClip(scene.image_path).set_duration(scene.duration)
-                logger.info(f"Created image clip for {scene.image_path} with duration {scene.duration}")
-
-                # Apply zoom effect
-                img_clip = zoom_effect(img_clip, 'in' if len(video_clips) % 2 == 0 else 'out')
-                logger.info(f"Applied zoom effect to image clip")
+                # Create zoomed image clip
+                zoom_type = 'in' if len(video_clips) % 2 == 0 else 'out'
+                img_clip = create_zoom_clip(scene.image_path, scene_duration, zoom_type,
+                                            output_size=(frame_width, frame_height), quality=profile.zoom_quality)
+                logger.info(f"Created {zoom_type} zoom clip for {scene.image_path} with duration {scene.duration}")
 
                 # Add transition effect
                 if len(video_clips) > 0:
@@ -155,25 +369,23 @@ def create_advanced_video(scenes: List[Scene], output_path: str, fps: int = 24):
                     logger.info(f"Applied transition effect with duration {scene.transition_duration}")
 
                 # Set start and end times
-                img_clip = img_clip.set_start(current_time).set_end(current_time + scene.duration)
-                logger.info(f"Set start time to {current_time} and end time to {current_time + scene.duration} for image clip")
-
-                # Create audio clip
-                audio_clip = AudioFileClip(scene.audio_path).set_start(current_time)
-                logger.info(f"Created audio clip for {scene.audio_path} starting at {current_time}")
+                img_clip = img_clip.set_start(current_time).set_end(current_time + scene_duration)
+                logger.info(f"Set start time to {current_time} and end time to {current_time + scene_duration} for image clip")
 
                 # Create subtitle clip
-                subtitle_clip = create_subtitle_clip(scene, frame_width, frame_height)
+                subtitle_clip = create_subtitle_clip(scene, frame_width, frame_height, font_size=profile.subtitle_font_size)
                 subtitle_clip = subtitle_clip.set_start(current_time)
                 logger.info(f"Created subtitle clip starting at {current_time}")
 
                 video_clips.append(img_clip)
-                audio_clips.append(audio_clip)
+                timeline.add('scene', current_time, current_time + scene_duration, len(video_clips) - 1, img_clip)
+                timeline.add('audio', current_time, current_time + scene.duration, len(video_clips) - 1, scene.audio_path)
                 if subtitle_clip is not None:
                     subtitle_clips.append(subtitle_clip)
+                    timeline.add('subtitle', current_time, current_time + scene_duration, len(video_clips) - 1, subtitle_clip)
 
-                current_time += scene.duration
-                logger.info(f"Updated current time to {current_time}")
+                current_frame += scene_frames
+                logger.info(f"Updated current time to {current_frame / fps}")
 
             except Exception as e:
                 logger.error(f"Error processing scene: {scene.description}, {e}")
@@ -183,25 +395,29 @@ def create_advanced_video(scenes: List[Scene], output_path: str, fps: int = 24):
         if not video_clips:
             raise ValueError("No valid video clips were created")
 
-        # Get background music matching the total video duration
-        musics_folder = r'bg_musics'
-        bg_music = choose_bg_music(musics_folder, current_time)
-        logger.info(f"Selected and processed background music from {musics_folder}")
+        # Mix narrations and background music matching the total video duration
+        narrations = [layer for layer in timeline.layers if layer.kind == 'audio']
+        soundtrack_path = write_soundtrack([layer.payload for layer in narrations], [layer.start for layer in narrations],
+                                           timeline.duration, output_path, duck_gain=duck_gain)
 
-        # Combine all clips
-        final_video = CompositeVideoClip(video_clips + subtitle_clips)
-        final_audio = CompositeAudioClip([bg_music] + audio_clips)
+        # Combine all clips through the timeline index
+        final_video = make_timeline_clip(timeline, (frame_width, frame_height))
+        final_audio = AudioFileClip(soundtrack_path)
         final_clip = final_video.set_audio(final_audio)
         
         # Write output video
-        final_clip.write_videofile(output_path, fps=fps, codec="libx264")
+        start = time.perf_counter()
+        # MoviePy steps frame times by repeated addition and can add a frame past the end
+        final_clip.write_videofile(output_path, fps=fps, codec="libx264", preset=profile.preset,
+                                   ffmpeg_params=["-frames:v", str(current_frame)])
+        logger.info(f"Wrote {output_path} with MoviePy in {time.perf_counter() - start:.1f}s")
         
         # Clean up
         final_clip.close()
         final_video.close()
         final_audio.close()
-        bg_music.close()
-        for clip in video_clips + audio_clips + subtitle_clips:
+        os.remove(soundtrack_path)
+        for clip in video_clips + subtitle_clips:
             if clip is not None:
                 clip.close()
                 
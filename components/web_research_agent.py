@@ -1,61 +1,168 @@
 import os
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import OpenAI
-from langchain_core.tools import tool
-from langchain_community.tools import TavilySearchResults
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from components.cache_store import get_cache
+from components.rate_limiter import get_limiter
+from components.resilience import get_resilient_caller
+from constants import research_subquery_templates, research_merge_template
+from logger import logger
 
 from dotenv import load_dotenv
 load_dotenv()
 
-os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
-os.environ["TAVILY_API_KEY"] = os.getenv("TAVILY_API_KEY")
 os.environ["LANGSMITH_TRACING"]="true"
 os.environ["LANGSMITH_ENDPOINT"]="https://api.smith.langchain.com"
-os.environ["LANGSMITH_API_KEY"]=os.getenv("LANGSMITH_API_KEY")
 os.environ["LANGSMITH_PROJECT"]="youtube-automation"
 
-def web_search_agent(query: str):
-    tavily_tool = TavilySearchResults(
-        max_results=10,
-        search_depth="advanced",
-        include_answer=True,
-        include_raw_content=True,
-        include_images=True,
-        # include_domains=[...],
-        # exclude_domains=[...],
-        # name="...",            # overwrite default tool name
-        # description="...",     # overwrite default tool description
-        # args_schema=...,       # overwrite default args_schema: BaseModel
-    )
-
-    tools = [tavily_tool]
+sys_prompt = '''You are an expert in web research. You must use the Tavily web research tool provided to you. Summarize all the websites researched and give the final response. This research is going to be used for a YouTube shorts script, so make sure to write in a way that is suitable for a YouTube video. Research on detailed visual description of the topic, as this will be used for generating AI imges for the video. Make sure to include a detailed description of the topic, and make it engaging for the audience.'''
+
+def select_model() -> Tuple[str, str]:
+    """
+    Pick the research model from the available API keys.
+
+    Returns:
+    Tuple[str, str]: (provider, model name).
+    """
     if "GROQ_API_KEY" in os.environ and os.environ["GROQ_API_KEY"]:
-        model = ChatGroq(model="llama-3.3-70b-versatile", temperature=0.2)
+        return "groq", "llama-3.3-70b-versatile"
     elif "GOOGLE_API_KEY" in os.environ and os.environ["GOOGLE_API_KEY"]:
-        model = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.2)
+        return "google", "gemini-2.0-flash"
     elif "OPENAI_API_KEY" in os.environ and os.environ["OPENAI_API_KEY"]:
-        model = OpenAI(model="gpt-4o-mini", temperature=0.2)
+        return "openai", "gpt-4o-mini"
     else:
-        raise ValueError("No valid API key found for GROQ or GOOGLE.")
+        raise ValueError("No valid API key found for GROQ, GOOGLE or OPENAI.")
+
+class ResearchAgent:
+    """
+    A chat model and the react agent built on it, created once per model and shared.
+
+    The agent keeps no memory between calls, so concurrent research runs on
+    the same agent do not see each other's messages.
+    """
+    def __init__(self, provider: str, model_name: str):
+        # The agent stack takes seconds to import, so it is only loaded when research runs
+        from langgraph.prebuilt import create_react_agent
+        from langchain_community.tools import TavilySearchResults
+
+        if provider == "groq":
+            from langchain_groq import ChatGroq
+            self.model = ChatGroq(model=model_name, temperature=0.2)
+        elif provider == "google":
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            self.model = ChatGoogleGenerativeAI(model=model_name, temperature=0.2)
+        else:
+            # The agent needs a chat model that can call tools
+            from langchain_openai import ChatOpenAI
+            self.model = ChatOpenAI(model=model_name, temperature=0.2)
+
+        tavily_tool = TavilySearchResults(
+            max_results=10,
+            search_depth="advanced",
+            include_answer=True,
+            include_raw_content=True,
+            include_images=True,
+        )
+        self.provider = provider
+        self.app = create_react_agent(self.model, [tavily_tool])
+
+    def _call(self, fn, *args, **kwargs):
+        return get_resilient_caller(self.provider).call(fn, *args, limiter=get_limiter(self.provider), **kwargs)
+
+    def research(self, query: str) -> str:
+        """
+        Run the tool-using agent on one query and return its summary.
+        """
+        final_state = self._call(
+            self.app.invoke,
+            {"messages": [{"role": "system", "content": sys_prompt}, {"role": "user", "content": query}]},
+        )
+        return final_state["messages"][-1].content
+
+    def complete(self, prompt: str) -> str:
+        """
+        Ask the model directly, without tools.
+        """
+        response = self._call(self.model.invoke, prompt)
+        return getattr(response, "content", response)
+
+_agents: Dict[Tuple[str, str], ResearchAgent] = {}
+_agents_lock = threading.Lock()
+
+def get_research_agent(provider: Optional[str] = None, model_name: Optional[str] = None) -> ResearchAgent:
+    """
+    Return the process-wide agent of a model, defaulting to the one select_model picks.
+    """
+    if provider is None:
+        provider, model_name = select_model()
+    with _agents_lock:
+        if (provider, model_name) not in _agents:
+            _agents[(provider, model_name)] = ResearchAgent(provider, model_name)
+        return _agents[(provider, model_name)]
+
+def normalize_topic(topic: str) -> str:
+    """
+    Cache key form of a topic: lowercase words without punctuation or extra spaces.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+def research_topic(topic: str, agent: ResearchAgent, subquery_templates: List[str] = research_subquery_templates) -> str:
+    """
+    Research focused sub-queries of a topic concurrently and merge them into one storyline.
+
+    Sub-queries that fail are left out of the merge; if all of them fail the
+    first error is raised.
+    """
+    queries = [template.format(topic=topic) for template in subquery_templates]
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="research") as executor:
+        futures = [executor.submit(agent.research, query) for query in queries]
+
+    notes, errors = [], []
+    for query, future in zip(queries, futures):
+        try:
+            notes.append(f"## {query}\n{future.result()}")
+        except Exception as e:
+            logger.warning(f"Research sub-query '{query}' failed: {str(e)}")
+            errors.append(e)
+    if not notes:
+        raise errors[0]
+    return agent.complete(research_merge_template.format(topic=topic, notes="\n\n".join(notes)))
+
+def web_search_agent(query: str, ttl: Optional[float] = None, refresh: bool = False, fan_out: bool = True) -> str:
+    """
+    Research a topic on the web and return a storyline for the video.
 
+    Storylines are cached per normalized topic, so the same topic researched
+    again within the TTL is answered from the cache.
 
-    # Initialize memory to persist state between graph runs
-    checkpointer = MemorySaver()
+    Args:
+    query (str): The topic.
+    ttl (float): Maximum age in seconds of a cached storyline, defaults to the
+        research entry of cache_limits.
+    refresh (bool): Research again even if a cached storyline exists.
+    fan_out (bool): Research sub-queries concurrently and merge them, instead of
+        running one agent over the whole topic.
 
-    app = create_react_agent(model, tools, checkpointer=checkpointer)
-    
-    sys_prompt = '''You are an expert in web research. You must use the Tavily web research tool provided to you. Summarize all the websites researched and give the final response. This research is going to be used for a YouTube shorts script, so make sure to write in a way that is suitable for a YouTube video. Research on detailed visual description of the topic, as this will be used for generating AI imges for the video. Make sure to include a detailed description of the topic, and make it engaging for the audience.'''
+    Returns:
+    str: The storyline.
+    """
+    cache = get_cache("research")
+    key = normalize_topic(query)
+    if not refresh:
+        cached = cache.get(key, max_age=ttl)
+        if cached is not None:
+            logger.info(f"Using cached research for '{query}'")
+            return cached
 
-    final_state = app.invoke(
-        {"messages": [{"role": "user", "content": query}, {"role": "system", "content": sys_prompt}]},
-        config={"configurable": {"thread_id": 42}}
-    )
-    return final_state["messages"][-1].content
+    agent = get_research_agent()
+    start = time.perf_counter()
+    storyline = research_topic(query, agent) if fan_out else agent.research(query)
+    logger.info(f"Researched '{query}' in {time.perf_counter() - start:.1f}s")
+    cache.set(key, storyline, ttl=ttl)
+    return storyline
 
 if __name__ == "__main__":
     query = "Write origin story of Ironman"
-    print(web_search_agent(query))
\ No newline at end of file
+    print(web_search_agent(query))
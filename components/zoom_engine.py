@@ -0,0 +1,136 @@
+import time
+from typing import Optional, Tuple
+from PIL import Image
+import numpy as np
+from logger import logger
+
+# Resampling filters selectable per render quality
+ZOOM_QUALITY_FILTERS = {
+    "bilinear": Image.BILINEAR,
+    "lanczos": Image.LANCZOS,
+}
+
+class KenBurnsEngine:
+    """
+    Precomputed zoom/pan engine for a single still image.
+
+    The image is decoded once and resampled once into a zoom source sized for
+    the largest zoom level the clip will reach. Every frame is then a single
+    crop-and-resample of that source straight to the output size, instead of
+    resizing the whole image and cropping it back down.
+    """
+    def __init__(self, image_path: str, duration: float, zoom_type: str = 'in', zoom_ratio: float = 0.15,
+                 initial_zoom: float = 1.5, output_size: Optional[Tuple[int, int]] = None, quality: str = "lanczos"):
+        if quality not in ZOOM_QUALITY_FILTERS:
+            raise ValueError(f"Invalid zoom quality: {quality}")
+
+        self.duration = duration
+        self.zoom_type = zoom_type
+        self.zoom_ratio = zoom_ratio
+        self.initial_zoom = initial_zoom
+        self.quality = quality
+        self.resample = ZOOM_QUALITY_FILTERS[quality]
+
+        with Image.open(image_path) as img:
+            image = img.convert('RGB')
+
+        self.output_size = tuple(output_size) if output_size else image.size
+        self.source = self._prepare_source(image)
+        self.source_scale = self.source.size[0] / self.output_size[0], self.source.size[1] / self.output_size[1]
+        logger.info(f"Prepared zoom source {self.source.size} for output {self.output_size} "
+                    f"(type={zoom_type}, quality={quality})")
+
+    def scale_at(self, t: float) -> float:
+        """
+        Zoom level at time t, matching the semantics of video_editing.zoom_effect.
+        """
+        if self.zoom_type == 'in':
+            return 1 + t * self.zoom_ratio
+        elif self.zoom_type == 'out':
+            return self.initial_zoom - t * (self.initial_zoom - 1) * self.zoom_ratio
+        return 1
+
+    def max_scale(self) -> float:
+        return max(1, self.scale_at(0), self.scale_at(self.duration))
+
+    def _prepare_source(self, image: Image.Image) -> Image.Image:
+        """
+        Resample the decoded image once to the resolution needed at peak zoom.
+
+        The source never exceeds the native image resolution, so large images
+        are mip-mapped down for small outputs (drafts) and native images are
+        used as-is for full-size renders.
+        """
+        width, height = self.output_size
+        peak = self.max_scale()
+        target = (min(image.size[0], int(np.ceil(width * peak))), min(image.size[1], int(np.ceil(height * peak))))
+        if target == image.size:
+            return image
+        return image.resize(target, self.resample, reducing_gap=3.0)
+
+    def crop_box(self, t: float) -> Tuple[float, float, float, float]:
+        """
+        Visible window at time t in source coordinates (sub-pixel, centered).
+        """
+        scale = self.scale_at(t)
+        src_w, src_h = self.source.size
+        view_w = self.output_size[0] * self.source_scale[0] / scale
+        view_h = self.output_size[1] * self.source_scale[1] / scale
+        left = (src_w - view_w) / 2
+        top = (src_h - view_h) / 2
+        return left, top, left + view_w, top + view_h
+
+    def get_frame(self, t: float) -> np.ndarray:
+        """
+        Render the frame at time t as an RGB uint8 array.
+        """
+        left, top, right, bottom = self.crop_box(t)
+        src_w, src_h = self.source.size
+        out_w, out_h = self.output_size
+
+        if left >= 0 and top >= 0 and right <= src_w and bottom <= src_h:
+            frame = self.source.resize(self.output_size, self.resample, box=(left, top, right, bottom))
+            return np.asarray(frame)
+
+        # Zoomed out past the image edges: resample the visible part and pad with black
+        box = (max(left, 0), max(top, 0), min(right, src_w), min(bottom, src_h))
+        x_scale = out_w / (right - left)
+        y_scale = out_h / (bottom - top)
+        dest_left = int(round((box[0] - left) * x_scale))
+        dest_top = int(round((box[1] - top) * y_scale))
+        dest_size = (max(1, int(round((box[2] - box[0]) * x_scale))), max(1, int(round((box[3] - box[1]) * y_scale))))
+
+        canvas = Image.new('RGB', self.output_size, (0, 0, 0))
+        canvas.paste(self.source.resize(dest_size, self.resample, box=box), (dest_left, dest_top))
+        return np.asarray(canvas)
+
+    def make_clip(self):
+        """
+        Wrap the engine in a MoviePy clip.
+        """
+        from moviepy.editor import VideoClip
+        return VideoClip(self.get_frame, duration=self.duration)
+
+if __name__ == "__main__":
+    import sys
+    from moviepy.editor import ImageClip
+    from components.video_editing import zoom_effect
+
+    image_path = sys.argv[1] if len(sys.argv) > 1 else "examples/Spiderman_origin/images/scene_1.jpg"
+    duration, fps = 6, 24
+    times = [i / fps for i in range(duration * fps)]
+
+    legacy = zoom_effect(ImageClip(image_path).set_duration(duration), 'in')
+    start = time.perf_counter()
+    for t in times:
+        legacy.get_frame(t)
+    legacy_ms = (time.perf_counter() - start) * 1000 / len(times)
+    print(f"zoom_effect: {legacy_ms:.1f} ms/frame")
+
+    for quality in ZOOM_QUALITY_FILTERS:
+        engine = KenBurnsEngine(image_path, duration, 'in', quality=quality)
+        start = time.perf_counter()
+        for t in times:
+            engine.get_frame(t)
+        engine_ms = (time.perf_counter() - start) * 1000 / len(times)
+        print(f"KenBurnsEngine[{quality}]: {engine_ms:.1f} ms/frame ({legacy_ms / engine_ms:.1f}x)")
@@ -1,3 +1,5 @@
+from entity import RenderProfile
+
 scenes_template = """
 You are a video content creator specializing in breaking down topics into engaging video scenes with narration. Given a topic and the content provided by an AI research agent, create a list of scenes with narration that capture the essence of the content while following a standard video structure. The number of scenes should be appropriate for the content, typically ranging from 4 to 5 scenes.
 
@@ -36,4 +38,103 @@ Previous Image Prompt: {previous_prompt}
 Current Scene: {scene_description}
 
 Keep the prompt to 1-2 sentences, focusing on the most impactful visual aspects that capture the scene's essence. Ensure that your prompt connects visually and thematically with the previous scene's description and prompt when provided.
-"""
\ No newline at end of file
+"""
+
+# Image prompts for all scenes in a single request
+batched_image_prompt_template = """
+You are a cinematographer creating concise image prompts for cinematic scenes and specializing in visual storytelling and cinematic narrative design. Your role is to help create compelling visual narratives that can be translated into a series of AI-generated images for video production. For each of the {scene_count} scenes below, generate a brief but evocative image prompt that includes:
+
+1. A key visual element (e.g., camera angle, lighting style)
+2. The overall mood or atmosphere
+3. A notable cinematic technique or style reference
+
+Scenes:
+{scene_descriptions}
+
+Return exactly {scene_count} prompts in the same order as the scenes. Keep each prompt to 1-2 sentences. Keep characters, color palette and style consistent across the prompts so consecutive images connect visually and thematically.
+"""
+
+# Image prompt for one scene, conditioned on the whole storyline so scenes can be prompted in parallel
+storyline_image_prompt_template = """
+You are a cinematographer creating concise image prompts for cinematic scenes and specializing in visual storytelling and cinematic narrative design. For the scene below, generate a brief but evocative image prompt that includes:
+
+1. A key visual element (e.g., camera angle, lighting style)
+2. The overall mood or atmosphere
+3. A notable cinematic technique or style reference
+
+Storyline: {storyline}
+Scene {scene_number} of {scene_count}: {scene_description}
+
+Keep the prompt to 1-2 sentences, focusing on the most impactful visual aspects that capture the scene's essence. Keep characters, color palette and style consistent with the storyline so the scene connects visually with the rest of the video.
+"""
+
+# Focused questions researched concurrently for a new topic (see components/web_research_agent.py)
+research_subquery_templates = [
+    "{topic}: the origin and the key events of the story, in order",
+    "{topic}: the main characters, their motivations and relationships",
+    "{topic}: detailed visual descriptions of the characters, costumes, places and iconic moments",
+    "{topic}: surprising facts and memorable details that would hook a YouTube audience",
+]
+
+research_merge_template = """
+You are writing the storyline of a YouTube shorts video about: {topic}
+
+Below are research notes gathered from the web on different aspects of the topic. Merge them into one engaging, coherent storyline told in order. Keep the detailed visual descriptions, as they will be used for generating AI images for the video, and drop repeated or contradictory details.
+
+{notes}
+"""
+
+# Requests per second, burst size and concurrent requests per external provider
+# (see components/rate_limiter.py). The rate and burst are shared by all workers
+# on the host; max_concurrency applies per process, so N queue workers may run
+# up to N x max_concurrency requests at once.
+provider_limits = {
+    "openai": dict(max_rate=5, burst=10, max_concurrency=8),
+    "replicate": dict(max_rate=5, burst=5, max_concurrency=4),
+    "elevenlabs": dict(max_rate=2, burst=2, max_concurrency=2),
+    "groq": dict(max_rate=0.5, burst=2, max_concurrency=2),
+    "google": dict(max_rate=1, burst=2, max_concurrency=2),
+}
+
+# Per-call timeout (seconds), retries and hedging of external providers
+# (see components/resilience.py). Hedging is off by default: a hedge is a second
+# billed request, e.g. another image or TTS generation. Add hedge=True to a
+# provider to send one once a call exceeds the provider's p95 latency.
+provider_resilience = {
+    "openai": dict(timeout=90, retries=2),
+    "replicate": dict(timeout=60, retries=2),
+    "elevenlabs": dict(timeout=45, retries=2),
+    "groq": dict(timeout=180, retries=1),
+    "google": dict(timeout=180, retries=1),
+}
+
+# Size (bytes) and age (seconds) limits of persistent caches by namespace
+# (see components/cache_store.py)
+cache_limits = {
+    "llm": dict(max_bytes=64 * 1024 * 1024, max_age=30 * 24 * 3600),
+    "research": dict(max_bytes=16 * 1024 * 1024, max_age=6 * 3600),
+    # Generated images shared across projects (see components/image_store.py)
+    "images": dict(max_bytes=2 * 1024 * 1024 * 1024),
+}
+
+# Minimum estimated Jaccard similarity for reusing the asset of a near-duplicate
+# image prompt or narration (see components/similarity_index.py). None turns
+# reuse off; values below about 0.7 find fewer of the similar texts.
+similarity_reuse = {
+    "image": None,
+    "narration": None,
+}
+
+# Named render profiles for create_advanced_video
+render_profiles = {
+    "final": RenderProfile(name="final"),
+    "draft": RenderProfile(
+        name="draft",
+        scale=0.5,
+        fps=12,
+        preset="ultrafast",
+        zoom_quality="bilinear",
+        subtitle_font_size=32,
+        output_suffix="_draft",
+    ),
+}
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 class Scenesandnarration(BaseModel):
@@ -16,6 +16,9 @@ class VideoMetadata(BaseModel):
 class ImagePrompt(BaseModel):
     image_prompt: str = Field(description="Image prompt for the scene")
 
+class ImagePrompts(BaseModel):
+    image_prompts: List[str] = Field(description="Image prompts in scene order, exactly one per scene")
+
 class VideoInfo(BaseModel):
     file_path: str
     title: str
@@ -24,6 +27,15 @@ class VideoInfo(BaseModel):
     category: str = "22"  # Default to "Entertainment" category
     privacy_status: str = "private"  # Default to private uploads
 
+class RenderProfile(BaseModel):
+    name: str
+    scale: float = 1.0  # Output resolution relative to the scene images
+    fps: int = 24
+    preset: str = "medium"  # libx264 preset
+    zoom_quality: str = "lanczos"
+    subtitle_font_size: int = 64
+    output_suffix: str = ""  # Appended to the output file name, e.g. final_video_draft.mp4
+
 class Scene(BaseModel):
     description: str
     image_path: str
@@ -32,6 +44,7 @@ class Scene(BaseModel):
     start_time: float = 0
     duration: float = 0
     transition_duration: float = 1.0
+    index: Optional[int] = None  # Position of the scene in the storyline
 
     def set_timing(self, start_time: float, duration: float):
         self.start_time = start_time
@@ -1,23 +1,30 @@
-from moviepy.editor import *
 from typing import List
 from typing import Optional
+import argparse
+import sys
 import random
 import time
 import os
 import json
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from components.web_research_agent import web_search_agent
-from components.llm_structured_output import generate_structured_output
+from components.llm_structured_output import generate_structured_output, response_cache_key
+from components.cache_store import get_cache
 from components.image_replicate import generate_image
 from components.audio_elevenlabs import generate_audio
-from constants import scenes_template, video_metadata_template, image_prompt_template
-from entity import Scenes, VideoMetadata, ImagePrompt, VideoInfo, Scene
+from constants import (scenes_template, video_metadata_template, image_prompt_template, batched_image_prompt_template,
+                       storyline_image_prompt_template, render_profiles, similarity_reuse)
+from entity import Scenes, VideoMetadata, ImagePrompt, ImagePrompts, VideoInfo, Scene
 from components.project_manager import ProjectManager
-from components.project_resume import resume_or_create_project, convert_dict_to_scene_objects, convert_scene_objects_to_dict
-from components.video_editing import create_advanced_video
+from components.project_resume import resume_or_create_project, convert_dict_to_scene_objects, convert_scene_objects_to_dict, retime_scenes
+from components.asset_pipeline import SceneAssetJob, SceneAssetResult, generate_scene_assets
+from components.stage_scheduler import Stage, StageScheduler
+from components.job_queue import DEFAULT_QUEUE_PATH, JobQueue, start_workers
 from components.utils import save_video_info
+from components.audio_probe import probe_duration
 from logger import logger
 
 from dotenv import load_dotenv
@@ -84,31 +91,103 @@ def generate_video_metadata(project_manager: ProjectManager, storyline: str, the
         logger.error(f"Error generating video metadata: {str(e)}")
 
 # Function to generate cinematic image prompts for a series of scenes
-def generate_cinematic_image_prompts(scenes):
-    """Generate cinematic image prompts for a series of scenes with error handling and logging."""
-    prompts = []
-    previous_scene = ""
-    previous_prompt = ""
+def generate_cinematic_image_prompts(scenes, mode: str = "sequential", storyline: Optional[str] = None,
+                                     state_manager=None):
+    """
+    Generate cinematic image prompts for a series of scenes with error handling and logging.
     
+    Args:
+    scenes (List[dict]): Scenes with 'scene' descriptions.
+    mode (str): 'sequential' chains one request per scene on the previous prompt,
+        'batched' asks for all prompts in one request, 'parallel' prompts every
+        scene concurrently, conditioned on the storyline.
+    storyline (str): Storyline used by the 'parallel' mode, defaults to the joined scene descriptions.
+    state_manager: Records the elapsed time under 'image_prompts_<mode>' when given.
+    
+    Returns:
+    List[str]: One image prompt per scene.
+    """
+    start = time.perf_counter()
     try:
-        for scene in scenes:
-            image_prompt = image_prompt_template.format(
-                                                        previous_scene=previous_scene,
-                                                        previous_prompt=previous_prompt,
-                                                        scene_description=scene.get('scene')
-                                                        )
-            res = generate_structured_output(prompt=image_prompt, output_format=ImagePrompt)
-
-            prompts.append(res.get('image_prompt'))
-            
-            previous_scene = scene.get('scene')
-            previous_prompt = res.get('image_prompt')
-            
-        logger.info(f"Successfully generated {len(prompts)} image prompts")
+        if mode == "sequential":
+            prompts = generate_sequential_image_prompts(scenes)
+        elif mode == "batched":
+            prompts = generate_batched_image_prompts(scenes)
+            if prompts is None:
+                logger.warning("Batched image prompts did not match the scenes, falling back to parallel prompts")
+                prompts = generate_parallel_image_prompts(scenes, storyline)
+        elif mode == "parallel":
+            prompts = generate_parallel_image_prompts(scenes, storyline)
+        else:
+            raise ValueError(f"Invalid image prompt mode: {mode}")
+        
+        elapsed = time.perf_counter() - start
+        logger.info(f"Successfully generated {len(prompts)} image prompts in {mode} mode in {elapsed:.1f}s")
+        if state_manager is not None:
+            state_manager.record_timing(f"image_prompts_{mode}", elapsed)
         return prompts
     except Exception as e:
         logger.error(f"Error in generate_cinematic_image_prompts: {str(e)}")
 
+def generate_sequential_image_prompts(scenes) -> List[str]:
+    """
+    Prompt one scene at a time, feeding back the previous scene and prompt.
+    """
+    prompts = []
+    previous_scene = ""
+    previous_prompt = ""
+    
+    for scene in scenes:
+        image_prompt = image_prompt_template.format(
+                                                    previous_scene=previous_scene,
+                                                    previous_prompt=previous_prompt,
+                                                    scene_description=scene.get('scene')
+                                                    )
+        res = generate_structured_output(prompt=image_prompt, output_format=ImagePrompt)
+
+        prompts.append(res.get('image_prompt'))
+        
+        previous_scene = scene.get('scene')
+        previous_prompt = res.get('image_prompt')
+    return prompts
+
+def generate_batched_image_prompts(scenes) -> Optional[List[str]]:
+    """
+    Prompt all scenes in a single structured request.
+    
+    A response with the wrong number of prompts is requested once more, bypassing
+    the response cache. Returns None if the model still did not return exactly one
+    prompt per scene; that response is dropped from the cache so later runs ask again.
+    """
+    scene_descriptions = "\n".join(f"{i+1}. {scene.get('scene')}" for i, scene in enumerate(scenes))
+    image_prompt = batched_image_prompt_template.format(scene_count=len(scenes), scene_descriptions=scene_descriptions)
+    for refresh in (False, True):
+        res = generate_structured_output(prompt=image_prompt, output_format=ImagePrompts, refresh=refresh)
+        prompts = res.get('image_prompts', [])
+        if len(prompts) == len(scenes):
+            return prompts
+        logger.warning(f"Expected {len(scenes)} image prompts, got {len(prompts)}")
+    get_cache("llm").delete(response_cache_key(image_prompt, ImagePrompts))
+    return None
+
+def generate_parallel_image_prompts(scenes, storyline: Optional[str] = None, max_workers: int = 4) -> List[str]:
+    """
+    Prompt every scene concurrently, conditioned on the storyline instead of the previous prompt.
+    """
+    storyline = storyline or " ".join(scene.get('scene') for scene in scenes)
+    
+    def prompt_scene(i):
+        image_prompt = storyline_image_prompt_template.format(
+                                                              storyline=storyline,
+                                                              scene_number=i + 1,
+                                                              scene_count=len(scenes),
+                                                              scene_description=scenes[i].get('scene')
+                                                              )
+        return generate_structured_output(prompt=image_prompt, output_format=ImagePrompt).get('image_prompt')
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(prompt_scene, range(len(scenes))))
+
 def custom_round(x: float, threshold: float = 0.5) -> int:
     """
     Round a number based on a threshold.
@@ -118,9 +197,14 @@ def custom_round(x: float, threshold: float = 0.5) -> int:
     
     return integer_part + (1 if fractional_part >= threshold else 0)
     
-def get_audio_duration(audio_path: str, max_retries: int = 3, retry_delay: float = 1.0) -> Optional[int]:
+def get_audio_duration(audio_path: str, max_retries: int = 3, retry_delay: float = 1.0,
+                       state_manager=None) -> Optional[float]:
     """
-    Get the duration of an audio file with robust error handling and retries.
+    Get the duration of an audio file in seconds with robust error handling and retries.
+    
+    The duration is read from the container headers when possible and only falls
+    back to decoding with MoviePy for unsupported formats. When a state manager
+    is given, results are memoized in the project state.
     """
     path = Path(audio_path)
     
@@ -136,17 +220,27 @@ def get_audio_duration(audio_path: str, max_retries: int = 3, retry_delay: float
         except Exception as e:
             raise PermissionError(f"Cannot read audio file due to permissions: {audio_path}. Error: {str(e)}")
     
+    if state_manager is not None:
+        duration = state_manager.get_cached_duration(str(path))
+        if duration is not None:
+            return duration
+    
+    try:
+        duration = probe_duration(str(path))
+    except Exception as e:
+        logger.warning(f"Could not read duration from headers of {audio_path}: {str(e)}")
+        duration = None
+    
     # Retry loop
-    for attempt in range(max_retries):
+    for attempt in range(max_retries if duration is None else 0):
         try:
+            from moviepy.editor import AudioFileClip
             clip = AudioFileClip(str(path))
             duration = clip.duration
             
             # Properly close the clip to release the file handle
             clip.close()
-            
-            # Round to nearest integer
-            return int(round(duration))
+            break
             
         except Exception as e:
             if attempt < max_retries - 1:
@@ -155,7 +249,10 @@ def get_audio_duration(audio_path: str, max_retries: int = 3, retry_delay: float
             else:
                 raise Exception(f"Failed to get audio duration after {max_retries} attempts: {str(e)}")
     
-    return None
+    if duration is not None and state_manager is not None:
+        state_manager.cache_duration(str(path), duration)
+    
+    return duration
 
 # Main function to process a storyline
 def process_storyline(project_manager: ProjectManager, storyline: str, topic: str) -> VideoInfo:
@@ -206,6 +303,7 @@ def process_storyline(project_manager: ProjectManager, storyline: str, topic: st
         # Create final video
         video_filename = f"final_video.mp4"
         video_path = project_manager.get_path("video", video_filename)
+        from components.video_editing import create_advanced_video
         create_advanced_video(scenes, str(video_path))
         logger.info("Created final video")
 
@@ -227,13 +325,44 @@ def process_storyline(project_manager: ProjectManager, storyline: str, topic: st
     except Exception as e:
         logger.error(f"Error in process_storyline: {str(e)}")
 
-def create_video_with_resume(topic: str, retries: int = 5, backoff_factor: float = 1.0, max_delay: int = 60) -> VideoInfo:
-    """Create video with resume capability, retry mechanism and error handling"""
+def create_video_with_resume(topic: str, retries: int = 5, backoff_factor: float = 1.0, max_delay: int = 60,
+                             render_backend: str = "moviepy", render_workers: Optional[int] = None,
+                             rerender: bool = False, render_profile: str = "final",
+                             image_concurrency: int = 4, audio_concurrency: int = 2, pipeline: bool = False,
+                             prompt_mode: str = "batched", stage_slot=None, tts: str = "elevenlabs") -> VideoInfo:
+    """
+    Create video with resume capability, retry mechanism and error handling.
+    
+    Set rerender to rebuild the final video of an existing project after editing
+    its images or narrations; with the 'segments' backend only changed scenes
+    are rendered again.
+    
+    A 'draft' render_profile writes a quick low-resolution preview next to the
+    final video (final_video_draft.mp4) without marking the project complete.
+    
+    Images and narrations of all pending scenes are generated concurrently, with
+    at most image_concurrency image and audio_concurrency TTS requests in flight.
+    With pipeline set, each scene's segment starts rendering as soon as its
+    assets exist, while later scenes are still being generated.
+    
+    prompt_mode selects how image prompts are generated; see
+    generate_cinematic_image_prompts.
+    
+    The steps run as a StageScheduler graph: metadata is generated while the
+    scenes, prompts and assets are, and completed stages are skipped on resume.
+    stage_slot is entered around each stage, e.g. to share stage limits
+    between queue workers.
+    
+    tts selects the narration voice: 'elevenlabs' or the local 'kokoro' model,
+    which synthesizes narrations in batches in a warm worker process.
+    """
+    profile = render_profiles[render_profile]
+    is_draft = render_profile != "final"
     # Initialize or resume project
     project_manager, state_manager, is_resumed, is_complete = resume_or_create_project("projects", topic)
     
     # Early return if project is already complete with final video
-    if is_complete:
+    if is_complete and not rerender and not is_draft:
         logger.info(f"Project for topic '{topic}' is already complete with final video")
         # Load existing video info
         metadata_path = project_manager.get_path("metadata", "video_info.json")
@@ -255,164 +384,197 @@ def create_video_with_resume(topic: str, retries: int = 5, backoff_factor: float
             # Continue with processing if we can't load the existing info
             pass
         
-    delay = backoff_factor
-
-    for attempt in range(retries):
-        try:
-            # Check if we're resuming a project or starting fresh
-            storyline = state_manager.get_state_value("storyline")
-            video_metadata = state_manager.get_state_value("video_metadata")
-            scenes_data = state_manager.get_state_value("scenes")
-            image_prompts = state_manager.get_state_value("image_prompts")
-            processed_scenes = state_manager.get_state_value("processed_scenes")
-            
-            # Step 1: Get storyline (if not already generated)
-            if not storyline:
-                logger.info("Generating new storyline...")
-                storyline = web_search_agent(topic)
-                state_manager.update_state(storyline=storyline, status="storyline_generated")
-                logger.info("Generated storyline and saved state")
-            else:
-                logger.info("Using existing storyline from saved state")
-            
-            # Step 2: Generate video metadata (if not already generated)
-            if not video_metadata:
-                logger.info("Generating video metadata...")
-                video_metadata = generate_video_metadata(project_manager, storyline, topic)
-                state_manager.update_state(video_metadata=video_metadata, status="metadata_generated")
-                logger.info("Generated video metadata and saved state")
-            else:
-                logger.info("Using existing video metadata from saved state")
-            
-            # Step 3: Generate scenes (if not already generated)
-            if not scenes_data:
-                logger.info("Generating scenes...")
-                scenes_data = generate_scenes_from_storyline(project_manager, storyline, topic)
-                state_manager.update_state(scenes=scenes_data, status="scenes_generated")
-                logger.info("Generated scenes and saved state")
-            else:
-                logger.info("Using existing scenes from saved state")
-            
-            # Step 4: Generate image prompts (if not already generated)
-            if not image_prompts:
-                logger.info("Generating image prompts...")
-                image_prompts = generate_cinematic_image_prompts(scenes_data)
-                state_manager.update_state(image_prompts=image_prompts, status="prompts_generated")
-                logger.info("Generated image prompts and saved state")
-            else:
-                logger.info("Using existing image prompts from saved state")
-            
-            # Step 5: Process scenes
-            scene_objects = []
-            
-            # Convert previously processed scenes to Scene objects
-            if processed_scenes:
-                logger.info(f"Found {len(processed_scenes)} previously processed scenes")
-                scene_objects = convert_dict_to_scene_objects(processed_scenes)
-            
-            # Process remaining scenes
-            current_time = 0
-            if scene_objects:
-                # Continue from where we left off
-                current_time = scene_objects[-1].start_time + scene_objects[-1].duration
-            
-            # Determine which scenes still need processing
-            scenes_to_process = len(scenes_data) - len(processed_scenes)
+    video_filename = f"final_video{profile.output_suffix}.mp4"
+    video_path = project_manager.get_path("video", video_filename)
+    renderer = None
+    
+    if tts == "kokoro":
+        from components.audio import generate_audio as scene_generate_audio, generate_audio_batch as scene_generate_audio_batch
+        audio_extension = ".wav"
+    elif tts == "elevenlabs":
+        scene_generate_audio, scene_generate_audio_batch = generate_audio, None
+        audio_extension = ".mp3"
+    else:
+        raise ValueError(f"Invalid TTS provider: {tts}")
+    if similarity_reuse.get("narration") is not None:
+        from components.similarity_index import with_narration_reuse
+        scene_generate_audio, scene_generate_audio_batch = with_narration_reuse(
+            f"narration:{tts}", scene_generate_audio, scene_generate_audio_batch)
+    
+    # Stage functions receive the outputs of the stages they depend on
+    def storyline_stage():
+        logger.info("Generating new storyline...")
+        return web_search_agent(topic)
+    
+    def video_metadata_stage(storyline):
+        logger.info("Generating video metadata...")
+        return generate_video_metadata(project_manager, storyline, topic)
+    
+    def scenes_stage(storyline):
+        logger.info("Generating scenes...")
+        return generate_scenes_from_storyline(project_manager, storyline, topic)
+    
+    def image_prompts_stage(scenes, storyline):
+        logger.info("Generating image prompts...")
+        return generate_cinematic_image_prompts(scenes, mode=prompt_mode, storyline=storyline,
+                                                state_manager=state_manager)
+    
+    def assets_stage(scenes, image_prompts):
+        nonlocal renderer
+        scenes_data = scenes
+        processed_scenes = state_manager.get_state_value("processed_scenes")
+        scene_objects = []
+        
+        # Convert previously processed scenes to Scene objects
+        if processed_scenes:
+            logger.info(f"Found {len(processed_scenes)} previously processed scenes")
+            scene_objects = convert_dict_to_scene_objects(processed_scenes)
+        
+        # Stream finished scenes into the segment renderer while the rest are generated
+        if pipeline and not rerender:
+            from components.segment_rendering import SegmentRenderer
+            renderer = SegmentRenderer(str(video_path), profile, workers=render_workers)
+            for scene in scene_objects:
+                renderer.submit(scene.index, scene)
+        
+        # Determine which scenes still need processing; they may have finished in any order
+        processed_indexes = {scene.index for scene in scene_objects}
+        pending_indexes = [i for i in range(len(scenes_data)) if i not in processed_indexes]
+        
+        if pending_indexes:
+            logger.info(f"Processing {len(pending_indexes)} remaining scenes...")
+            jobs = [
+                SceneAssetJob(
+                    index=i,
+                    image_prompt=image_prompts[i],
+                    narration=scenes_data[i].get('narration'),
+                    image_path=str(project_manager.get_path("image", f"scene_{i+1}.jpg")),
+                    audio_path=str(project_manager.get_path("audio", f"narration_{i+1}{audio_extension}")),
+                )
+                for i in pending_indexes
+            ]
             
-            if scenes_to_process > 0:
-                logger.info(f"Processing {scenes_to_process} remaining scenes...")
-                
-                # Skip already processed scenes
-                start_index = len(processed_scenes)
+            def on_scene_complete(result: SceneAssetResult):
+                if result.audio_duration is not None:
+                    state_manager.cache_duration(result.audio_path, result.audio_duration)
+                scene_description = scenes_data[result.index]
+                scene = Scene(
+                    description=scene_description.get('scene'),
+                    image_path=result.image_path,
+                    narration=scene_description.get('narration'),
+                    audio_path=result.audio_path,
+                    duration=get_audio_duration(result.audio_path, state_manager=state_manager),
+                    index=result.index,
+                )
+                scene_objects.append(scene)
+                retime_scenes(scene_objects)
+                if renderer:
+                    renderer.submit(scene.index, scene)
                 
-                for i in range(start_index, len(scenes_data)):
-                    scene_description = scenes_data[i]
-                    image_prompt = image_prompts[i]
-                    
-                    try:
-                        # Generate and save image
-                        image_filename = f"scene_{i+1}.jpg"
-                        image_path = project_manager.get_path("image", image_filename)
-                        
-                        # Check if image already exists
-                        if not os.path.exists(image_path):
-                            generate_image(image_prompt, str(image_path))
-                            logger.info(f"Generated image for scene {i+1}")
-                        else:
-                            logger.info(f"Using existing image for scene {i+1}")
-
-                        # Generate and save audio
-                        audio_filename = f"narration_{i+1}.mp3"
-                        audio_path = project_manager.get_path("audio", audio_filename)
-                        
-                        # Check if audio already exists
-                        if not os.path.exists(audio_path):
-                            generate_audio(scene_description.get('narration'), str(audio_path))
-                            logger.info(f"Generated audio for scene {i+1}")
-                        else:
-                            logger.info(f"Using existing audio for scene {i+1}")
-
-                        # Get audio duration
-                        audio_duration = get_audio_duration(str(audio_path))
-
-                        # Create scene object
-                        scene = Scene(
-                            description=scene_description.get('scene'),
-                            image_path=str(image_path),
-                            narration=scene_description.get('narration'),
-                            audio_path=str(audio_path),
-                            start_time=current_time,
-                            duration=audio_duration
-                        )
-                        scene_objects.append(scene)
-                        current_time += audio_duration
-                        
-                        # Update processed scenes in state
-                        processed_scenes = convert_scene_objects_to_dict(scene_objects)
-                        state_manager.update_state(
-                            processed_scenes=processed_scenes, 
-                            status="scenes_processing"
-                        )
-                        logger.info(f"Updated state with processed scene {i+1}")
-
-                    except Exception as e:
-                        logger.error(f"Error processing scene {i+1}: {str(e)}")
-                        # Continue with next scene instead of failing the entire process
-            else:
-                logger.info("All scenes already processed, skipping to video creation")
-
-            # Step 6: Create final video
-            video_filename = f"final_video.mp4"
-            video_path = project_manager.get_path("video", video_filename)
+                # Update processed scenes in state
+                state_manager.update_state(
+                    processed_scenes=convert_scene_objects_to_dict(scene_objects),
+                    status="scenes_processing"
+                )
+                logger.info(f"Updated state with processed scene {result.index+1}")
             
-            # Only create video if it doesn't exist or we're forced to recreate
-            if not os.path.exists(video_path) or state_manager.get_state_value("status") != "video_created":
-                create_advanced_video(scene_objects, str(video_path))
-                state_manager.update_state(status="video_created")
-                logger.info("Created final video and updated state")
-            else:
-                logger.info("Using existing final video")
-
-            # Step 7: Create video info
-            video_info = VideoInfo(
-                file_path=str(video_path),
-                title=video_metadata.get('title'),
-                description=video_metadata.get('description'),
-                keywords=video_metadata.get('keywords'),
+            # Provider calls already retry on their own; a scene that still fails fails the stage,
+            # and the next attempt only regenerates the missing scenes
+            results = generate_scene_assets(
+                jobs,
+                generate_image,
+                scene_generate_audio,
+                image_concurrency=image_concurrency,
+                audio_concurrency=audio_concurrency,
+                on_scene_complete=on_scene_complete,
+                generate_audio_batch=scene_generate_audio_batch,
             )
+            failed = [i + 1 for i in pending_indexes if i not in results]
+            if failed:
+                raise RuntimeError(f"Assets of scenes {failed} could not be generated")
+        else:
+            logger.info("All scenes already processed, skipping to video creation")
+        return retime_scenes(scene_objects)
+    
+    def render_stage(assets):
+        scene_objects = assets
+        
+        # Pick up edited narrations before re-rendering
+        if rerender:
+            current_time = 0
+            for scene in scene_objects:
+                scene.set_timing(current_time, get_audio_duration(scene.audio_path, state_manager=state_manager))
+                current_time += scene.duration
+            state_manager.update_state(processed_scenes=convert_scene_objects_to_dict(scene_objects))
+        
+        if renderer:
+            renderer.assemble()
+        else:
+            from components.video_editing import create_advanced_video
+            create_advanced_video(scene_objects, str(video_path), backend=render_backend, workers=render_workers,
+                                  profile=profile)
+        if is_draft:
+            state_manager.update_state(draft_video_path=str(video_path))
+        logger.info(f"Created {render_profile} video at {video_path}")
+        return str(video_path)
+    
+    def video_info_stage(video_metadata, render):
+        video_info = VideoInfo(
+            file_path=render,
+            title=video_metadata.get('title'),
+            description=video_metadata.get('description'),
+            keywords=video_metadata.get('keywords'),
+        )
+        
+        # Save video info
+        metadata_path = project_manager.get_path("metadata", "video_info.json")
+        save_video_info(video_info, str(metadata_path))
+        
+        # Mark project as complete
+        state_manager.mark_complete()
+        logger.info("Project marked as complete")
+        return video_info
+    
+    # Metadata only needs the storyline, so it is generated alongside the scenes, prompts and assets.
+    # Assets always run: they resume per scene from processed_scenes.
+    scheduler = StageScheduler([
+        Stage("storyline", (), storyline_stage, status="storyline_generated"),
+        Stage("video_metadata", ("storyline",), video_metadata_stage, status="metadata_generated"),
+        Stage("scenes", ("storyline",), scenes_stage, status="scenes_generated"),
+        Stage("image_prompts", ("scenes", "storyline"), image_prompts_stage, status="prompts_generated"),
+        Stage("assets", ("scenes", "image_prompts"), assets_stage, persist=False),
+        Stage("render", ("assets",), render_stage, status="video_created", persist=False, load=lambda: str(video_path)),
+        Stage("draft_render", ("assets",), render_stage, persist=False),
+        Stage("video_info", ("video_metadata", "render"), video_info_stage, persist=False),
+    ], state_manager, stage_slot=stage_slot)
+    
+    # Drafts are always re-rendered and never complete the project
+    if is_draft:
+        targets, force = ["draft_render", "video_metadata"], ["draft_render"]
+    else:
+        targets = ["video_info"]
+        force = ["render"] if rerender or not os.path.exists(video_path) else []
+    
+    delay = backoff_factor
 
-            # Save video info
-            metadata_path = project_manager.get_path("metadata", "video_info.json")
-            save_video_info(video_info, str(metadata_path))
-            
-            # Mark project as complete
-            state_manager.mark_complete()
-            logger.info("Project marked as complete")
-
-            return video_info
+    for attempt in range(retries):
+        renderer = None
+        try:
+            values = scheduler.run(targets, force=force)
+            if is_draft:
+                video_metadata = values["video_metadata"]
+                return VideoInfo(
+                    file_path=values["draft_render"],
+                    title=video_metadata.get('title'),
+                    description=video_metadata.get('description'),
+                    keywords=video_metadata.get('keywords'),
+                )
+            return values["video_info"]
 
         except Exception as e:
             logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
+            # Stages that completed before the failure are not forced again
+            force = [name for name in force if name not in scheduler.completed]
 
             if attempt < retries - 1:
                 sleep_time = delay + random.uniform(0, 1)
@@ -421,12 +583,103 @@ def create_video_with_resume(topic: str, retries: int = 5, backoff_factor: float
                 delay = min(max_delay, delay * 2)
             else:
                 logger.error("Max retries reached. Exiting...")
+        finally:
+            # Segments queued for a render that was skipped or failed are dropped
+            if renderer:
+                renderer.close()
+
+QUEUE_COMMANDS = ("submit", "list", "cancel", "worker")
+
+def add_video_options(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", choices=sorted(render_profiles), default="final",
+                        help="Render profile; 'draft' writes a quick preview next to the final video")
+    parser.add_argument("--backend", choices=["moviepy", "segments", "pipe"], default="moviepy",
+                        help="Video rendering backend")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes for the segments backend")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Render scene segments while later scenes are still being generated")
+    parser.add_argument("--prompt-mode", choices=["sequential", "batched", "parallel"], default="batched",
+                        help="How image prompts are generated: one chained request per scene, one request for all scenes, "
+                             "or concurrent requests conditioned on the storyline")
+    parser.add_argument("--image-concurrency", type=int, default=4, help="Maximum concurrent image generation requests")
+    parser.add_argument("--audio-concurrency", type=int, default=2, help="Maximum concurrent TTS requests")
+    parser.add_argument("--tts", choices=["elevenlabs", "kokoro"], default="elevenlabs",
+                        help="Narration voice: ElevenLabs API or the local Kokoro model")
+
+def video_options(args) -> dict:
+    """Keyword arguments of create_video_with_resume from parsed options."""
+    return dict(
+        render_backend=args.backend,
+        render_workers=args.workers,
+        render_profile=args.profile,
+        image_concurrency=args.image_concurrency,
+        audio_concurrency=args.audio_concurrency,
+        pipeline=args.pipeline,
+        prompt_mode=args.prompt_mode,
+        tts=args.tts,
+    )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create a YouTube video from a topic")
+    parser.add_argument("topic", nargs="?", default="Spiderman origin", help="Topic of the video")
+    add_video_options(parser)
+    parser.add_argument("--rerender", action="store_true", help="Re-render the video of an existing project")
+    return parser.parse_args(argv)
+
+def parse_queue_args(argv=None):
+    parser = argparse.ArgumentParser(description="Queue topics and run workers that turn them into videos")
+    # Taken after the command, which must come first for main.py to dispatch it
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Path of the job queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    submit = commands.add_parser("submit", parents=[common], help="Queue one or more topics")
+    submit.add_argument("topics", nargs="+", help="Topics of the videos")
+    add_video_options(submit)
+    
+    listing = commands.add_parser("list", parents=[common], help="Show jobs")
+    listing.add_argument("--status", choices=["queued", "running", "done", "failed", "cancelled"])
+    
+    cancel = commands.add_parser("cancel", parents=[common], help="Cancel jobs")
+    cancel.add_argument("job_ids", nargs="+", type=int)
+    
+    worker = commands.add_parser("worker", parents=[common], help="Run worker processes that pull topics from the queue")
+    worker.add_argument("--processes", type=int, default=2, help="Number of worker processes")
+    worker.add_argument("--limit", action="append", default=[], metavar="STAGE=N",
+                        help="Maximum concurrent runs of a stage across all workers, e.g. render=1")
+    worker.add_argument("--lease", type=float, default=120, help="Seconds before a silent worker's job is reclaimed")
+    worker.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    return parser.parse_args(argv)
+
+def run_queue_command(args):
+    queue = JobQueue(args.queue)
+    if args.command == "submit":
+        for topic in args.topics:
+            print(f"Queued job {queue.submit(topic, **video_options(args))}: {topic}")
+    elif args.command == "list":
+        for job in queue.list(args.status):
+            print(f"{job['id']:>5}  {job['status']:<9}  attempts={job['attempts']}  {job['topic']}"
+                  + (f"  ({job['error']})" if job['status'] == 'failed' else ""))
+    elif args.command == "cancel":
+        for job_id in args.job_ids:
+            print(f"Job {job_id}: {'cancelled' if queue.cancel(job_id) else 'not queued or running'}")
+    elif args.command == "worker":
+        stage_limits = {}
+        for limit in args.limit:
+            stage, _, count = limit.partition("=")
+            if not count.isdigit():
+                raise ValueError(f"Invalid stage limit '{limit}', expected STAGE=N")
+            stage_limits[stage] = int(count)
+        start_workers(args.queue, create_video_with_resume, workers=args.processes, stage_limits=stage_limits,
+                      lease_seconds=args.lease, drain=args.drain)
 
 if __name__ == "__main__":
     try:
-        topic = "Spiderman origin"
-        video_info = create_video_with_resume(topic=topic)
-        logger.info(f"Successfully created video: {video_info.file_path}")
+        if len(sys.argv) > 1 and sys.argv[1] in QUEUE_COMMANDS:
+            run_queue_command(parse_queue_args())
+        else:
+            args = parse_args()
+            video_info = create_video_with_resume(topic=args.topic, rerender=args.rerender, **video_options(args))
+            logger.info(f"Successfully created video: {video_info.file_path}")
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-
@@ -0,0 +1,11 @@
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    # Fonts and background music are looked up relative to the repository root
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,91 @@
+import threading
+import time
+from components.asset_pipeline import SceneAssetJob, generate_scene_assets
+
+def make_jobs(tmp_path, count):
+    return [SceneAssetJob(i, f"prompt {i}", f"narration {i}", str(tmp_path / f"scene_{i}.jpg"),
+                          str(tmp_path / f"narration_{i}.wav")) for i in range(count)]
+
+def write(path):
+    with open(path, "w") as f:
+        f.write("asset")
+
+def test_generates_every_scene_and_reports_durations(tmp_path):
+    jobs = make_jobs(tmp_path, 5)
+    completed = []
+
+    def generate_audio(narration, path):
+        write(path)
+        return len(narration) / 10
+
+    results = generate_scene_assets(jobs, lambda prompt, path: write(path), generate_audio,
+                                    on_scene_complete=completed.append)
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    assert sorted(result.index for result in completed) == [0, 1, 2, 3, 4]
+    assert results[3].audio_duration == 1.1
+
+def test_caps_concurrency_per_provider(tmp_path):
+    running = {"image": 0, "audio": 0}
+    peak = dict(running)
+    lock = threading.Lock()
+
+    def provider(kind):
+        def generate(text, path):
+            with lock:
+                running[kind] += 1
+                peak[kind] = max(peak[kind], running[kind])
+            time.sleep(0.02)
+            with lock:
+                running[kind] -= 1
+            write(path)
+        return generate
+
+    generate_scene_assets(make_jobs(tmp_path, 8), provider("image"), provider("audio"),
+                          image_concurrency=3, audio_concurrency=1)
+    assert peak == {"image": 3, "audio": 1}
+
+def test_reuses_existing_assets(tmp_path):
+    jobs = make_jobs(tmp_path, 2)
+    write(jobs[0].image_path)
+    write(jobs[0].audio_path)
+    generated = []
+
+    def generate(text, path):
+        generated.append(path)
+        write(path)
+
+    results = generate_scene_assets(jobs, generate, generate)
+    assert sorted(generated) == sorted([jobs[1].image_path, jobs[1].audio_path])
+    assert results[0].audio_duration is None
+
+def test_failed_scene_does_not_stop_others(tmp_path):
+    jobs = make_jobs(tmp_path, 3)
+    failed = []
+
+    def generate_image(prompt, path):
+        if prompt == "prompt 1":
+            raise RuntimeError("provider error")
+        write(path)
+
+    results = generate_scene_assets(jobs, generate_image, lambda narration, path: write(path),
+                                    on_scene_failed=lambda index, error: failed.append(index))
+    assert sorted(results) == [0, 2]
+    assert failed == [1]
+
+def test_batches_narrations(tmp_path):
+    jobs = make_jobs(tmp_path, 5)
+    write(jobs[2].audio_path)
+    batches = []
+
+    def generate_audio_batch(pairs):
+        batches.append([narration for narration, _ in pairs])
+        for _, path in pairs:
+            write(path)
+        return [1.0] * len(pairs)
+
+    results = generate_scene_assets(jobs, lambda prompt, path: write(path), None,
+                                    generate_audio_batch=generate_audio_batch, audio_batch_size=3)
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    assert batches == [["narration 0", "narration 1", "narration 3"], ["narration 4"]]
+    assert results[2].audio_duration is None
+    assert results[4].audio_duration == 1.0
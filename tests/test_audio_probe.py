@@ -0,0 +1,61 @@
+import glob
+import struct
+import numpy as np
+import pytest
+from components.audio_mixing import decode_audio
+from components.audio_probe import Mp3FrameCounter, probe_duration, probe_wav_duration
+from components.pcm_audio import write_pcm
+from components.utils import run_ffmpeg
+
+EXAMPLE_MP3S = sorted(glob.glob("examples/Spiderman_origin/audio/*.mp3"))
+
+def decoded_duration(path: str, sample_rate: int = 44100) -> float:
+    return len(decode_audio(path, sample_rate)) / sample_rate
+
+@pytest.mark.parametrize("path", EXAMPLE_MP3S)
+def test_example_mp3s_match_decoded_length(path):
+    assert probe_duration(path) == pytest.approx(decoded_duration(path), abs=1e-3)
+
+@pytest.mark.parametrize("path", EXAMPLE_MP3S[:2])
+def test_streamed_mp3_matches_probe(path):
+    data = open(path, "rb").read()
+    counter = Mp3FrameCounter()
+    for start in range(0, len(data), 777):
+        counter.feed(data[start:start + 777])
+    assert counter.duration == pytest.approx(probe_duration(path))
+
+def test_generated_mp3_with_and_without_xing_header(tmp_path):
+    paths = {}
+    for xing in ("1", "0"):
+        paths[xing] = str(tmp_path / f"tone_{xing}.mp3")
+        run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=1.5", "-ar", "24000", "-write_xing", xing, paths[xing]])
+    # The Xing frame count and the frame walk both include the encoder delay, which
+    # a decoder can only trim with the Xing header
+    assert probe_duration(paths["1"]) == pytest.approx(probe_duration(paths["0"]))
+    assert probe_duration(paths["0"]) == pytest.approx(decoded_duration(paths["0"], 24000), abs=1e-3)
+    assert probe_duration(paths["1"]) == pytest.approx(1.5, abs=0.1)
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_float32_wav(tmp_path, channels):
+    path = str(tmp_path / "narration.wav")
+    samples = np.zeros((36_017, channels), dtype=np.float32)
+    write_pcm(path, samples, 24000)
+    assert probe_duration(path) == pytest.approx(36_017 / 24000)
+
+def test_int16_wav(tmp_path):
+    path = str(tmp_path / "tone.wav")
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=0.75", "-ar", "16000", "-c:a", "pcm_s16le", path])
+    assert probe_duration(path) == pytest.approx(0.75, abs=1e-4)
+
+def test_streamed_wav_without_data_size():
+    header = b"".join([
+        b"RIFF", struct.pack("<I", 0xFFFFFFFF), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, 1, 8000, 16000, 2, 16),
+        b"data", struct.pack("<I", 0xFFFFFFFF),
+    ])
+    assert probe_wav_duration(header, file_size=len(header) + 16000) == pytest.approx(1.0)
+
+def test_unknown_format(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not audio at all" * 100)
+    assert probe_duration(str(path)) is None
@@ -0,0 +1,86 @@
+import sqlite3
+import time
+import pytest
+from components.cache_store import CacheStore
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+def test_round_trip_and_counters(path):
+    cache = CacheStore("llm", path=path)
+    assert cache.get("key") is None
+    cache.set("key", {"image_prompts": ["a", "b"], "score": 1.5})
+    assert cache.get("key") == {"image_prompts": ["a", "b"], "score": 1.5}
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+def test_namespaces_are_separate_and_shared_across_instances(path):
+    CacheStore("llm", path=path).set("key", "response")
+    assert CacheStore("llm", path=path).get("key") == "response"
+    assert CacheStore("research", path=path).get("key") is None
+
+def test_delete_and_clear(path):
+    cache = CacheStore("llm", path=path)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+def test_evicts_least_recently_used_over_max_bytes(path, monkeypatch):
+    monkeypatch.setattr("components.cache_store.ACCESS_RESOLUTION", 0)
+    cache = CacheStore("llm", max_bytes=25, path=path)
+    cache.set("a", "x" * 8)
+    cache.set("b", "y" * 8)
+    time.sleep(0.01)
+    assert cache.get("a") is not None
+    cache.set("c", "z" * 8)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 8
+    assert cache.get("c") == "z" * 8
+
+def test_entries_expire_after_max_age(path):
+    cache = CacheStore("research", max_age=0.1, path=path)
+    cache.set("topic", "storyline")
+    assert cache.get("topic") == "storyline"
+    time.sleep(0.15)
+    assert cache.get("topic") is None
+    assert cache.evict() == 1
+
+def test_ttl_longer_than_max_age_survives_eviction(path):
+    cache = CacheStore("research", max_age=0.1, path=path)
+    cache.set("long", "storyline", ttl=60)
+    cache.set("short", "storyline")
+    time.sleep(0.15)
+    cache.set("other", "storyline")
+    assert cache.get("long") == "storyline"
+    assert cache.get("short") is None
+
+def test_ttl_shorter_than_max_age_expires(path):
+    cache = CacheStore("research", max_age=60, path=path)
+    cache.set("topic", "storyline", ttl=0.1)
+    time.sleep(0.15)
+    assert cache.get("topic") is None
+    assert cache.evict() == 1
+
+def test_lookup_max_age_overrides_ttl(path):
+    cache = CacheStore("research", max_age=0.1, path=path)
+    cache.set("topic", "storyline", ttl=60)
+    time.sleep(0.05)
+    assert cache.get("topic", max_age=0.01) is None
+    assert cache.get("topic") == "storyline"
+
+def test_adds_expiry_column_to_existing_databases(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE entries (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                    size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL,
+                    PRIMARY KEY (namespace, key))""")
+    conn.execute("INSERT INTO entries VALUES ('research', 'topic', '\"storyline\"', 11, ?, ?)", (time.time(), time.time()))
+    conn.commit()
+    conn.close()
+    cache = CacheStore("research", max_age=60, path=path)
+    assert cache.get("topic") == "storyline"
+    cache.set("new", "storyline", ttl=120)
+    assert cache.get("new") == "storyline"
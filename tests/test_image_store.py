@@ -0,0 +1,84 @@
+import os
+import pytest
+import components.image_store as image_store
+from components.image_store import ImageStore, image_key
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / "store"), max_bytes=250)
+
+def make_image(tmp_path, name, size=100):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+def test_image_key_depends_on_every_input():
+    key = image_key("flux", {"prompt": "a city", "seed": 1})
+    assert key == image_key("flux", {"seed": 1, "prompt": "a city"})
+    assert key != image_key("flux", {"prompt": "a city", "seed": 2})
+    assert key != image_key("sdxl", {"prompt": "a city", "seed": 1})
+
+def test_fetch_links_stored_image(tmp_path, store):
+    source = make_image(tmp_path, "generated.jpg")
+    store.add("a", source, seconds=4.0)
+    output = tmp_path / "project" / "images" / "scene_1.jpg"
+    assert store.fetch("a", str(output))
+    assert output.read_bytes() == open(source, "rb").read()
+    assert not store.fetch("missing", str(tmp_path / "other.jpg"))
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (1, 1, 4.0)
+
+def test_evicts_least_recently_used(tmp_path, store):
+    store.add("a", make_image(tmp_path, "a.jpg"))
+    store.add("b", make_image(tmp_path, "b.jpg"))
+    assert store.fetch("a", str(tmp_path / "out_a.jpg"))
+    store.add("c", make_image(tmp_path, "c.jpg"))
+    assert store.stats()["entries"] == 2
+    assert not store.fetch("b", str(tmp_path / "out_b.jpg"))
+    assert not store.object_path("b").exists()
+    # Projects keep their copy of an evicted image
+    assert (tmp_path / "out_a.jpg").exists()
+    assert store.fetch("a", str(tmp_path / "out_a2.jpg"))
+    assert store.fetch("c", str(tmp_path / "out_c.jpg"))
+
+def test_modified_object_is_dropped(tmp_path, store):
+    store.add("a", make_image(tmp_path, "a.jpg"))
+    output = tmp_path / "out.jpg"
+    assert store.fetch("a", str(output))
+    # Editing the project's hardlink edits the stored object too
+    with open(output, "ab") as f:
+        f.write(b"edited")
+    assert not store.fetch("a", str(tmp_path / "out2.jpg"))
+    assert store.stats()["entries"] == 0
+
+def test_dropped_object_is_removed_from_disk(tmp_path):
+    store = ImageStore(str(tmp_path / "store"), max_bytes=10)
+    store.add("a", make_image(tmp_path, "a.jpg", size=8))
+    output = tmp_path / "out.jpg"
+    assert store.fetch("a", str(output))
+    with open(output, "ab") as f:
+        f.write(b"edited")
+    assert not store.fetch("a", str(tmp_path / "out2.jpg"))
+    assert not store.object_path("a").exists()
+    # The project keeps its own link to the edited file
+    assert output.exists()
+    store.add("b", make_image(tmp_path, "b.jpg", size=8))
+    store.add("c", make_image(tmp_path, "c.jpg", size=8))
+    on_disk = sum(path.stat().st_size for path in store.objects_dir.rglob("*") if path.is_file())
+    assert on_disk <= 10
+
+def test_object_evicted_during_fetch_is_a_miss(tmp_path, store, monkeypatch):
+    store.add("a", make_image(tmp_path, "a.jpg"))
+    link_or_copy = image_store.link_or_copy
+
+    def evicted_first(source, destination, link=True):
+        os.remove(source)
+        return link_or_copy(source, destination, link)
+
+    monkeypatch.setattr(image_store, "link_or_copy", evicted_first)
+    output = tmp_path / "out.jpg"
+    assert not store.fetch("a", str(output))
+    assert not output.exists()
+    assert not list(tmp_path.glob("*.tmp"))
+    assert store.stats()["entries"] == 0
+    assert store.misses == 1
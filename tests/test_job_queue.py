@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+import pytest
+from components.job_queue import JobQueue, run_worker
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.2, max_attempts=2)
+
+def test_claims_oldest_job_once(queue):
+    first = queue.submit("first topic", profile="draft")
+    second = queue.submit("second topic")
+    job = queue.claim("worker-a")
+    assert job["id"] == first
+    assert job["options"] == {"profile": "draft"}
+    assert job["attempts"] == 0
+    assert queue.claim("worker-b")["id"] == second
+    assert queue.claim("worker-c") is None
+
+def test_heartbeat_keeps_lease(queue):
+    job_id = queue.submit("topic")
+    queue.claim("worker-a")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.heartbeat(job_id, "worker-a")
+    assert queue.claim("worker-b") is None
+
+def test_expired_lease_is_reclaimed(queue):
+    job_id = queue.submit("topic")
+    queue.claim("worker-a")
+    time.sleep(0.25)
+    job = queue.claim("worker-b")
+    assert job["id"] == job_id
+    # The first worker lost the job and can no longer finish it
+    assert not queue.heartbeat(job_id, "worker-a")
+    queue.complete(job_id, "worker-a", "stale")
+    assert queue.list()[0]["status"] == "running"
+    queue.complete(job_id, "worker-b", "video.mp4")
+    assert queue.list("done")[0]["result"] == '"video.mp4"'
+
+def test_job_fails_after_max_attempts(queue):
+    job_id = queue.submit("topic")
+    queue.claim("worker-a")
+    time.sleep(0.25)
+    queue.claim("worker-b")
+    time.sleep(0.25)
+    assert queue.claim("worker-c") is None
+    job = queue.list()[0]
+    assert job["id"] == job_id
+    assert job["status"] == "failed"
+
+def test_failed_job_is_requeued_until_attempts_run_out(queue):
+    job_id = queue.submit("topic")
+    queue.claim("worker-a")
+    queue.fail(job_id, "worker-a", "boom")
+    assert queue.list()[0]["status"] == "queued"
+    queue.claim("worker-b")
+    queue.fail(job_id, "worker-b", "boom")
+    assert queue.list()[0]["status"] == "failed"
+
+def test_cancelled_job_is_not_claimed(queue):
+    job_id = queue.submit("topic")
+    assert queue.cancel(job_id)
+    assert queue.claim("worker-a") is None
+
+def test_slots_cap_concurrent_holders(queue):
+    acquired = threading.Event()
+
+    def take_slot():
+        with queue.slot("render", 1, "worker-b:1", poll_interval=0.01):
+            acquired.set()
+
+    with queue.slot("render", 1, "worker-a:1"):
+        thread = threading.Thread(target=take_slot)
+        thread.start()
+        assert not acquired.wait(0.1)
+    thread.join(1)
+    assert acquired.is_set()
+
+def test_failed_heartbeat_keeps_the_lease(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    job_id = queue.submit("topic")
+    heartbeat = JobQueue.heartbeat
+    beats = []
+
+    def flaky_heartbeat(self, job_id, worker):
+        beats.append(worker)
+        if len(beats) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return heartbeat(self, job_id, worker)
+
+    monkeypatch.setattr(JobQueue, "heartbeat", flaky_heartbeat)
+    reclaimed = []
+
+    def run_job(topic, stage_slot):
+        # Run for several leases while another worker keeps polling
+        other = JobQueue(path, lease_seconds=0.3)
+        for _ in range(8):
+            time.sleep(0.1)
+            reclaimed.append(other.claim("worker-b"))
+        return "video.mp4"
+
+    run_worker(path, run_job, lease_seconds=0.3, drain=True, worker="worker-a")
+    assert len(beats) > 1
+    assert reclaimed == [None] * 8
+    job = queue.list()[0]
+    assert (job["id"], job["status"], job["worker"]) == (job_id, "done", "worker-a")
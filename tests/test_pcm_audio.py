@@ -0,0 +1,81 @@
+import os
+import time
+import numpy as np
+import pytest
+from components.audio_probe import probe_duration
+from components.pcm_audio import _next_smooth, export_compressed, read_pcm, resample, write_pcm
+from components.utils import run_ffmpeg
+
+def tone(frequency, seconds, sample_rate, channels=1):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return np.repeat(np.sin(2 * np.pi * frequency * t)[:, None], channels, axis=1).astype(np.float32)
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_write_then_memory_map(tmp_path, channels):
+    path = str(tmp_path / "narration.wav")
+    samples = tone(440, 0.5, 24000, channels)
+    assert write_pcm(path, samples, 24000) == pytest.approx(0.5)
+    pcm = read_pcm(path)
+    assert isinstance(pcm.samples, np.memmap)
+    assert not pcm.samples.flags.writeable
+    assert pcm.sample_rate == 24000
+    assert pcm.duration == pytest.approx(0.5)
+    np.testing.assert_array_equal(pcm.samples, samples)
+
+def test_empty_narration(tmp_path):
+    path = str(tmp_path / "empty.wav")
+    write_pcm(path, np.zeros(0, dtype=np.float32), 24000)
+    assert read_pcm(path).samples.shape == (0, 1)
+
+def test_other_formats_are_not_mapped(tmp_path):
+    path = str(tmp_path / "int16.wav")
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=0.2", "-c:a", "pcm_s16le", path])
+    assert read_pcm(path) is None
+    text = tmp_path / "notes.txt"
+    text.write_text("not audio")
+    assert read_pcm(str(text)) is None
+
+def test_ffmpeg_float_wav_is_mapped(tmp_path):
+    path = str(tmp_path / "float.wav")
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=duration=0.2", "-ar", "16000", "-c:a", "pcm_f32le", path])
+    pcm = read_pcm(path)
+    assert pcm.sample_rate == 16000
+    assert len(pcm.samples) == 3200
+
+def test_resample_keeps_length_and_pitch():
+    samples = tone(440, 1.0, 24000, channels=2)
+    resampled = resample(samples, 24000, 44100)
+    assert resampled.shape == (44100, 2)
+    assert resampled.dtype == np.float32
+    spectrum = np.abs(np.fft.rfft(resampled[:, 0]))
+    assert np.argmax(spectrum) == pytest.approx(440, abs=1)
+    # Away from the edges the waveform is the same tone at the new rate
+    expected = tone(440, 1.0, 44100)[:, 0]
+    assert np.abs(resampled[2000:-2000, 0] - expected[2000:-2000]).max() < 0.01
+
+def test_resample_same_rate_returns_input():
+    samples = tone(440, 0.1, 24000)
+    assert resample(samples, 24000, 24000) is samples
+
+@pytest.mark.parametrize("n", [1, 7, 97, 1000, 44101, 65537])
+def test_next_smooth(n):
+    smooth = _next_smooth(n)
+    assert n <= smooth < 2 * n
+    for factor in (2, 3, 5):
+        while smooth % factor == 0:
+            smooth //= factor
+    assert smooth == 1
+
+def test_export_compressed_reencodes_only_when_source_changes(tmp_path):
+    path = str(tmp_path / "narration.wav")
+    write_pcm(path, tone(440, 0.5, 24000), 24000)
+    mp3_path = export_compressed(path)
+    assert mp3_path == str(tmp_path / "narration.mp3")
+    assert probe_duration(mp3_path) == pytest.approx(0.5, abs=0.1)
+    mtime = os.path.getmtime(mp3_path)
+    assert export_compressed(path) == mp3_path
+    assert os.path.getmtime(mp3_path) == mtime
+    time.sleep(0.01)
+    write_pcm(path, tone(440, 1.0, 24000), 24000)
+    export_compressed(path)
+    assert probe_duration(mp3_path) == pytest.approx(1.0, abs=0.1)
@@ -0,0 +1,123 @@
+import threading
+import time
+import pytest
+from components.rate_limiter import ProviderLimiter, RateLimitError, parse_retry_after, rate_limit_details
+
+@pytest.fixture
+def limiter(tmp_path):
+    return ProviderLimiter("test", max_rate=10, burst=3, max_concurrency=2, backoff=0.01,
+                           db_path=str(tmp_path / "limits.sqlite3"))
+
+def bucket(limiter):
+    with limiter._transaction() as conn:
+        return conn.execute("SELECT tokens, rate, blocked_until FROM buckets WHERE provider = ?",
+                            (limiter.provider,)).fetchone()
+
+def test_burst_then_refill_at_rate(limiter):
+    assert [limiter._take_token() for _ in range(3)] == [0, 0, 0]
+    wait = limiter._take_token()
+    # One token comes back every 1 / rate seconds
+    assert 0 < wait <= 0.1
+    time.sleep(wait)
+    assert limiter._take_token() == 0
+
+def test_tokens_are_shared_between_limiters(limiter):
+    other = ProviderLimiter("test", max_rate=10, burst=3, db_path=str(limiter.db_path))
+    limiter._take_token()
+    limiter._take_token()
+    other._take_token()
+    assert other._take_token() > 0
+
+def test_reserve_holds_a_slot_until_release(limiter):
+    assert limiter.reserve() and limiter.reserve()
+    assert limiter.in_flight == 2
+    assert not limiter.reserve(blocking=False)
+    assert limiter.in_flight == 2
+    assert limiter.release() is False
+    assert limiter.in_flight == 1
+
+def test_non_blocking_reserve_without_token_frees_its_slot(limiter):
+    for _ in range(3):
+        limiter._take_token()
+    assert not limiter.reserve(blocking=False)
+    assert limiter.in_flight == 0
+
+def test_throttle_halves_rate_and_blocks_provider(limiter):
+    limiter.reserve()
+    assert limiter.release(RateLimitError("slow down", retry_after=0.2)) is True
+    tokens, rate, blocked_until = bucket(limiter)
+    assert rate == pytest.approx(5)
+    assert tokens <= 0
+    assert blocked_until > time.time()
+    assert limiter.concurrency == 1
+    assert limiter.in_flight == 0
+    assert limiter._take_token() > 0
+
+def test_success_raises_rate_up_to_max(limiter):
+    limiter.on_throttle(0, 0)
+    for _ in range(30):
+        limiter.on_success()
+    assert bucket(limiter)[1] == pytest.approx(10)
+    assert limiter.concurrency == pytest.approx(2)
+
+def test_call_retries_throttled_requests(limiter):
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RateLimitError("slow down", retry_after=0.05)
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[1] >= 0.05
+    assert limiter.in_flight == 0
+
+def test_call_does_not_retry_other_errors(limiter):
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert len(attempts) == 1
+    assert limiter.in_flight == 0
+
+def test_concurrency_limit_across_threads(limiter):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def request():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    threads = [threading.Thread(target=limiter.call, args=(request,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 2
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+def test_rate_limit_details():
+    assert rate_limit_details(HTTPError(429, {"retry-after": "3"})) == (True, 3.0)
+    assert rate_limit_details(HTTPError(429)) == (True, None)
+    assert rate_limit_details(HTTPError(500)) == (False, None)
+    assert rate_limit_details(ValueError()) == (False, None)
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not a date") is None
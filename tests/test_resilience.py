@@ -0,0 +1,174 @@
+import threading
+import time
+import pytest
+import requests
+from components.rate_limiter import ProviderLimiter, RateLimitError
+from components.resilience import CallTimeout, CircuitOpenError, ResilientCaller, is_retryable
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class APIConnectionError(Exception):
+    pass
+
+@pytest.mark.parametrize("error", [
+    CallTimeout(),
+    TimeoutError(),
+    ConnectionResetError(),
+    requests.ConnectionError(),
+    requests.Timeout(),
+    APIConnectionError(),
+    HTTPError(500),
+    HTTPError(503),
+    HTTPError(408),
+    requests.HTTPError(response=Response(502)),
+])
+def test_transient_errors_are_retryable(error):
+    assert is_retryable(error)
+
+@pytest.mark.parametrize("error", [
+    ValueError("schema mismatch"),
+    KeyError("image_prompt"),
+    HTTPError(400),
+    HTTPError(401),
+    HTTPError(404),
+    requests.HTTPError(response=Response(403)),
+    FileNotFoundError(),
+])
+def test_other_errors_are_not_retryable(error):
+    assert not is_retryable(error)
+
+def make_caller(**kwargs):
+    settings = dict(timeout=1, retries=2, backoff=0.001, failure_threshold=3, reset_timeout=60)
+    settings.update(kwargs)
+    return ResilientCaller("test", **settings)
+
+def failing(error, calls):
+    def fn():
+        calls.append(1)
+        raise error
+    return fn
+
+def test_retries_transient_errors():
+    calls = []
+    caller = make_caller()
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert caller.call(flaky) == "ok"
+    assert len(calls) == 3
+    assert caller.breaker.failures == 0
+
+def test_non_retryable_errors_fail_once_and_keep_breaker_closed():
+    calls = []
+    caller = make_caller()
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            caller.call(failing(ValueError("bad"), calls))
+    assert len(calls) == 5
+    assert caller.breaker.failures == 0
+
+def test_breaker_opens_after_repeated_failures():
+    calls = []
+    caller = make_caller(retries=0)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            caller.call(failing(ConnectionError(), calls))
+    with pytest.raises(CircuitOpenError):
+        caller.call(failing(ConnectionError(), calls))
+    assert len(calls) == 3
+
+def test_timeout_abandons_attempt():
+    caller = make_caller(timeout=0.05, retries=0)
+    with pytest.raises(CallTimeout):
+        caller.call(time.sleep, 0.3)
+
+@pytest.fixture
+def limiter(tmp_path):
+    return ProviderLimiter("test", max_rate=100, burst=100, max_concurrency=1, backoff=0.01,
+                           db_path=str(tmp_path / "limits.sqlite3"))
+
+def test_abandoned_attempt_keeps_its_slot(limiter):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+
+    caller = make_caller(timeout=0.05, retries=1)
+    with pytest.raises(CallTimeout):
+        caller.call(slow, limiter=limiter)
+    # The retry waited for the abandoned attempt before it was sent
+    assert peak[0] == 1
+    assert limiter.in_flight == 1
+    time.sleep(0.3)
+    assert limiter.in_flight == 0
+
+def test_every_attempt_takes_a_token(tmp_path):
+    # Refills too slowly to matter during the test
+    limiter = ProviderLimiter("test", max_rate=0.01, burst=5, db_path=str(tmp_path / "limits.sqlite3"))
+    calls = []
+    caller = make_caller(retries=2)
+    with pytest.raises(ConnectionError):
+        caller.call(failing(ConnectionError(), calls), limiter=limiter)
+    assert len(calls) == 3
+    with limiter._transaction() as conn:
+        tokens = conn.execute("SELECT tokens FROM buckets WHERE provider = 'test'").fetchone()[0]
+    assert tokens == pytest.approx(2, abs=0.05)
+    assert limiter.in_flight == 0
+
+def test_throttles_are_retried_without_using_retries(limiter):
+    calls = []
+    caller = make_caller(retries=0)
+
+    def throttled():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimitError("slow down", retry_after=0.01)
+        return "ok"
+
+    assert caller.call(throttled, limiter=limiter) == "ok"
+    assert len(calls) == 3
+    assert caller.breaker.failures == 0
+
+def test_hedge_needs_a_free_slot(limiter):
+    calls = []
+    caller = make_caller(hedge=True, hedge_min_samples=1)
+    caller.latencies.append(0.01)
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "ok"
+
+    assert caller.call(slow, limiter=limiter) == "ok"
+    assert len(calls) == 1
+
+def test_hedge_is_sent_when_a_slot_is_free(limiter):
+    limiter.max_concurrency = limiter.concurrency = 2
+    calls = []
+    caller = make_caller(hedge=True, hedge_min_samples=1)
+    caller.latencies.append(0.01)
+
+    def first_slow():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+        return len(calls)
+
+    assert caller.call(first_slow, limiter=limiter) == 2
+    assert len(calls) == 2
@@ -0,0 +1,44 @@
+import subprocess
+import numpy as np
+import pytest
+from PIL import Image
+from entity import Scene
+from components.utils import get_ffmpeg_binary, run_ffmpeg
+from components.video_editing import frame_count, get_render_profile
+from components.segment_rendering import SegmentRenderer
+
+def count_frames(path: str) -> int:
+    raw = subprocess.run([get_ffmpeg_binary(), "-v", "error", "-i", path, "-map", "0:v", "-f", "rawvideo",
+                          "-pix_fmt", "gray", "-s", "4x4", "-"], capture_output=True, check=True).stdout
+    return len(raw) // 16
+
+def audio_seconds(path: str, sample_rate: int = 8000) -> float:
+    raw = subprocess.run([get_ffmpeg_binary(), "-v", "error", "-i", path, "-map", "0:a", "-f", "s16le",
+                          "-ac", "1", "-ar", str(sample_rate), "-"], capture_output=True, check=True).stdout
+    return len(raw) / 2 / sample_rate
+
+@pytest.fixture
+def scenes(tmp_path):
+    scenes = []
+    # Durations that are not whole frames at 12 fps
+    for i, duration in enumerate([0.55, 0.71]):
+        image_path = tmp_path / f"scene_{i}.jpg"
+        Image.fromarray(np.full((640, 360, 3), 60 * (i + 1), dtype=np.uint8)).save(image_path)
+        audio_path = tmp_path / f"narration_{i}.wav"
+        run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}", str(audio_path)])
+        scenes.append(Scene(description=f"scene {i}", image_path=str(image_path), narration="Hello there",
+                            audio_path=str(audio_path), duration=duration))
+    return scenes
+
+def test_segments_render_whole_frames_matching_the_soundtrack(tmp_path, scenes):
+    profile = get_render_profile("draft")
+    renderer = SegmentRenderer(str(tmp_path / "video.mp4"), profile, workers=1)
+    for i, scene in enumerate(scenes):
+        renderer.submit(i, scene)
+    output_path = renderer.assemble()
+
+    frames = sum(frame_count(scene.duration, profile.fps) for scene in scenes)
+    assert frames == 16
+    assert count_frames(output_path) == frames
+    # AAC frames are coarser than video frames, so allow one video frame of padding
+    assert audio_seconds(output_path) == pytest.approx(frames / profile.fps, abs=1 / profile.fps)
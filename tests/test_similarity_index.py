@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pytest
+import components.similarity_index as similarity_index
+from components.similarity_index import SimilarityIndex, normalize_text, shingles
+
+PROMPT = ("A cinematic wide shot of a lone astronaut standing on a red desert plateau at dusk, "
+          "twin moons rising over jagged cliffs, volumetric light, ultra detailed")
+NEAR_DUPLICATE = PROMPT.replace("lone astronaut", "lone explorer")
+UNRELATED = "A cozy kitchen with a cat sleeping on a windowsill next to potted herbs, morning sunlight"
+
+@pytest.fixture
+def index(tmp_path):
+    return SimilarityIndex(str(tmp_path / "similarity.sqlite3"))
+
+def jaccard(a, b):
+    a, b = set(shingles(a).tolist()), set(shingles(b).tolist())
+    return len(a & b) / len(a | b)
+
+def test_normalize_and_shingles():
+    assert normalize_text("  A Lone, ASTRONAUT!  ") == "a lone astronaut"
+    assert len(shingles("astronaut")) == len("astronaut") - 4
+    assert len(shingles("cat")) == 1
+    np.testing.assert_array_equal(shingles("Lone astronaut"), shingles("lone   astronaut!"))
+
+def test_signature_estimates_jaccard(index):
+    estimate = (index.signature(PROMPT) == index.signature(NEAR_DUPLICATE)).mean()
+    assert estimate == pytest.approx(jaccard(PROMPT, NEAR_DUPLICATE), abs=0.12)
+    assert (index.signature(PROMPT) == index.signature(UNRELATED)).mean() < 0.1
+
+def test_finds_near_duplicates_only(index):
+    index.add("image:flux", PROMPT, "key-1", seconds=6.0)
+    index.add("image:flux", UNRELATED, "key-2")
+    matches = index.query("image:flux", NEAR_DUPLICATE, 0.7)
+    assert [match.asset for match in matches] == ["key-1"]
+    assert matches[0].similarity >= 0.7
+    assert index.query("image:flux", "A bowl of ramen on a wooden table", 0.7) == []
+
+def test_kinds_are_separate(index):
+    index.add("image:flux", PROMPT, "key-1")
+    assert index.query("image:sdxl", PROMPT, 0.7) == []
+
+def test_adding_same_text_replaces_entry(index):
+    index.add("image:flux", PROMPT, "key-1")
+    index.add("image:flux", PROMPT, "key-2")
+    assert [match.asset for match in index.query("image:flux", PROMPT, 0.9)] == ["key-2"]
+    assert index.stats()["image:flux"]["entries"] == 1
+
+def test_remove_and_hits(index):
+    index.add("image:flux", PROMPT, "key-1", seconds=6.0)
+    match = index.query("image:flux", NEAR_DUPLICATE, 0.7)[0]
+    index.record_hit("image:flux", match)
+    stats = index.stats()["image:flux"]
+    assert (stats["total_hits"], stats["saved_seconds"]) == (1, 6.0)
+    index.remove(match.id)
+    assert index.query("image:flux", NEAR_DUPLICATE, 0.7) == []
+
+def test_narration_reuse(tmp_path, index, monkeypatch):
+    monkeypatch.setattr(similarity_index, "_index", index)
+    monkeypatch.setitem(similarity_index.similarity_reuse, "narration", 0.7)
+    generated = []
+
+    def generate_audio(text, output_path):
+        generated.append(text)
+        with open(output_path, "w") as f:
+            f.write(text)
+        return 2.0
+
+    reusing_generate_audio, _ = similarity_index.with_narration_reuse("narration:kokoro", generate_audio)
+    first = str(tmp_path / "narration_1.wav")
+    assert reusing_generate_audio(PROMPT, first) == 2.0
+    second = str(tmp_path / "narration_2.wav")
+    # Reused narrations report no duration, so callers probe the file
+    assert reusing_generate_audio(NEAR_DUPLICATE, second) is None
+    assert generated == [PROMPT]
+    assert open(second).read() == PROMPT
+    # A copy, so editing it leaves the indexed narration alone
+    assert os.stat(first).st_ino != os.stat(second).st_ino
+
+def test_edited_narration_is_not_reused(tmp_path, index, monkeypatch):
+    monkeypatch.setattr(similarity_index, "_index", index)
+    monkeypatch.setitem(similarity_index.similarity_reuse, "narration", 0.7)
+    first = tmp_path / "narration_1.wav"
+    first.write_text("audio")
+    index.add("narration:kokoro", PROMPT, str(first))
+    os.utime(first, (first.stat().st_atime, first.stat().st_mtime + 10))
+    assert not similarity_index.reuse_narration("narration:kokoro", NEAR_DUPLICATE, str(tmp_path / "out.wav"))
+    assert "narration:kokoro" not in index.stats()
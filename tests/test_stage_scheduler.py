@@ -0,0 +1,111 @@
+import threading
+import time
+import pytest
+from components.stage_scheduler import Stage, StageScheduler
+
+class InMemoryState:
+    """
+    In-memory stand-in for ProjectManager's state methods.
+    """
+    def __init__(self, state=None):
+        self.state = dict(state or {})
+        self.timings = {}
+
+    def get_state_value(self, key, default=None):
+        return self.state.get(key, default)
+
+    def update_state(self, **updates):
+        self.state.update(updates)
+
+    def record_timing(self, name, seconds):
+        self.timings[name] = seconds
+
+def test_independent_stages_run_concurrently():
+    started = {}
+    barrier = threading.Barrier(2, timeout=2)
+
+    def branch(name):
+        def run(research):
+            started[name] = time.monotonic()
+            # Both branches must be running at once to pass the barrier
+            barrier.wait()
+            return f"{name} of {research}"
+        return run
+
+    stages = [
+        Stage("research", (), lambda: "topic"),
+        Stage("metadata", ("research",), branch("metadata")),
+        Stage("scenes", ("research",), branch("scenes"), status="scenes_generated"),
+        Stage("video", ("metadata", "scenes"), lambda metadata, scenes: [metadata, scenes]),
+    ]
+    state = InMemoryState()
+    values = StageScheduler(stages, state).run(["video"])
+    assert values["video"] == ["metadata of topic", "scenes of topic"]
+    assert state.state["completed_stages"][-1] == "video"
+    assert state.state["status"] == "scenes_generated"
+    assert "stage_video" in state.timings
+
+def test_resume_skips_completed_stages():
+    calls = []
+
+    def stage(name, *inputs):
+        def run(**kwargs):
+            calls.append(name)
+            return name
+        return Stage(name, inputs, run)
+
+    state = InMemoryState({"completed_stages": ["research"], "research": "saved research"})
+    values = StageScheduler([stage("research"), stage("scenes", "research")], state).run(["scenes"])
+    assert calls == ["scenes"]
+    assert values["research"] == "saved research"
+
+    StageScheduler([stage("research"), stage("scenes", "research")], state).run(["scenes"], force=["scenes"])
+    assert calls == ["scenes", "scenes"]
+
+def test_unpersisted_stage_is_rebuilt_with_load():
+    state = InMemoryState({"completed_stages": ["assets"]})
+    stages = [Stage("assets", (), lambda: pytest.fail("should not run"), persist=False, load=lambda: "from disk")]
+    assert StageScheduler(stages, state).run(["assets"])["assets"] == "from disk"
+    assert "assets" not in state.state
+
+def test_failure_keeps_outputs_of_stages_in_flight():
+    def slow():
+        time.sleep(0.1)
+        return "metadata"
+
+    def broken():
+        raise RuntimeError("provider error")
+
+    state = InMemoryState()
+    with pytest.raises(RuntimeError):
+        StageScheduler([Stage("metadata", (), slow), Stage("scenes", (), broken)], state).run(["metadata", "scenes"])
+    assert state.state["completed_stages"] == ["metadata"]
+    assert state.state["metadata"] == "metadata"
+
+def test_stage_without_output_fails():
+    with pytest.raises(RuntimeError):
+        StageScheduler([Stage("scenes", (), lambda: None)], InMemoryState()).run(["scenes"])
+
+def test_rejects_unknown_inputs_and_cycles():
+    with pytest.raises(ValueError):
+        StageScheduler([Stage("scenes", ("research",), lambda research: 1)], InMemoryState())
+    stages = [Stage("a", ("b",), lambda b: 1), Stage("b", ("a",), lambda a: 1)]
+    with pytest.raises(ValueError):
+        StageScheduler(stages, InMemoryState()).run(["a"])
+
+def test_stage_slot_wraps_each_run():
+    entered = []
+
+    class Slot:
+        def __init__(self, name):
+            self.name = name
+
+        def __enter__(self):
+            entered.append(self.name)
+
+        def __exit__(self, *exc):
+            return False
+
+    stages = [Stage("research", (), lambda: 1), Stage("video", ("research",), lambda research: 2)]
+    StageScheduler(stages, InMemoryState(), stage_slot=Slot).run(["video"])
+    assert entered == ["research", "video"]
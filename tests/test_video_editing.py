@@ -0,0 +1,48 @@
+import pytest
+from entity import Scene
+from components.video_editing import Timeline, frame_count
+
+def make_scenes(durations):
+    return [Scene(description=f"scene {i}", image_path="", narration="", audio_path=f"narration_{i}.mp3", duration=d)
+            for i, d in enumerate(durations)]
+
+@pytest.mark.parametrize("duration, fps, frames", [
+    (1.0, 24, 24),
+    (0.5, 12, 6),
+    (0.55, 12, 7),
+    # Float error just above a whole frame does not add one
+    (0.1 * 3, 10, 3),
+    (0.0, 24, 1),
+    (0.001, 24, 1),
+])
+def test_frame_count(duration, fps, frames):
+    assert frame_count(duration, fps) == frames
+
+def test_frame_ranges_are_contiguous_frame_counts():
+    durations = [0.55, 1.3, 0.71, 2.0, 0.04]
+    fps = 12
+    ranges = Timeline.from_scenes(make_scenes(durations), fps=fps).frame_ranges(fps)
+    assert ranges[0][0] == 0
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert [end - start for start, end in ranges] == [frame_count(d, fps) for d in durations]
+
+def test_scenes_start_on_frame_boundaries():
+    fps = 24
+    timeline = Timeline.from_scenes(make_scenes([0.51, 0.77, 1.03]), fps=fps)
+    for start, end in timeline.scene_boundaries():
+        assert start * fps == pytest.approx(round(start * fps))
+        assert end * fps == pytest.approx(round(end * fps))
+    assert timeline.duration * fps == pytest.approx(timeline.frame_ranges(fps)[-1][1])
+
+def test_frame_ranges_agree_with_scene_at():
+    fps = 30
+    timeline = Timeline.from_scenes(make_scenes([0.4, 0.33, 1.21, 0.05]), fps=fps)
+    for index, (start, end) in enumerate(timeline.frame_ranges(fps)):
+        for frame in range(start, end):
+            # Frame times built by repeated addition land just short of boundaries
+            t = sum(1 / fps for _ in range(frame))
+            assert timeline.scene_at(t).index == index
+
+def test_frame_ranges_without_fps_layout():
+    timeline = Timeline.from_scenes(make_scenes([0.5, 0.25]))
+    assert timeline.frame_ranges(8) == [(0, 4), (4, 6)]